@@ -9,6 +9,9 @@
 ################################################################################
 # Imports
 from src.user_main import do_user_main
+from src.user_main import do_user_main_async
+from src.utils.param_set import ParamSet
+from src.utils.param_set import RUNTIME_MODE_ASYNC
 
 ################################################################################
 # Functions
@@ -22,4 +25,7 @@ from src.user_main import do_user_main
 ################################################################################
 # Scripting
 print('starting user main...')
-do_user_main()
+if RUNTIME_MODE_ASYNC == ParamSet().get_runtime_mode():
+    do_user_main_async()
+else:
+    do_user_main()
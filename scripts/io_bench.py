@@ -0,0 +1,190 @@
+################################################################################
+# filename: io_bench.py
+# date: 17. Oct. 2026
+# description: This module benchmarks the skill loop timing of the mqtt client
+#               with the socket I/O executed inline and executed in the io
+#               worker thread. The client writes to a simulated socket, which
+#               stalls periodically like a WIFI connection. While the tx ring
+#               of the worker is full, the state messages are queued and only
+#               the latest one is written. Run it from the repository root
+#               on the unix port with umqtt.simple installed:
+#               micropython scripts/io_bench.py
+################################################################################
+
+################################################################################
+# Imports
+import sys
+import time
+if '.' not in sys.path:
+    sys.path.append('.')
+import src.utils.io_worker as io_worker
+from src.mqtt.user_mqtt import UserMqtt
+
+################################################################################
+# Variables
+_TICKS          = 200
+_TICK_PERIOD    = 10
+_SAMPLE_LOOPS   = 200
+_STALL_EVERY    = 20
+_STALL_TIME     = 50
+
+_TOPIC          = b'bench/t'
+_PAYLOAD        = b'21.5'
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    Main function of script
+# @return   none
+################################################################################
+def main():
+    print('--- io worker benchmark ---')
+    print('ticks: ' + str(_TICKS) + ', stall: ' + str(_STALL_TIME) + 'ms every '
+            + str(_STALL_EVERY) + ' writes')
+    _print_result('inline', bench_inline())
+    _print_result('worker', bench_worker())
+
+################################################################################
+# @brief    runs the skill loop with the mqtt client writing the socket in the
+#           loop
+# @return   tuple of average and maximum tick time in us, written bytes and
+#           queued and dropped messages
+################################################################################
+def bench_inline():
+    client, sock = _create_client()
+    avg, max_time = _run_skill_loop(client)
+    return _get_result(client, sock, avg, max_time)
+
+################################################################################
+# @brief    runs the skill loop with the mqtt client socket I/O in the io
+#           worker thread
+# @return   tuple of average and maximum tick time in us, written bytes and
+#           queued and dropped messages
+################################################################################
+def bench_worker():
+    client, sock = _create_client()
+    io_worker.start_io_worker()
+    client.attach_worker()
+    avg, max_time = _run_skill_loop(client)
+    # the detach writes the remaining transmit entries
+    client.detach_worker()
+    client.flush()
+    io_worker.stop_io_worker()
+    return _get_result(client, sock, avg, max_time)
+
+################################################################################
+# @brief    collects the result of a benchmark
+# @param    client  mqtt client
+# @param    sock    simulated socket
+# @param    avg     average tick time in us
+# @param    max_time    maximum tick time in us
+# @return   tuple of average and maximum tick time in us, written bytes,
+#           queued and dropped messages
+################################################################################
+def _get_result(client, sock, avg, max_time):
+    stats = client.get_connection_stats()
+    return (avg, max_time, sock.written, stats['queued'], stats['tx_dropped'])
+
+################################################################################
+# @brief    creates a mqtt client connected to the simulated socket, the
+#           broker connection is not established
+# @return   tuple of client and simulated socket
+################################################################################
+def _create_client():
+    client = UserMqtt('bench', '127.0.0.1', 1883, '', '')
+    client.set_callback(lambda topic, payload: None)
+    sock = _SlowSocket()
+    client.mqtt_client.sock = sock
+    client._connection_status = client._CONNECTED
+    return (client, sock)
+
+################################################################################
+# @brief    simulated skill loop, every tick samples, publishes and flushes
+#           like the skill manager and runs the mqtt cyclic task like the
+#           main loop
+# @param    client  mqtt client
+# @return   tuple of average and maximum tick time in us
+################################################################################
+def _run_skill_loop(client):
+    time_sum = 0
+    time_max = 0
+
+    for i in range(_TICKS):
+        start_time = time.ticks_us()
+        value = 0
+        for j in range(_SAMPLE_LOOPS):
+            value = value + j
+        client.publish(_TOPIC, _PAYLOAD)
+        client.flush()
+        client.mqtt_cyclic_task()
+        duration = time.ticks_diff(time.ticks_us(), start_time)
+        time_sum = time_sum + duration
+        time_max = max(time_max, duration)
+        time.sleep_ms(_TICK_PERIOD)
+    return (time_sum // _TICKS, time_max)
+
+################################################################################
+# @brief    prints a benchmark result
+# @param    name    name of the benchmark
+# @param    result  tuple of average and maximum tick time, written bytes,
+#                   queued and dropped messages
+# @return   none
+################################################################################
+def _print_result(name, result):
+    print(name + ': avg ' + str(result[0]) + 'us, max ' + str(result[1])
+            + 'us, written ' + str(result[2]) + ' bytes, queued ' + str(result[3])
+            + ', dropped ' + str(result[4]))
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class simulates the socket of the broker connection with
+#           periodic write stalls, the broker never sends data
+################################################################################
+class _SlowSocket:
+
+    ############################################################################
+    # Member Attributes
+    _writes = 0
+    written = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    writes the data, every _STALL_EVERY write stalls
+    # @param    data    data to write
+    # @param    length  optional number of bytes of the data to write
+    # @return   number of written bytes
+    ############################################################################
+    def write(self, data, length=None):
+        self._writes = self._writes + 1
+        if self._writes % _STALL_EVERY == 0:
+            time.sleep_ms(_STALL_TIME)
+        if length == None:
+            length = len(data)
+        self.written = self.written + length
+        return length
+
+    ############################################################################
+    # @brief    reads data without blocking, no data is pending
+    # @param    size    number of bytes to read
+    # @return   None
+    ############################################################################
+    def read(self, size):
+        return None
+
+    ############################################################################
+    # @brief    sets the blocking mode, the socket never blocks on a read
+    # @param    flag    blocking mode
+    # @return   none
+    ############################################################################
+    def setblocking(self, flag):
+        pass
+
+################################################################################
+# Scripts
+if __name__ == "__main__":
+    main()
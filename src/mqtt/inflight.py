@@ -0,0 +1,171 @@
+################################################################################
+# filename: inflight.py
+# date: 17. Oct. 2026
+# description: This module keeps the QoS 1 publish packets until the broker
+#               acknowledges them. The window has a fixed number of
+#               preallocated slots, unacknowledged packets are due for a
+#               retransmit after a timeout.
+#
+################################################################################
+
+################################################################################
+# Imports
+import time
+
+################################################################################
+# Variables
+# duplicate flag of the publish fixed header
+_DUP_FLAG = 0x08
+# packet identifier of a free slot
+_FREE = 0
+
+################################################################################
+# Functions
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class implements the in-flight window of the QoS 1 publish
+#           packets. In the io worker mode the worker thread only releases
+#           slots of acknowledged packets. Taking slots, the retransmits and
+#           marking the packets due after a reconnect are done by the skill
+#           loop, which also allocates the packet identifiers.
+################################################################################
+class InflightWindow:
+
+    ############################################################################
+    # Member Attributes
+    _slots = None
+    _views = None
+    _pids = None
+    _lens = None
+    _sent_times = None
+    _retries = None
+    _slot_size = 0
+    _timeout = 0
+    _max_retries = 0
+    lost = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the InflightWindow class
+    # @param    slots       number of packets in flight
+    # @param    slot_size   maximum size of an encoded packet
+    # @param    timeout     time in ms until an unacknowledged packet is sent
+    #                       again
+    # @param    max_retries number of retransmits until a packet is dropped
+    # @return   none
+    ############################################################################
+    def __init__(self, slots, slot_size, timeout, max_retries):
+        self._slots = [bytearray(slot_size) for i in range(slots)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._pids = [_FREE] * slots
+        self._lens = [0] * slots
+        self._sent_times = [0] * slots
+        self._retries = [0] * slots
+        self._slot_size = slot_size
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self.lost = 0
+
+    ############################################################################
+    # @brief    returns a free slot, the packet is encoded into the slot buffer
+    #           and the slot is taken with commit
+    # @return   slot index or None if the window is full
+    ############################################################################
+    def get_free_slot(self):
+        for i in range(len(self._pids)):
+            if self._pids[i] == _FREE:
+                return i
+        return None
+
+    ############################################################################
+    # @brief    returns the buffer of a slot
+    # @param    i       slot index
+    # @return   memoryview of the slot buffer
+    ############################################################################
+    def get_buffer(self, i):
+        return self._views[i]
+
+    ############################################################################
+    # @brief    takes a slot with the packet encoded into its buffer
+    # @param    i       slot index
+    # @param    pid     packet identifier of the packet
+    # @param    length  length of the encoded packet
+    # @return   memoryview of the packet
+    ############################################################################
+    def commit(self, i, pid, length):
+        self._lens[i] = length
+        self._sent_times[i] = time.ticks_ms()
+        self._retries[i] = 0
+        self._pids[i] = pid
+        return self._views[i][0:length]
+
+    ############################################################################
+    # @brief    releases the slot of an acknowledged packet
+    # @param    pid     packet identifier of the acknowledge
+    # @return   True if the packet was in flight, else False
+    ############################################################################
+    def ack(self, pid):
+        if pid == _FREE:
+            return False
+        for i in range(len(self._pids)):
+            if self._pids[i] == pid:
+                self._pids[i] = _FREE
+                return True
+        return False
+
+    ############################################################################
+    # @brief    checks if a packet identifier is in flight
+    # @param    pid     packet identifier
+    # @return   True if the packet is in flight, else False
+    ############################################################################
+    def is_in_flight(self, pid):
+        return pid in self._pids
+
+    ############################################################################
+    # @brief    returns the number of packets in flight
+    # @return   number of packets
+    ############################################################################
+    def get_count(self):
+        return len(self._pids) - self._pids.count(_FREE)
+
+    ############################################################################
+    # @brief    returns the next packet due for a retransmit, the packet gets
+    #           the duplicate flag and its timeout is restarted. Packets
+    #           exceeding the retransmits are dropped.
+    # @param    current_time    ticks_ms time stamp
+    # @return   memoryview of the packet or None if no packet is due
+    ############################################################################
+    def get_due_packet(self, current_time):
+        for i in range(len(self._pids)):
+            if self._pids[i] == _FREE:
+                continue
+            if time.ticks_diff(current_time, self._sent_times[i]) < self._timeout:
+                continue
+            if self._retries[i] >= self._max_retries:
+                self._pids[i] = _FREE
+                self.lost = self.lost + 1
+                continue
+            self._retries[i] = self._retries[i] + 1
+            self._sent_times[i] = current_time
+            self._slots[i][0] = self._slots[i][0] | _DUP_FLAG
+            return self._views[i][0:self._lens[i]]
+        return None
+
+    ############################################################################
+    # @brief    marks all packets in flight due for a retransmit, used after
+    #           a reconnect of the broker
+    # @return   none
+    ############################################################################
+    def set_all_due(self):
+        current_time = time.ticks_ms()
+        for i in range(len(self._pids)):
+            self._sent_times[i] = time.ticks_add(current_time, -self._timeout)
+            self._retries[i] = 0
+
+################################################################################
+# Scripts
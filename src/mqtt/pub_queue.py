@@ -0,0 +1,160 @@
+################################################################################
+# filename: pub_queue.py
+# date: 17. Oct. 2026
+# description: This module queues the publications while the broker connection
+#               is disturbed. State topics keep only their latest payload,
+#               event topics are kept in order up to a limit.
+#
+################################################################################
+
+################################################################################
+# Imports
+from src.utils.io_worker import RingBuffer
+
+################################################################################
+# Variables
+# publication kinds
+STATE = 0
+EVENT = 1
+# state entry replaced by a direct publication, skipped by the drain
+DISCARDED = 2
+
+################################################################################
+# Functions
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class implements the preallocated publication queue, the head
+#           of an entry is the topic and the body the payload
+################################################################################
+class PubQueue(RingBuffer):
+
+    ############################################################################
+    # Member Attributes
+    _topics = None
+    _retain = None
+    _events = 0
+    _event_limit = 0
+    oversized = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the PubQueue class
+    # @param    slots       number of entries
+    # @param    slot_size   maximum size of topic and payload of an entry
+    # @param    event_limit maximum number of queued event entries
+    # @return   none
+    ############################################################################
+    def __init__(self, slots, slot_size, event_limit):
+        super().__init__(slots, slot_size)
+        self._topics = [None] * slots
+        self._retain = [False] * slots
+        self._events = 0
+        self._event_limit = event_limit
+        self.oversized = 0
+
+    ############################################################################
+    # @brief    queues a publication, a queued state publication of the same
+    #           topic gets the new payload and keeps its position
+    # @param    kind    STATE or EVENT
+    # @param    topic   topic of the publication as bytes
+    # @param    payload payload of the publication as bytes
+    # @param    retain  True if the publication is retained
+    # @return   True if the publication was queued, False if it was dropped
+    ############################################################################
+    def put(self, kind, topic, payload=b'', retain=False):
+        if self.is_oversized(topic, payload):
+            self.oversized = self.oversized + 1
+            return False
+        if kind == STATE:
+            i = self._find_state(topic)
+            if i != None:
+                self._retain[i] = retain
+                return self._replace_payload(i, topic, payload)
+        elif self._events >= self._event_limit:
+            self.dropped = self.dropped + 1
+            return False
+
+        i = self._write
+        if not super().put(kind, topic, payload):
+            return False
+        self._topics[i] = topic
+        self._retain[i] = retain
+        if kind == EVENT:
+            self._events = self._events + 1
+        return True
+
+    ############################################################################
+    # @brief    removes the oldest entry and releases its slot
+    # @return   none
+    ############################################################################
+    def pop(self):
+        if self.is_empty():
+            return
+        i = self._read
+        if self._kinds[i] == EVENT:
+            self._events = self._events - 1
+        self._topics[i] = None
+        super().pop()
+
+    ############################################################################
+    # @brief    checks if a publication is larger than a slot
+    # @param    topic   topic of the publication as bytes
+    # @param    payload payload of the publication as bytes
+    # @return   True if the publication doesn't fit into a slot, else False
+    ############################################################################
+    def is_oversized(self, topic, payload):
+        return len(topic) + len(payload) > self._slot_size
+
+    ############################################################################
+    # @brief    discards the queued state entry of a topic, used if a newer
+    #           state is published directly
+    # @param    topic   topic of the publication as bytes
+    # @return   none
+    ############################################################################
+    def discard_state(self, topic):
+        i = self._find_state(topic)
+        if i != None:
+            self._kinds[i] = DISCARDED
+            self._topics[i] = None
+
+    ############################################################################
+    # @brief    returns if the oldest entry is retained
+    # @return   True if the publication is retained, else False
+    ############################################################################
+    def get_retain(self):
+        return self._retain[self._read]
+
+    ############################################################################
+    # @brief    searches the queued state entry of a topic
+    # @param    topic   topic of the publication as bytes
+    # @return   slot index of the entry or None
+    ############################################################################
+    def _find_state(self, topic):
+        i = self._read
+        for n in range(self.get_count()):
+            if (self._kinds[i] == STATE) and (self._topics[i] == topic):
+                return i
+            i = (i + 1) % len(self._slots)
+        return None
+
+    ############################################################################
+    # @brief    replaces the payload of a queued entry
+    # @param    i       slot index of the entry
+    # @param    topic   topic of the publication as bytes
+    # @param    payload new payload as bytes
+    # @return   True if the payload was replaced
+    ############################################################################
+    def _replace_payload(self, i, topic, payload):
+        head_len = len(topic)
+        body_len = len(payload)
+        self._views[i][head_len:head_len + body_len] = payload
+        self._body_lens[i] = body_len
+        return True
+
+################################################################################
+# Scripts
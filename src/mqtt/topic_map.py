@@ -0,0 +1,183 @@
+################################################################################
+# filename: topic_map.py
+# date: 17. Oct. 2026
+# description: This module maps the topics of incoming mqtt messages to the
+#               registered subscriptions. Topics without wildcards are looked
+#               up in a dictionary, subscriptions with the '+' and '#'
+#               wildcards are stored in a trie of the topic levels.
+#
+################################################################################
+
+################################################################################
+# Imports
+
+################################################################################
+# Variables
+_SINGLE_LEVEL   = b'+'
+_MULTI_LEVEL    = b'#'
+_SEPARATOR      = b'/'
+_SYSTEM_PREFIX  = b'$'
+
+# trie node entries, a node is a list of the child nodes dictionary and the
+# subscriptions ending at the node
+_CHILDREN       = 0
+_SUBS           = 1
+
+_NO_SUBS        = ()
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    checks if a topic filter contains a wildcard
+# @param    topic   topic filter as bytes
+# @return   True if the filter contains a wildcard, else False
+################################################################################
+def is_wildcard(topic):
+    return (_SINGLE_LEVEL in topic) or (_MULTI_LEVEL in topic)
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class maps topics to their subscriptions
+################################################################################
+class TopicMap:
+
+    ############################################################################
+    # Member Attributes
+    _exact = None
+    _trie = None
+    _wildcards = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the TopicMap class
+    # @return   none
+    ############################################################################
+    def __init__(self):
+        self._exact = {}
+        self._trie = [{}, []]
+        self._wildcards = 0
+
+    ############################################################################
+    # @brief    adds a subscription for a topic filter
+    # @param    topic   topic filter as bytes
+    # @param    subs    subscription object
+    # @return   none
+    ############################################################################
+    def add(self, topic, subs):
+        if is_wildcard(topic):
+            node = self._trie
+            for level in topic.split(_SEPARATOR):
+                child = node[_CHILDREN].get(level)
+                if child == None:
+                    child = [{}, []]
+                    node[_CHILDREN][level] = child
+                node = child
+            node[_SUBS].append(subs)
+            self._wildcards = self._wildcards + 1
+        else:
+            entry = self._exact.get(topic)
+            if entry == None:
+                self._exact[topic] = [subs]
+            else:
+                entry.append(subs)
+
+    ############################################################################
+    # @brief    removes a subscription of a topic filter
+    # @param    topic   topic filter as bytes
+    # @param    subs    subscription object
+    # @return   True if the subscription was removed, else False
+    ############################################################################
+    def remove(self, topic, subs):
+        if is_wildcard(topic):
+            if self._remove_node(self._trie, topic.split(_SEPARATOR), 0, subs):
+                self._wildcards = self._wildcards - 1
+                return True
+            return False
+
+        entry = self._exact.get(topic)
+        if (entry == None) or (subs not in entry):
+            return False
+        entry.remove(subs)
+        if len(entry) == 0:
+            del self._exact[topic]
+        return True
+
+    ############################################################################
+    # @brief    returns the subscriptions matching a topic, the returned
+    #           sequence must not be modified
+    # @param    topic   topic of the message as bytes
+    # @return   sequence of the matching subscriptions
+    ############################################################################
+    def match(self, topic):
+        exact = self._exact.get(topic, _NO_SUBS)
+        if self._wildcards == 0:
+            return exact
+
+        result = []
+        self._match_node(self._trie, topic.split(_SEPARATOR), 0, result)
+        if len(result) == 0:
+            return exact
+        result.extend(exact)
+        return result
+
+    ############################################################################
+    # @brief    collects the wildcard subscriptions matching the topic levels
+    #           starting with a node
+    # @param    node    trie node
+    # @param    levels  topic levels of the message
+    # @param    index   index of the level of the node children
+    # @param    result  list to append the matching subscriptions to
+    # @return   none
+    ############################################################################
+    def _match_node(self, node, levels, index, result):
+        children = node[_CHILDREN]
+        if index == len(levels):
+            result.extend(node[_SUBS])
+            # 'a/#' matches the parent level 'a' as well
+            child = children.get(_MULTI_LEVEL)
+            if child != None:
+                result.extend(child[_SUBS])
+            return
+
+        # wildcards at the first level don't match the $ system topics
+        if (index > 0) or (not levels[0].startswith(_SYSTEM_PREFIX)):
+            child = children.get(_MULTI_LEVEL)
+            if child != None:
+                result.extend(child[_SUBS])
+            child = children.get(_SINGLE_LEVEL)
+            if child != None:
+                self._match_node(child, levels, index + 1, result)
+        child = children.get(levels[index])
+        if child != None:
+            self._match_node(child, levels, index + 1, result)
+
+    ############################################################################
+    # @brief    removes a subscription of the trie and prunes the empty nodes
+    # @param    node    trie node
+    # @param    levels  levels of the topic filter
+    # @param    index   index of the level of the node children
+    # @param    subs    subscription object
+    # @return   True if the subscription was removed, else False
+    ############################################################################
+    def _remove_node(self, node, levels, index, subs):
+        if index == len(levels):
+            if subs not in node[_SUBS]:
+                return False
+            node[_SUBS].remove(subs)
+            return True
+
+        child = node[_CHILDREN].get(levels[index])
+        if child == None:
+            return False
+        removed = self._remove_node(child, levels, index + 1, subs)
+        if (len(child[_CHILDREN]) == 0) and (len(child[_SUBS]) == 0):
+            del node[_CHILDREN][levels[index]]
+        return removed
+
+################################################################################
+# Scripts
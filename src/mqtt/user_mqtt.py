@@ -11,12 +11,21 @@
 # Imports
 from umqtt.simple import MQTTClient
 from umqtt.simple import MQTTException
-from time import sleep
+import time
+import select
+import socket
+import random
 from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_subs import set_mqtt_subscribe_cb
 from src.mqtt.user_subs import set_mqtt_unsubscribe_cb
 from src.mqtt.user_pubs import UserPubs
 from src.mqtt.user_pubs import set_mqtt_publish_cb
+from src.mqtt.user_pubs import set_mqtt_flush_cb
+from src.mqtt.topic_map import TopicMap
+import src.mqtt.pub_queue as pub_queue
+from src.mqtt.inflight import InflightWindow
+import src.utils.io_worker as io_worker
+import src.utils.power_mgr as power_mgr
 import src.utils.trace as T
 
 
@@ -24,6 +33,11 @@ import src.utils.trace as T
 # Variables
 # client object singleton
 client = None
+# receive budget of a cycle, kept for the restarts of the client
+_rx_max_msgs = None
+_rx_max_time = None
+# watchdog feed function, called before a blocking connection attempt
+_watchdog_cb = None
 
 ################################################################################
 # Functions
@@ -56,17 +70,29 @@ def main():
 # @param    port     broker ip port
 # @param    user     broker user identifier
 # @param    pwd      broker user password
+# @param    clean_session   False to keep the session of the client id on the
+#                           broker from the first connection on, reconnects
+#                           never clean the session
+# @param    retain_states   True to publish the state topics retained
+# @param    keepalive       keepalive time in seconds, 0 disables the pings
 # @return   none
 ################################################################################
-def start_mqtt_client(id, ip, port, user, pwd):
+def start_mqtt_client(id, ip, port, user, pwd, clean_session=True,
+                        retain_states=False, keepalive=60):
     global client
 
-    client = UserMqtt(id, ip, port, user, pwd)
+    client = UserMqtt(id, ip, port, user, pwd, clean_session, retain_states,
+                        keepalive)
+    if _rx_max_msgs != None:
+        client.set_receive_budget(_rx_max_msgs, _rx_max_time)
     client.set_callback(subs_callback)
     client.connect()
+    if io_worker.is_io_worker_active():
+        client.attach_worker()
     set_mqtt_subscribe_cb(subscribe)
     set_mqtt_unsubscribe_cb(unsubscribe)
     set_mqtt_publish_cb(publish)
+    set_mqtt_flush_cb(flush)
 
 ################################################################################
 # @brief    Stops the mqtt client and disconnects from the mqtt broker
@@ -76,22 +102,42 @@ def stop_mqtt_client():
     global client
 
     if client != None:
+        client.detach_worker()
+        client.flush()
         client.disconnect()
         client = None
 
 ################################################################################
 # @brief    using the mqtt client singleton, this function publishes a messsage
-# @param    topic   topic identifier of the messsage
+# @param    topic   topic identifier of the messsage, preferably already
+#                   encoded as bytes
 # @param    payload   payload of the message
+# @param    event   True if the message is an event, else it is a state
+# @param    qos     quality of service level 0 or 1
+# @param    retain  True if the message is a skill state to be retained
+# @return   True if the message was sent or queued, else False
+################################################################################
+def publish(topic, payload, event=False, qos=0, retain=False):
+    global client
+
+    if client != None:
+        if isinstance(topic, str):
+            topic = topic.encode('utf-8')
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return client.publish(topic, payload, event, qos, retain)
+    return False
+
+################################################################################
+# @brief    using the mqtt client singleton, this function writes all buffered
+#           publications to the socket
 # @return   none
 ################################################################################
-def publish(topic, payload):
+def flush():
     global client
 
     if client != None:
-        byte_topic = topic.encode('utf-8')
-        byte_payload = payload.encode('utf-8')
-        client.publish(byte_topic, byte_payload)
+        client.flush()
 
 ################################################################################
 # @brief    Callback function for incoming subscriptions
@@ -100,12 +146,9 @@ def publish(topic, payload):
 # @return   none
 ################################################################################
 def subs_callback(topic, data):
-    topic_string = topic.decode('utf-8')
-    data_string = data.decode('utf-8')
-    T.trace(__name__, T.DEBUG, 'Topic received:' + topic_string)
-    T.trace(__name__, T.DEBUG, 'Data received:' + data_string)
+    power_mgr.message_received()
     if client != None:
-        client.check_subscriptions(topic_string, data_string)
+        client.check_subscriptions(topic, data)
 
 ################################################################################
 # @brief    This function subscribes for a topic and registers a callback
@@ -140,6 +183,59 @@ def print_all_subscriptions():
     if client != None:
         client.print_all_subscriptions()
 
+################################################################################
+# @brief    This function limits an idle time of the main loop to the time
+#           until the next action of the mqtt client
+# @param    idle_time   idle time in ms
+# @return   limited idle time in ms
+################################################################################
+def limit_idle_time(idle_time):
+    global client
+
+    if client != None:
+        mqtt_idle_time = client.get_idle_time()
+        if mqtt_idle_time != None:
+            return min(idle_time, mqtt_idle_time)
+    return idle_time
+
+################################################################################
+# @brief    This function configures the budget of the incoming message
+#           processing per cycle, it is kept for the restarts of the client
+# @param    max_msgs    maximum number of messages processed per cycle
+# @param    max_time    maximum time in ms spent per cycle
+# @return   none
+################################################################################
+def set_receive_budget(max_msgs, max_time):
+    global client, _rx_max_msgs, _rx_max_time
+
+    _rx_max_msgs = max_msgs
+    _rx_max_time = max_time
+    if client != None:
+        client.set_receive_budget(max_msgs, max_time)
+
+################################################################################
+# @brief    This function sets the watchdog feed function, the watchdog is fed
+#           before each blocking connection attempt of the skill loop
+# @param    watchdog_cb     the watchdog feed function
+# @return   none
+################################################################################
+def set_watchdog_cb(watchdog_cb):
+    global _watchdog_cb
+
+    _watchdog_cb = watchdog_cb
+
+################################################################################
+# @brief    This function returns the broker connection statistics
+# @return   dictionary of the connection statistics or None if no client is
+#           available
+################################################################################
+def get_connection_stats():
+    global client
+
+    if client != None:
+        return client.get_connection_stats()
+    return None
+
 ################################################################################
 # @brief    This function checks non blocking for an MQTT incoming message
 #           and processes it
@@ -158,6 +254,31 @@ def check_non_blocking_for_msg():
 
     return(check_result)
 
+################################################################################
+# @brief    This function checks if incoming MQTT data is pending on the socket
+# @return   True if data is pending, else False
+################################################################################
+def is_msg_pending():
+    global client
+
+    if client != None:
+        return client.is_msg_pending()
+    return False
+
+################################################################################
+# @brief    uasyncio task which awaits incoming MQTT messages and processes
+#           them, used in the asynchronous runtime mode instead of
+#           check_non_blocking_for_msg
+# @return   False if the mqtt client is not available
+################################################################################
+async def process_msgs_async():
+    global client
+
+    while client != None:
+        await client.mqtt_cyclic_task_async()
+
+    return False
+
 ################################################################################
 # @brief    This function restarts the MQTT client
 # @return   True if execution was successful, else False
@@ -174,16 +295,22 @@ def restart():
     port = client.broker_port
     user = client.broker_user
     pwd  = client.broker_pwd
+    clean_session = client.clean_session
+    retain_states = client.retain_states
+    keepalive = client.keepalive
 
     # stop the client
-    restart_result = restart_result & stop_mqtt_client()
+    stop_mqtt_client()
 
     # start the client
-    restart_result = restart_result & start_mqtt_client(id, ip, port, user, pwd)
+    start_mqtt_client(id, ip, port, user, pwd, clean_session, retain_states,
+                        keepalive)
 
-    #re-subscribe resqued topics
+    #re-subscribe resqued topics, they are sent in one subscribe packet. A
+    #resumed broker session still holds them, they are only registered then.
+    resumed = client.is_session_present()
     for obj in subs:
-        restart_result = restart_result & subscribe(obj)
+        client.subscribe(obj, resumed)
     return restart_result
 
 
@@ -202,14 +329,131 @@ class UserMqtt:
     broker_port             = ''
     broker_user             = ''
     broker_pwd              = ''
+    clean_session           = True
+    retain_states           = False
+    keepalive               = 0
     subscriptions           = []
     mqtt_client             = None
+    # dispatch table of the subscriptions, key is the topic as bytes
+    _topic_map              = None
+    # number of subscriptions of each topic and the topics waiting for the
+    # next subscribe packet
+    _sub_topics             = None
+    _pending_subs           = None
+    # subscriptions with coalesced messages waiting for their handler
+    _coalesced              = None
     subs_cb                 = None
     _DISCONNECTED           = 0
     _CONNECTED              = 1
     _CONNECTION_DISTURBED   = 2
+    _DISCONNECTED_WAIT_TIME = 1000
+    _TX_BUF_SIZE            = 1024
+    _PUBLISH_QOS0           = 0x30
+    _PUBLISH_QOS1           = 0x32
+    _PUBACK                 = 0x40
+    _RETAIN                 = 0x01
+    _PINGRESP               = 0xd0
+    _PINGREQ                = b'\xc0\x00'
+    _SUBSCRIBE              = 0x82
+    _SUBACK                 = 0x90
+    _SUBACK_FAILURE         = 0x80
+    _PUBLISH_MASK           = 0xf0
+    # io worker thread mode, ring buffer sizes
+    _TX_RING_SLOTS          = 4
+    _RX_RING_SLOTS          = 8
+    _RX_SLOT_SIZE           = 512
+    _WORKER_POLL_TIME       = 10
+    # reconnect backoff, the delay doubles with every failed attempt and gets
+    # up to a quarter random jitter, so the devices don't reconnect in lockstep
+    _RECONNECT_MIN_TIME     = 1000
+    _RECONNECT_MAX_TIME     = 60000
+    # the cached broker address is resolved again after these failed attempts
+    _RESOLVE_FAIL_LIMIT     = 5
+    # timeout of a connection attempt, shorter than the watchdog timeout
+    _CONNECT_TIMEOUT        = 5000
+    # offline publication queue, after the reconnect the queue is written in
+    # bursts of messages with a minimum period between the bursts
+    # the slots fit the skill state messages, larger state messages are
+    # written directly once connected
+    _QUEUE_SLOTS            = 16
+    _QUEUE_SLOT_SIZE        = 256
+    _QUEUE_EVENT_LIMIT      = 8
+    _QUEUE_BURST            = 4
+    _QUEUE_PERIOD           = 100
+    # default budget of the incoming messages processed per cycle, the socket
+    # is read until it is empty or the budget is used up
+    _RX_MAX_MSGS            = 16
+    _RX_MAX_TIME            = 20
+    # QoS 1 in-flight window, unacknowledged packets are sent again after the
+    # timeout and dropped after the retransmits
+    _INFLIGHT_SLOTS         = 4
+    _INFLIGHT_SLOT_SIZE     = 160
+    _INFLIGHT_TIMEOUT       = 5000
+    _INFLIGHT_RETRIES       = 3
+    # QoS 1 publications waiting for a free in-flight slot are queued apart,
+    # the QoS 0 publications don't wait behind them, the slots fit the packets
+    # of the in-flight window
+    _QOS1_QUEUE_SLOTS       = 8
+    _QOS1_QUEUE_EVENT_LIMIT = 4
+    # a ping is sent every half keepalive time, the connection is lost if the
+    # response is missing after the timeout
+    _PING_TIMEOUT           = 10000
+    _RTT_WINDOW             = 8
 
     _connection_status      = _DISCONNECTED
+    _poller                 = None
+    _poller_sock            = None
+    # transmit buffer of the encoded publish packets until the next flush
+    _tx_buf                 = None
+    _tx_mv                  = None
+    _tx_len                 = 0
+    _worker                 = False
+    _connect_timeout_supported = True
+    _tx_ring                = None
+    _rx_ring                = None
+    _worker_task_ref        = None
+    # transmit entries dropped by the skill loop and by the worker thread,
+    # each counter has a single writer
+    _tx_dropped             = 0
+    _tx_lost                = 0
+    _tx_lost_seen           = 0
+    # connects of the worker thread, the skill loop resumes the session
+    _resume_cnt             = 0
+    _resume_seen            = 0
+    # reconnect state machine and statistics
+    _broker_addr            = None
+    _offline                = False
+    _offline_start          = 0
+    _next_reconnect         = 0
+    _reconnect_delay        = 0
+    _reconnect_cnt          = 0
+    _reconnect_fails        = 0
+    _consecutive_fails      = 0
+    _offline_time           = 0
+    _last_offline_time      = 0
+    _pub_queue              = None
+    _qos1_queue             = None
+    _next_queue_burst       = 0
+    # receive budget and statistics
+    _rx_max_msgs            = _RX_MAX_MSGS
+    _rx_max_time            = _RX_MAX_TIME
+    _rx_last                = 0
+    _rx_peak                = 0
+    _rx_limited             = 0
+    _rx_backlog             = 0
+    # time stamp of the last receive cycle which emptied the socket
+    _rx_idle_time           = 0
+    _inflight               = None
+    _session_present        = False
+    # keepalive ping state and the round trip times of the last pings
+    _ping_period            = 0
+    _ping_time              = 0
+    _ping_pending           = False
+    _ping_fails             = 0
+    _rtt_times              = None
+    _rtt_index              = 0
+    _rtt_count              = 0
+    _rtt_res                = 0
 
     ############################################################################
     # Member Functions
@@ -220,19 +464,62 @@ class UserMqtt:
     # @param    broker_port     broker ip port
     # @param    user_account    broker user identifier
     # @param    user_pwd        broker user password
+    # @param    clean_session   False to keep the session of the client id on
+    #                           the broker from the first connection on,
+    #                           reconnects never clean the session
+    # @param    retain_states   True to publish the state topics retained
+    # @param    keepalive       keepalive time in seconds, 0 disables the pings
     # @return   none
     ############################################################################
     def __init__(self, client_id, broker_ip, broker_port, user_account,
-                    user_pwd):
+                    user_pwd, clean_session=True, retain_states=False,
+                    keepalive=0):
         self.client_id = client_id
         self.broker_ip = broker_ip
         self.broker_port = broker_port
         self.broker_user = user_account
         self.broker_pwd = user_pwd
+        self.clean_session = clean_session
+        self.retain_states = retain_states
+        self.keepalive = keepalive
+        self._session_present = False
         self.mqtt_client = MQTTClient(self.client_id, self.broker_ip,
                                         self.broker_port, self.broker_user,
-                                        self.broker_pwd)
+                                        self.broker_pwd, keepalive)
+        self._ping_period = keepalive * 500
+        self._ping_pending = False
+        self._ping_fails = 0
+        self._rtt_times = [0] * self._RTT_WINDOW
+        self._rtt_index = 0
+        self._rtt_count = 0
+        self._rtt_res = 0
         self._connection_status = self._DISCONNECTED
+        self.subscriptions = []
+        self._topic_map = TopicMap()
+        self._sub_topics = {}
+        self._pending_subs = []
+        self._coalesced = []
+        self._tx_buf = bytearray(self._TX_BUF_SIZE)
+        self._tx_mv = memoryview(self._tx_buf)
+        self._tx_len = 0
+        self._pub_queue = pub_queue.PubQueue(self._QUEUE_SLOTS, self._QUEUE_SLOT_SIZE,
+                                                self._QUEUE_EVENT_LIMIT)
+        self._qos1_queue = pub_queue.PubQueue(self._QOS1_QUEUE_SLOTS, self._INFLIGHT_SLOT_SIZE,
+                                                self._QOS1_QUEUE_EVENT_LIMIT)
+        self._rx_max_msgs = self._RX_MAX_MSGS
+        self._rx_max_time = self._RX_MAX_TIME
+        self._inflight = InflightWindow(self._INFLIGHT_SLOTS, self._INFLIGHT_SLOT_SIZE,
+                                        self._INFLIGHT_TIMEOUT, self._INFLIGHT_RETRIES)
+
+    ############################################################################
+    # @brief    Sets the budget of the incoming message processing per cycle
+    # @param    max_msgs    maximum number of messages processed per cycle
+    # @param    max_time    maximum time in ms spent per cycle
+    # @return   None
+    ############################################################################
+    def set_receive_budget(self, max_msgs, max_time):
+        self._rx_max_msgs = max(max_msgs, 1)
+        self._rx_max_time = max_time
 
     ############################################################################
     # @brief    Connects the configured client with the mqtt broker
@@ -240,8 +527,10 @@ class UserMqtt:
     ############################################################################
     def connect(self):
         try:
-            self.mqtt_client.connect()
+            self._resolve_broker()
+            self._session_present = self._connect_client(self.clean_session)
             self._connection_status = self._CONNECTED
+            self._resume_session()
         except MQTTException:
             T.trace(__name__, T.ERROR, 'MQTTException:UserMqtt:connect')
             self._connection_status = self._CONNECTION_DISTURBED
@@ -273,38 +562,457 @@ class UserMqtt:
 
     ############################################################################
     # @brief    This function publishes a MQTT message if the client is
-    #           connected to a broker
+    #           connected to a broker. The message is encoded into the transmit
+    #           buffer and written with the next flush. While the connection is
+    #           disturbed or older messages of the same QoS level are queued,
+    #           the message is queued.
+    #           A state message larger than a queue slot is written directly
+    #           once connected, its order only matters for events.
     # @param    topic   topic identifier of the messsage
     # @param    payload   payload of the message
+    # @param    event   True if the message is an event, else it is a state
+    # @param    qos     quality of service level 0 or 1
+    # @param    retain  True if the message is a skill state to be retained,
+    #                   it is only retained if retain_states is set
+    # @return   True if the message was sent or queued, False if it was dropped
+    ############################################################################
+    def publish(self, topic, payload, event=False, qos=0, retain=False):
+        if self._connection_status == self._DISCONNECTED:
+            return False
+        queue = self._pub_queue
+        other_queue = self._qos1_queue
+        if qos != 0:
+            queue = self._qos1_queue
+            other_queue = self._pub_queue
+        oversized = queue.is_oversized(topic, payload)
+        if ((self._connection_status == self._CONNECTED) and self._is_tx_ready()
+            and (queue.is_empty() or (oversized and not event))):
+            # a queued older state of the topic must not follow
+            self._pub_queue.discard_state(topic)
+            self._qos1_queue.discard_state(topic)
+            retain = self.retain_states and retain
+            if qos == 0:
+                return self._encode_message(topic, payload, retain)
+            if self._publish_qos1(topic, payload, retain):
+                return True
+        # the message waits for the connection or a free in-flight slot
+        kind = pub_queue.STATE
+        if event:
+            kind = pub_queue.EVENT
+        else:
+            other_queue.discard_state(topic)
+        if not queue.put(kind, topic, payload, retain):
+            if oversized:
+                T.trace(__name__, T.WARNING, 'UserMqtt:publish -> message too large for the queue, message dropped')
+            else:
+                T.trace(__name__, T.WARNING, 'UserMqtt:publish -> queue full, message dropped')
+            return False
+        return True
+
+    ############################################################################
+    # @brief    Encodes a QoS 1 message into a slot of the in-flight window and
+    #           adds it to the transmit buffer, the slot is kept until the
+    #           broker acknowledges the packet
+    # @param    topic   topic identifier of the messsage as bytes
+    # @param    payload   payload of the message as bytes
+    # @param    retain  True to publish the message retained
+    # @return   True if the message was handled, False if the window is full
+    ############################################################################
+    def _publish_qos1(self, topic, payload, retain=False):
+        i = self._inflight.get_free_slot()
+        if i == None:
+            return False
+        pid = self._get_next_pid()
+        header = self._PUBLISH_QOS1
+        if retain:
+            header = header | self._RETAIN
+        length = self._encode_packet(self._inflight.get_buffer(i), 0, header,
+                                        topic, pid, payload)
+        if length == 0:
+            T.trace(__name__, T.ERROR, 'UserMqtt:publish -> QoS 1 message too large')
+            return True
+        self._append_packet(self._inflight.commit(i, pid, length))
+        return True
+
+    ############################################################################
+    # @brief    Adds the due retransmits of the in-flight window to the
+    #           transmit buffer
     # @return   None
     ############################################################################
-    def publish(self, topic, payload):
-        if self._connection_status == self._CONNECTED:
+    def _retransmit_task(self):
+        if (self._connection_status != self._CONNECTED) or (self._inflight.get_count() == 0) \
+            or (not self._is_tx_ready()):
+            return
+        packet = self._inflight.get_due_packet(time.ticks_ms())
+        while packet != None:
+            T.trace(__name__, T.DEBUG, 'UserMqtt -> QoS 1 retransmit')
+            self._append_packet(packet)
+            packet = self._inflight.get_due_packet(time.ticks_ms())
+
+    ############################################################################
+    # @brief    Copies an encoded packet into the transmit buffer, the buffer
+    #           is written before if it is too full. The packet is dropped if
+    #           the tx ring of the worker thread keeps the buffer full.
+    # @param    packet  encoded packet, not larger than the transmit buffer
+    # @return   None
+    ############################################################################
+    def _append_packet(self, packet):
+        length = len(packet)
+        if not self._reserve_tx(length):
+            self._drop_tx()
+            return
+        self._tx_mv[self._tx_len:self._tx_len + length] = packet
+        self._tx_len = self._tx_len + length
+
+    ############################################################################
+    # @brief    Makes room for a packet in the transmit buffer, the buffer is
+    #           written if the packet doesn't fit anymore
+    # @param    length  length of the packet
+    # @return   True if the packet fits, False if the buffer is kept full
+    ############################################################################
+    def _reserve_tx(self, length):
+        if self._tx_len + length > self._TX_BUF_SIZE:
+            self._write_tx()
+        return self._tx_len + length <= self._TX_BUF_SIZE
+
+    ############################################################################
+    # @brief    Checks if the transmit buffer can be handed over, in the io
+    #           worker mode the tx ring needs a free slot
+    # @return   True if new packets can be written, else False
+    ############################################################################
+    def _is_tx_ready(self):
+        return (not self._worker) or (not self._tx_ring.is_full())
+
+    ############################################################################
+    # @brief    Counts and traces a packet dropped by a full tx ring
+    # @return   None
+    ############################################################################
+    def _drop_tx(self):
+        self._tx_dropped = self._tx_dropped + 1
+        T.trace(__name__, T.WARNING, 'UserMqtt -> tx ring full, packet dropped')
+
+    ############################################################################
+    # @brief    Encodes a message into the transmit buffer, the buffer is
+    #           flushed if it is full
+    # @param    topic   topic identifier of the messsage
+    # @param    payload   payload of the message
+    # @param    retain  True to publish the message retained
+    # @return   True if the message was encoded or written, else False
+    ############################################################################
+    def _encode_message(self, topic, payload, retain=False):
+        if self._encode_publish(topic, payload, retain):
+            return True
+        self._write_tx()
+        if self._encode_publish(topic, payload, retain):
+            return True
+        if self._tx_len > 0:
+            # the tx ring of the worker thread keeps the buffer
+            self._drop_tx()
+            return False
+        # message exceeds the transmit buffer
+        return self._publish_direct(topic, payload, retain)
+
+    ############################################################################
+    # @brief    Writes the pending subscriptions, the due retransmits, a burst
+    #           of queued messages and all buffered publish packets in one
+    #           socket write
+    # @return   None
+    ############################################################################
+    def flush(self):
+        self._send_subscribe()
+        self._retransmit_task()
+        self._drain_queue()
+        self._write_tx()
+
+    ############################################################################
+    # @brief    Writes the transmit buffer to the socket. In the io worker mode
+    #           the buffer is handed over through the tx ring, it is kept
+    #           while the ring is full.
+    # @return   None
+    ############################################################################
+    def _write_tx(self):
+        if self._tx_len == 0:
+            return
+        if self._worker:
+            # the worker thread writes the packets to the socket
+            if not self._tx_ring.put(0, self._tx_mv[:self._tx_len]):
+                T.trace(__name__, T.DEBUG, 'UserMqtt -> tx ring full, buffer kept')
+                return
+        elif self._connection_status == self._CONNECTED:
             try:
-                self.mqtt_client.publish(topic, payload)
+                # the length argument avoids a memoryview object per flush
+                self.mqtt_client.sock.write(self._tx_buf, self._tx_len)
             except BaseException:
-                T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:publish')
+                T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:flush')
                 self._connection_status = self._CONNECTION_DISTURBED
+                self._tx_lost = self._tx_lost + 1
+        self._tx_len = 0
+
+    ############################################################################
+    # @brief    Encodes a burst of the queued messages into the transmit buffer
+    #           once the connection is established, the bursts are limited in
+    #           size and rate to not flood the broker after a reconnect
+    # @return   None
+    ############################################################################
+    def _drain_queue(self):
+        if (self._pub_queue.is_empty() and self._qos1_queue.is_empty()) \
+            or (self._connection_status != self._CONNECTED):
+            return
+        # the messages stay queued until the worker thread takes the buffer
+        if not self._is_tx_ready():
+            return
+        current_time = time.ticks_ms()
+        if time.ticks_diff(current_time, self._next_queue_burst) < 0:
+            return
+        self._next_queue_burst = time.ticks_add(current_time, self._QUEUE_PERIOD)
+
+        burst = self._QUEUE_BURST
+        while burst > 0:
+            entry = self._qos1_queue.peek()
+            if entry == None:
+                break
+            if entry[0] != pub_queue.DISCARDED:
+                retain = self.retain_states and self._qos1_queue.get_retain()
+                if not self._publish_qos1(entry[1], entry[2], retain):
+                    # the in-flight window is full, the order is kept
+                    break
+                burst = burst - 1
+            self._qos1_queue.pop()
+
+        while burst > 0:
+            entry = self._pub_queue.peek()
+            if entry == None:
+                break
+            if entry[0] != pub_queue.DISCARDED:
+                retain = self.retain_states and self._pub_queue.get_retain()
+                self._encode_message(entry[1], entry[2], retain)
+                burst = burst - 1
+            self._pub_queue.pop()
+
+    ############################################################################
+    # @brief    Encodes a QoS 0 publish packet into the transmit buffer
+    # @param    topic   topic identifier of the messsage as bytes
+    # @param    payload   payload of the message as bytes
+    # @param    retain  True to publish the message retained
+    # @return   True if the packet was added, False if the buffer is too small
+    ############################################################################
+    def _encode_publish(self, topic, payload, retain=False):
+        header = self._PUBLISH_QOS0
+        if retain:
+            header = header | self._RETAIN
+        pos = self._encode_packet(self._tx_mv, self._tx_len, header,
+                                    topic, 0, payload)
+        if pos == 0:
+            return False
+        self._tx_len = pos
+        return True
+
+    ############################################################################
+    # @brief    Encodes a publish packet into a buffer
+    # @param    buf     memoryview of the buffer
+    # @param    pos     position of the packet in the buffer
+    # @param    header  fixed header byte of the packet
+    # @param    topic   topic identifier of the messsage as bytes
+    # @param    pid     packet identifier, 0 for QoS 0 packets without it
+    # @param    payload   payload of the message as bytes
+    # @return   position after the packet, 0 if the buffer is too small
+    ############################################################################
+    def _encode_packet(self, buf, pos, header, topic, pid, payload):
+        size = 2 + len(topic) + len(payload)
+        if pid != 0:
+            size = size + 2
+        # fixed header byte, up to 4 length bytes, variable header and payload
+        if pos + 5 + size > len(buf):
+            return 0
+
+        buf[pos] = header
+        pos = self._encode_length(buf, pos + 1, size)
+        buf[pos] = len(topic) >> 8
+        buf[pos + 1] = len(topic) & 0xff
+        pos = pos + 2
+        buf[pos:pos + len(topic)] = topic
+        pos = pos + len(topic)
+        if pid != 0:
+            buf[pos] = pid >> 8
+            buf[pos + 1] = pid & 0xff
+            pos = pos + 2
+        buf[pos:pos + len(payload)] = payload
+        return pos + len(payload)
+
+    ############################################################################
+    # @brief    Encodes the remaining length field of a packet
+    # @param    buf     buffer to encode the length into
+    # @param    pos     position of the length field
+    # @param    size    remaining length of the packet
+    # @return   position after the length field
+    ############################################################################
+    def _encode_length(self, buf, pos, size):
+        while size > 0x7f:
+            buf[pos] = (size & 0x7f) | 0x80
+            size = size >> 7
+            pos = pos + 1
+        buf[pos] = size
+        return pos + 1
+
+    ############################################################################
+    # @brief    Encodes the pending topics into subscribe packets in the
+    #           transmit buffer, the topics of a cycle share one packet as long
+    #           as it fits into the buffer. The subscribe acknowledge is
+    #           processed in the receive path.
+    # @return   None
+    ############################################################################
+    def _send_subscribe(self):
+        if (len(self._pending_subs) == 0) or (self._connection_status != self._CONNECTED):
+            return
+
+        while len(self._pending_subs) > 0:
+            # packet identifier, topic filters with length and QoS 0
+            count = 0
+            size = 2
+            for topic in self._pending_subs:
+                if (count > 0) and (5 + size + 3 + len(topic) > self._TX_BUF_SIZE):
+                    break
+                size = size + 3 + len(topic)
+                count = count + 1
+            if 5 + size > self._TX_BUF_SIZE:
+                T.trace(__name__, T.ERROR, 'UserMqtt -> topic too large to subscribe')
+                self._pending_subs.pop(0)
+                continue
+            if not self._reserve_tx(5 + size):
+                # the topics wait for a free slot of the tx ring
+                return
+            self._encode_subscribe(count, size)
+            T.trace(__name__, T.DEBUG, 'subscribed to ' + str(count) + ' topics')
+
+    ############################################################################
+    # @brief    Encodes the first pending topics into a subscribe packet in the
+    #           transmit buffer and removes them from the pending topics
+    # @param    count   number of topics
+    # @param    size    remaining length of the packet
+    # @return   None
+    ############################################################################
+    def _encode_subscribe(self, count, size):
+        buf = self._tx_mv
+        buf[self._tx_len] = self._SUBSCRIBE
+        pos = self._encode_length(buf, self._tx_len + 1, size)
+        pid = self._get_next_pid()
+        buf[pos] = pid >> 8
+        buf[pos + 1] = pid & 0xff
+        pos = pos + 2
+        for i in range(count):
+            topic = self._pending_subs.pop(0)
+            buf[pos] = len(topic) >> 8
+            buf[pos + 1] = len(topic) & 0xff
+            pos = pos + 2
+            buf[pos:pos + len(topic)] = topic
+            pos = pos + len(topic)
+            buf[pos] = 0
+            pos = pos + 1
+        self._tx_len = pos
+
+    ############################################################################
+    # @brief    Returns the next packet identifier, identifiers of packets in
+    #           flight are skipped. Only the skill loop allocates identifiers,
+    #           also in the io worker mode.
+    # @return   packet identifier
+    ############################################################################
+    def _get_next_pid(self):
+        pid = (self.mqtt_client.pid % 0xffff) + 1
+        while self._inflight.is_in_flight(pid):
+            pid = (pid % 0xffff) + 1
+        self.mqtt_client.pid = pid
+        return pid
+
+    ############################################################################
+    # @brief    Restarts the keepalive after a connect and resumes the
+    #           publications and subscriptions. A connect of the worker thread
+    #           is only counted, the skill loop resumes the session then.
+    # @return   none
+    ############################################################################
+    def _resume_session(self):
+        if self._session_present:
+            T.trace(__name__, T.INFO, 'UserMqtt -> broker session resumed')
+        self._ping_pending = False
+        self._ping_time = time.ticks_ms()
+        if self._worker:
+            self._resume_cnt = self._resume_cnt + 1
+        else:
+            self._resume_transfers()
+
+    ############################################################################
+    # @brief    Resumes the publications and subscriptions after a connect,
+    #           executed in the skill loop. If the broker kept the session, it
+    #           still holds the subscriptions and only the topics never sent
+    #           are subscribed, unless transmit data was lost since the last
+    #           connect.
+    # @return   none
+    ############################################################################
+    def _resume_transfers(self):
+        lost = self._tx_lost != self._tx_lost_seen
+        self._tx_lost_seen = self._tx_lost
+        if lost or not self._session_present:
+            self._resubscribe_all()
+        self._inflight.set_all_due()
+
+    ############################################################################
+    # @brief    Checks if the broker resumed the session at the last connect
+    # @return   True if the session was resumed, else False
+    ############################################################################
+    def is_session_present(self):
+        return self._session_present
+
+    ############################################################################
+    # @brief    Marks all registered topics for the next subscribe packet,
+    #           called after the broker connection was established
+    # @return   none
+    ############################################################################
+    def _resubscribe_all(self):
+        for topic in self._sub_topics:
+            if topic not in self._pending_subs:
+                self._pending_subs.append(topic)
+
+    ############################################################################
+    # @brief    Publishes a MQTT message directly via the mqtt client
+    # @param    topic   topic identifier of the messsage
+    # @param    payload   payload of the message
+    # @param    retain  True to publish the message retained
+    # @return   True if the message was written, else False
+    ############################################################################
+    def _publish_direct(self, topic, payload, retain=False):
+        if self._worker:
+            T.trace(__name__, T.ERROR, 'UserMqtt:publish -> message too large')
+            return False
+        try:
+            self.mqtt_client.publish(topic, payload, retain)
+            return True
+        except BaseException:
+            T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:publish')
+            self._connection_status = self._CONNECTION_DISTURBED
+            return False
 
     ############################################################################
     # @brief    This function subscribes for a topic message and registers a
     #           callback function
     # @param    user_subs   user subscription object including the topic and
     #                       callback
+    # @param    resumed     True if the resumed broker session holds the
+    #                       subscription, it is not sent again then
     # @return   None
     ############################################################################
-    def subscribe(self, user_subs):
-        # append each subscription independent of the connection state
+    def subscribe(self, user_subs, resumed=False):
+        # register each subscription once, independent of the connection state
+        if user_subs in self.subscriptions:
+            return
         self.subscriptions.append(user_subs)
-        if self._connection_status == self._CONNECTED:
-            try:
-                self.mqtt_client.subscribe(user_subs.topic)
-            except MQTTException:
-                T.trace(__name__, T.ERROR, 'MQTTException:UserMqtt:subscribe')
-                self._connection_status = self._CONNECTION_DISTURBED
-            except BaseException:
-                T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:subscribe')
-                self._connection_status = self._CONNECTION_DISTURBED
+        self._topic_map.add(user_subs.byte_topic, user_subs)
+
+        # the topic is sent with the next flush, together with the other topics
+        # subscribed in the same cycle
+        topic = user_subs.byte_topic
+        count = self._sub_topics.get(topic, 0)
+        self._sub_topics[topic] = count + 1
+        if (count == 0) and not resumed:
+            self._pending_subs.append(topic)
 
     ############################################################################
     # @brief    This function unsubscribes for a topic message
@@ -313,21 +1021,95 @@ class UserMqtt:
     # @return   none
     ############################################################################
     def unsubscribe(self, user_subs):
-        for obj in self.subscriptions:
-            if user_subs.topic == obj.topic:
-                self.subscriptions.remove(obj)
+        for obj in [obj for obj in self.subscriptions if user_subs.topic == obj.topic]:
+            self.subscriptions.remove(obj)
+            self._topic_map.remove(obj.byte_topic, obj)
+            if obj in self._coalesced:
+                self._coalesced.remove(obj)
+            topic = obj.byte_topic
+            count = self._sub_topics.get(topic, 0) - 1
+            if count > 0:
+                self._sub_topics[topic] = count
+            elif topic in self._sub_topics:
+                del self._sub_topics[topic]
+                if topic in self._pending_subs:
+                    self._pending_subs.remove(topic)
 
     ############################################################################
-    # @brief    This function subscribes for a topic message and registers a
-    #           callback function
-    # @param    topic   topic identifier of the messsage
-    # @param    cb_func callback function when topic arrives
+    # @brief    This function passes an incoming message to the handlers of
+    #           the matching subscriptions, the topic is looked up in the
+    #           dispatch table
+    # @param    topic   topic identifier of the messsage as bytes
+    # @param    payload payload of the message as bytes
     # @return   none
     ############################################################################
     def check_subscriptions(self, topic, payload):
-        for obj in self.subscriptions:
-            if topic == obj.topic:
+        subs = self._topic_map.match(topic)
+        if len(subs) == 0:
+            return
+        # the strings are only decoded if a subscription requires them
+        topic_string = None
+        payload_string = None
+        if T.is_enabled(__name__, T.DEBUG):
+            topic_string = topic.decode('utf-8')
+            payload_string = payload.decode('utf-8')
+            T.trace(__name__, T.DEBUG, 'Topic received:' + topic_string)
+            T.trace(__name__, T.DEBUG, 'Data received:' + payload_string)
+        for obj in subs:
+            prof = obj.abs_skill.get_subs_profile()
+            prof.start()
+            if obj.raw:
                 obj.callback_on_arrived_topic(topic, payload)
+            else:
+                if topic_string == None:
+                    topic_string = topic.decode('utf-8')
+                    payload_string = payload.decode('utf-8')
+                obj.callback_on_arrived_topic(topic_string, payload_string)
+            prof.stop()
+            if obj.is_pending() and (obj not in self._coalesced):
+                self._coalesced.append(obj)
+
+    ############################################################################
+    # @brief    Passes the coalesced messages to their handlers, once per cycle
+    #           and subscription and limited by the minimum apply period of
+    #           the subscription
+    # @return   none
+    ############################################################################
+    def _apply_coalesced(self):
+        if len(self._coalesced) == 0:
+            return
+        current_time = time.ticks_ms()
+        i = 0
+        while i < len(self._coalesced):
+            obj = self._coalesced[i]
+            prof = obj.abs_skill.get_subs_profile()
+            prof.start()
+            try:
+                done = obj.apply_pending(current_time)
+            finally:
+                prof.stop()
+            if done:
+                self._coalesced.pop(i)
+            else:
+                i = i + 1
+
+    ############################################################################
+    # @brief    Returns the time until the next action of the client, the next
+    #           keepalive ping or the next apply of a coalesced message
+    # @return   time in ms or None if no action is scheduled
+    ############################################################################
+    def get_idle_time(self):
+        idle_time = None
+        if (self._ping_period != 0) and (not self._worker) and \
+            (self._connection_status == self._CONNECTED):
+            idle_time = self._get_keepalive_wait()
+        if len(self._coalesced) > 0:
+            current_time = time.ticks_ms()
+            for obj in self._coalesced:
+                wait_time = obj.get_apply_wait(current_time)
+                if (idle_time == None) or (wait_time < idle_time):
+                    idle_time = wait_time
+        return idle_time
 
     ############################################################################
     # @brief    This function returns all subscriptions to a new list
@@ -355,15 +1137,183 @@ class UserMqtt:
     ############################################################################
     def mqtt_cyclic_task(self):
         mqtt_status = True
-        if self._connection_status == self._CONNECTED:
+        if self._worker:
+            self._process_worker_msgs()
+        elif self._connection_status == self._CONNECTED:
             mqtt_status = mqtt_status & self._check_non_blocking_for_msg()
+            self._keepalive_task()
         elif self._connection_status == self._CONNECTION_DISTURBED:
-            for i in range(5):
-                mqtt_status = mqtt_status & self._reconnect()
-                sleep(i)
+            self._reconnect_task()
+        self._apply_coalesced()
         # future return value to trigger a restart of the system
         return True
 
+    ############################################################################
+    # @brief    Checks without blocking if data is pending on the mqtt socket
+    # @return   True if data is pending, else False
+    ############################################################################
+    def is_msg_pending(self):
+        if self._worker:
+            return not self._rx_ring.is_empty()
+        if self._connection_status != self._CONNECTED:
+            return False
+        try:
+            # the socket changes on every (re)connect of the client
+            if self._poller_sock != self.mqtt_client.sock:
+                self._poller = select.poll()
+                self._poller.register(self.mqtt_client.sock, select.POLLIN)
+                self._poller_sock = self.mqtt_client.sock
+            return len(self._poller.poll(0)) > 0
+        except BaseException:
+            T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:is_msg_pending')
+            return False
+
+    ############################################################################
+    # @brief    MQTT cyclic task for the uasyncio runtime mode. The socket is
+    #           awaited for readability and the reconnect delays are awaited,
+    #           so other tasks keep running.
+    # @return   none
+    ############################################################################
+    async def mqtt_cyclic_task_async(self):
+        import uasyncio as asyncio
+        if self._worker:
+            self._process_worker_msgs()
+            await asyncio.sleep_ms(self._WORKER_POLL_TIME)
+        elif self._connection_status == self._CONNECTED:
+            wait_time = self.get_idle_time()
+            if wait_time == None:
+                await self._wait_for_readable()
+            else:
+                # the wait ends in time for the next keepalive action or the
+                # next apply of a coalesced message
+                try:
+                    await asyncio.wait_for_ms(self._wait_for_readable(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            self._check_non_blocking_for_msg()
+            self._keepalive_task()
+        elif self._connection_status == self._CONNECTION_DISTURBED:
+            if not self._reconnect_task():
+                wait_time = time.ticks_diff(self._next_reconnect, time.ticks_ms())
+                idle_time = self.get_idle_time()
+                if idle_time != None:
+                    wait_time = min(wait_time, idle_time)
+                await asyncio.sleep_ms(max(wait_time, 0))
+        else:
+            await asyncio.sleep_ms(self._DISCONNECTED_WAIT_TIME)
+        self._apply_coalesced()
+
+    ############################################################################
+    # @brief    Hands the socket I/O over to the io worker thread. The skill
+    #           loop exchanges the messages with the worker via ring buffers.
+    # @return   none
+    ############################################################################
+    def attach_worker(self):
+        if self._worker:
+            return
+        self._tx_ring = io_worker.RingBuffer(self._TX_RING_SLOTS, self._TX_BUF_SIZE)
+        self._rx_ring = io_worker.RingBuffer(self._RX_RING_SLOTS, self._RX_SLOT_SIZE)
+        self.mqtt_client.set_callback(self._worker_rx_cb)
+        self._worker = True
+        # the same bound method object is required to remove the task
+        self._worker_task_ref = self._worker_task
+        io_worker.add_task(self._worker_task_ref)
+        T.trace(__name__, T.INFO, 'UserMqtt -> socket I/O in io worker')
+
+    ############################################################################
+    # @brief    Takes the socket I/O back from the io worker thread, pending
+    #           transmit entries are written before
+    # @return   none
+    ############################################################################
+    def detach_worker(self):
+        if not self._worker:
+            return
+        io_worker.remove_task(self._worker_task_ref)
+        self._worker_transmit()
+        self._process_worker_msgs()
+        self._worker = False
+        self.mqtt_client.set_callback(self.subs_cb)
+
+    ############################################################################
+    # @brief    Resumes the session after a connect of the worker thread and
+    #           delivers the messages received by the worker thread to the
+    #           subscription callback, executed in the skill loop
+    # @return   none
+    ############################################################################
+    def _process_worker_msgs(self):
+        if self._resume_seen != self._resume_cnt:
+            self._resume_seen = self._resume_cnt
+            self._resume_transfers()
+        entry = self._rx_ring.peek()
+        while entry != None:
+            self.subs_cb(bytes(entry[1]), bytes(entry[2]))
+            self._rx_ring.pop()
+            entry = self._rx_ring.peek()
+
+    ############################################################################
+    # @brief    Receive callback of the mqtt client in the worker thread
+    # @param    topic   topic identifier of the messsage
+    # @param    payload   payload of the message
+    # @return   none
+    ############################################################################
+    def _worker_rx_cb(self, topic, payload):
+        if not self._rx_ring.put(0, topic, payload):
+            T.trace(__name__, T.WARNING, 'UserMqtt -> rx ring full, message dropped')
+
+    ############################################################################
+    # @brief    Cyclic task of the io worker thread, writes the transmit
+    #           entries, receives messages and reconnects the broker
+    # @return   True if the task was busy, else False
+    ############################################################################
+    def _worker_task(self):
+        busy = self._worker_transmit()
+        if self._connection_status == self._CONNECTED:
+            try:
+                if self._receive_burst() > 0:
+                    busy = True
+            except BaseException:
+                T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:_worker_task')
+                self._connection_status = self._CONNECTION_DISTURBED
+            self._keepalive_task()
+        elif self._connection_status == self._CONNECTION_DISTURBED:
+            busy = self._reconnect_task()
+        return busy
+
+    ############################################################################
+    # @brief    Writes the transmit entries of the skill loop to the socket,
+    #           transmit entries are dropped and counted while the connection
+    #           is disturbed
+    # @return   True if any entry was processed, else False
+    ############################################################################
+    def _worker_transmit(self):
+        busy = False
+
+        entry = self._tx_ring.peek()
+        while entry != None:
+            if self._connection_status == self._CONNECTED:
+                try:
+                    self.mqtt_client.sock.write(entry[1])
+                except BaseException:
+                    T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:_worker_transmit')
+                    self._connection_status = self._CONNECTION_DISTURBED
+                    self._tx_lost = self._tx_lost + 1
+            else:
+                self._tx_lost = self._tx_lost + 1
+            self._tx_ring.pop()
+            busy = True
+            entry = self._tx_ring.peek()
+        return busy
+
+    ############################################################################
+    # @brief    Waits until the mqtt socket becomes readable. The uasyncio io
+    #           queue is used the same way the uasyncio stream classes do it,
+    #           without consuming any data from the socket.
+    # @return   none
+    ############################################################################
+    def _wait_for_readable(self):
+        from uasyncio import core
+        yield core._io_queue.queue_read(self.mqtt_client.sock)
+
     ############################################################################
     # @brief    Checks non blocking if any incoming subscriptions need to be
     #           processed
@@ -371,7 +1321,7 @@ class UserMqtt:
     ############################################################################
     def _check_non_blocking_for_msg(self):
         try:
-            self.mqtt_client.check_msg()
+            self._receive_burst()
             return True
         except OSError:
             T.trace(__name__, T.ERROR, 'OSException:UserMqtt:check_non_blocking_for_msg')
@@ -383,14 +1333,356 @@ class UserMqtt:
             return False
 
     ############################################################################
-    # @brief    Tries to reconnect to MQTT broker
+    # @brief    Receives the pending messages until the socket is empty or the
+    #           message or time budget of the cycle is used up
+    # @return   number of received packets
+    ############################################################################
+    def _receive_burst(self):
+        start_time = time.ticks_ms()
+        count = 0
+        while self._receive_msg() != None:
+            count = count + 1
+            if (count >= self._rx_max_msgs) or \
+                (time.ticks_diff(time.ticks_ms(), start_time) >= self._rx_max_time):
+                break
+        else:
+            # the socket is empty
+            self._rx_idle_time = time.ticks_ms()
+            self._rx_backlog = 0
+            self._update_rx_stats(count)
+            return count
+
+        # the budget is used up, further packets may be pending
+        self._rx_limited = self._rx_limited + 1
+        self._rx_backlog = self._rx_backlog + 1
+        self._update_rx_stats(count)
+        return count
+
+    ############################################################################
+    # @brief    Updates the receive statistics after a receive cycle
+    # @param    count   number of received packets of the cycle
+    # @return   none
+    ############################################################################
+    def _update_rx_stats(self, count):
+        self._rx_last = count
+        if count > self._rx_peak:
+            self._rx_peak = count
+
+    ############################################################################
+    # @brief    Receives a message without blocking. The packet type is read
+    #           here instead of the check_msg function of the mqtt client,
+    #           which hides the ping responses.
+    # @return   packet type of the received message or None
+    ############################################################################
+    def _receive_msg(self):
+        sock = self.mqtt_client.sock
+        sock.setblocking(False)
+        res = sock.read(1)
+        sock.setblocking(True)
+        if res == None:
+            return None
+        if res == b'':
+            raise OSError(-1)
+        op = res[0]
+        if (op & self._PUBLISH_MASK) == self._PUBLISH_QOS0:
+            self._receive_publish(op)
+        else:
+            self._handle_control_packet(op)
+        return op
+
+    ############################################################################
+    # @brief    Reads the remaining bytes of a publish packet and passes the
+    #           message to the subscription callback, QoS 1 messages are
+    #           acknowledged
+    # @param    op      fixed header byte of the publish packet
+    # @return   none
+    ############################################################################
+    def _receive_publish(self, op):
+        sock = self.mqtt_client.sock
+        size = self.mqtt_client._recv_len()
+        data = sock.read(2)
+        topic_len = (data[0] << 8) | data[1]
+        topic = sock.read(topic_len)
+        size = size - topic_len - 2
+        pid = 0
+        if op & 0x06:
+            data = sock.read(2)
+            pid = (data[0] << 8) | data[1]
+            size = size - 2
+        msg = sock.read(size)
+        self.mqtt_client.cb(topic, msg)
+        if op & 0x06 == 0x02:
+            sock.write(bytes([self._PUBACK, 2, pid >> 8, pid & 0xff]))
+
+    ############################################################################
+    # @brief    Reads the remaining bytes of a control packet and evaluates
+    #           the subscribe and publish acknowledges
+    # @param    op      packet type of the control packet
+    # @return   none
+    ############################################################################
+    def _handle_control_packet(self, op):
+        size = self.mqtt_client._recv_len()
+        data = b''
+        if size > 0:
+            data = self.mqtt_client.sock.read(size)
+        if op == self._SUBACK:
+            # return codes of the topics follow the packet identifier
+            for code in data[2:]:
+                if code == self._SUBACK_FAILURE:
+                    T.trace(__name__, T.ERROR, 'UserMqtt -> subscription rejected')
+        elif op == self._PUBACK:
+            if len(data) >= 2:
+                self._inflight.ack((data[0] << 8) | data[1])
+        elif op == self._PINGRESP:
+            self._on_ping_response()
+        else:
+            T.trace(__name__, T.DEBUG, 'UserMqtt -> packet ignored: ' + hex(op))
+
+    ############################################################################
+    # @brief    Returns the broker connection statistics
+    # @return   dictionary with the connection state, the number of successful
+    #           and failed reconnects, the total and last offline time in ms
+    #           and the time until the next reconnect attempt in ms, the
+    #           publish queue state with the dropped and the oversized
+    #           messages, the dropped transmit packets and buffers, the
+    #           receive statistics, the QoS 1
+    #           in-flight state and if the broker resumed the session, the
+    #           ping round trip times with the resolution of the last one and
+    #           the lost pings and the applied,
+    #           dropped and failed messages of the coalescing subscriptions
+    ############################################################################
+    def get_connection_stats(self):
+        next_attempt = 0
+        if self._offline:
+            next_attempt = max(time.ticks_diff(self._next_reconnect, time.ticks_ms()), 0)
+        return {
+            'online': int(self._connection_status == self._CONNECTED),
+            'reconnects': self._reconnect_cnt,
+            'fails': self._reconnect_fails,
+            'offline': self._offline_time,
+            'last': self._last_offline_time,
+            'next': next_attempt,
+            'queued': self._pub_queue.get_count() + self._qos1_queue.get_count(),
+            'dropped': self._pub_queue.dropped + self._qos1_queue.dropped,
+            'oversized': self._pub_queue.oversized + self._qos1_queue.oversized,
+            'tx_dropped': self._tx_dropped + self._tx_lost,
+            'rx_last': self._rx_last,
+            'rx_peak': self._rx_peak,
+            'rx_limited': self._rx_limited,
+            'rx_backlog': self._get_rx_backlog(),
+            'inflight': self._inflight.get_count(),
+            'lost': self._inflight.lost,
+            'session': int(self._session_present),
+            'rtt': self._get_last_rtt(),
+            'rtt_avg': self._get_avg_rtt(),
+            'rtt_max': self._get_max_rtt(),
+            'rtt_res': self._rtt_res,
+            'ping_fails': self._ping_fails,
+            'cmd_applied': sum([obj.applied for obj in self.subscriptions if obj.coalesce]),
+            'cmd_dropped': sum([obj.dropped for obj in self.subscriptions if obj.coalesce]),
+            'cmd_errors': sum([obj.errors for obj in self.subscriptions if obj.coalesce]),
+        }
+
+    ############################################################################
+    # @brief    Keepalive task, sends a ping every half keepalive time and
+    #           detects a half open connection by the missing ping response
+    # @return   none
+    ############################################################################
+    def _keepalive_task(self):
+        if (self._ping_period == 0) or (self._connection_status != self._CONNECTED):
+            return
+        current_time = time.ticks_ms()
+        if self._ping_pending:
+            if time.ticks_diff(current_time, self._ping_time) >= self._PING_TIMEOUT:
+                T.trace(__name__, T.WARNING, 'UserMqtt -> ping response missing')
+                self._ping_pending = False
+                self._ping_fails = self._ping_fails + 1
+                self._connection_status = self._CONNECTION_DISTURBED
+        elif time.ticks_diff(current_time, self._ping_time) >= self._ping_period:
+            try:
+                self.mqtt_client.sock.write(self._PINGREQ)
+                self._ping_time = current_time
+                self._ping_pending = True
+            except BaseException:
+                T.trace(__name__, T.ERROR, 'BaseException:UserMqtt:_keepalive_task')
+                self._connection_status = self._CONNECTION_DISTURBED
+
+    ############################################################################
+    # @brief    Returns the time until the next keepalive action
+    # @return   time in ms
+    ############################################################################
+    def _get_keepalive_wait(self):
+        wait_time = self._ping_period
+        if self._ping_pending:
+            wait_time = self._PING_TIMEOUT
+        return max(time.ticks_diff(time.ticks_add(self._ping_time, wait_time),
+                                    time.ticks_ms()), 0)
+
+    ############################################################################
+    # @brief    Stores the round trip time of the answered ping. The response
+    #           is timestamped when it is read from the socket, so the time
+    #           includes the delay until the next receive cycle. The response
+    #           arrived after the last receive cycle which emptied the socket,
+    #           the time since then is kept as resolution of the measurement.
+    # @return   none
+    ############################################################################
+    def _on_ping_response(self):
+        if not self._ping_pending:
+            return
+        self._ping_pending = False
+        current_time = time.ticks_ms()
+        rtt = time.ticks_diff(current_time, self._ping_time)
+        self._rtt_res = rtt
+        if time.ticks_diff(self._rx_idle_time, self._ping_time) > 0:
+            self._rtt_res = time.ticks_diff(current_time, self._rx_idle_time)
+        self._rtt_times[self._rtt_index] = rtt
+        self._rtt_index = (self._rtt_index + 1) % self._RTT_WINDOW
+        if self._rtt_count < self._RTT_WINDOW:
+            self._rtt_count = self._rtt_count + 1
+
+    ############################################################################
+    # @brief    Returns the round trip time of the last answered ping
+    # @return   time in ms, 0 if no ping was answered
+    ############################################################################
+    def _get_last_rtt(self):
+        if self._rtt_count == 0:
+            return 0
+        return self._rtt_times[(self._rtt_index - 1) % self._RTT_WINDOW]
+
+    ############################################################################
+    # @brief    Returns the average round trip time of the window
+    # @return   time in ms, 0 if no ping was answered
+    ############################################################################
+    def _get_avg_rtt(self):
+        if self._rtt_count == 0:
+            return 0
+        return sum(self._rtt_times[0:self._rtt_count]) // self._rtt_count
+
+    ############################################################################
+    # @brief    Returns the maximum round trip time of the window
+    # @return   time in ms, 0 if no ping was answered
+    ############################################################################
+    def _get_max_rtt(self):
+        if self._rtt_count == 0:
+            return 0
+        return max(self._rtt_times[0:self._rtt_count])
+
+    ############################################################################
+    # @brief    Returns the receive backlog depth, the number of received
+    #           messages not yet delivered in worker mode, else the number of
+    #           consecutive receive cycles which ended with the budget used up
+    # @return   backlog depth
+    ############################################################################
+    def _get_rx_backlog(self):
+        if self._worker:
+            return self._rx_ring.get_count()
+        return self._rx_backlog
+
+    ############################################################################
+    # @brief    Reconnect state machine, executes at most one connection
+    #           attempt per call when the attempt is due and schedules the next
+    #           attempt with an exponential backoff
+    # @return   True if a reconnect was successful, else False
+    ############################################################################
+    def _reconnect_task(self):
+        current_time = time.ticks_ms()
+        if not self._offline:
+            T.trace(__name__, T.WARNING, 'UserMqtt -> connection lost')
+            self._offline = True
+            self._offline_start = current_time
+            self._reconnect_delay = self._RECONNECT_MIN_TIME
+            self._next_reconnect = time.ticks_add(current_time,
+                                        self._get_jitter(self._RECONNECT_MIN_TIME))
+        if time.ticks_diff(current_time, self._next_reconnect) < 0:
+            return False
+
+        if self._reconnect():
+            duration = time.ticks_diff(time.ticks_ms(), self._offline_start)
+            self._offline = False
+            self._reconnect_cnt = self._reconnect_cnt + 1
+            self._offline_time = self._offline_time + duration
+            self._last_offline_time = duration
+            self._reconnect_delay = 0
+            return True
+
+        self._reconnect_fails = self._reconnect_fails + 1
+        self._next_reconnect = time.ticks_add(time.ticks_ms(),
+                            self._reconnect_delay + self._get_jitter(self._reconnect_delay))
+        self._reconnect_delay = min(self._reconnect_delay * 2, self._RECONNECT_MAX_TIME)
+        return False
+
+    ############################################################################
+    # @brief    Returns a random jitter of up to a quarter of a delay
+    # @param    delay   delay in ms
+    # @return   jitter in ms
+    ############################################################################
+    def _get_jitter(self, delay):
+        return ((delay >> 2) * random.getrandbits(8)) >> 8
+
+    ############################################################################
+    # @brief    Resolves the broker address once, the mqtt client gets the
+    #           numeric address and skips the lookup on every reconnect
+    # @return   none
+    ############################################################################
+    def _resolve_broker(self):
+        if self._broker_addr != None:
+            return
+        addr = socket.getaddrinfo(self.broker_ip, self.broker_port)[0][-1]
+        self._broker_addr = addr
+        # some ports return the socket address as bytes, the client keeps the
+        # configured host name then
+        if isinstance(addr, tuple):
+            self.mqtt_client.server = addr[0]
+
+    ############################################################################
+    # @brief    Connects the mqtt client with the connect timeout. The timeout
+    #           is supported by umqtt.simple since version 1.4, older versions
+    #           block until the network stack gives up.
+    # @param    clean_session   False to resume the session on the broker
+    # @return   True if the broker resumed the session, else False
+    ############################################################################
+    def _connect_client(self, clean_session):
+        if self._connect_timeout_supported:
+            try:
+                present = self.mqtt_client.connect(clean_session,
+                                                    self._CONNECT_TIMEOUT / 1000)
+                # the socket operations after the connect are not limited
+                self.mqtt_client.sock.settimeout(None)
+                return bool(present)
+            except TypeError:
+                T.trace(__name__, T.WARNING, 'UserMqtt -> connect timeout not supported')
+                self._connect_timeout_supported = False
+        return bool(self.mqtt_client.connect(clean_session))
+
+    ############################################################################
+    # @brief    Tries to reconnect to MQTT broker, the mqtt client object is
+    #           reused and its old socket is closed
     # @return   true if check was successful, false on any connection exception
     ############################################################################
     def _reconnect(self):
         try:
-            self.mqtt_client.connect(False)
+            self.mqtt_client.sock.close()
+        except BaseException:
+            pass
+        if self._consecutive_fails >= self._RESOLVE_FAIL_LIMIT:
+            # the broker may have got a new address
+            self._consecutive_fails = 0
+            self._broker_addr = None
+            self.mqtt_client.server = self.broker_ip
+        self._consecutive_fails = self._consecutive_fails + 1
+
+        # the attempt blocks the skill loop up to the connect timeout, the
+        # io worker thread doesn't block the watchdog feed of the skill loop
+        if (not self._worker) and (_watchdog_cb != None):
+            _watchdog_cb()
+        try:
+            self._resolve_broker()
+            # the session of the first connection is resumed
+            self._session_present = self._connect_client(False)
+            self._consecutive_fails = 0
             T.trace(__name__, T.INFO, 'UserMqtt:_reconnect -> reconnect successful')
             self._connection_status = self._CONNECTED
+            self._resume_session()
             return True
         except OSError:
             T.trace(__name__, T.ERROR, 'OSException:UserMqtt:_reconnect')
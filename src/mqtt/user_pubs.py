@@ -10,22 +10,32 @@
 
 ################################################################################
 # Imports
+import time
+import json
 import src.utils.trace as T
 
 ################################################################################
 # Variables
+# state message modes, the skill state is published per field, as one json
+# message or both
+STATE_MSG_FIELDS = 'fields'
+STATE_MSG_JSON = 'json'
+STATE_MSG_BOTH = 'both'
 
 ################################################################################
 # Functions
 # Variables
 # mqtt publication callback routine
 publish_cb = None
+# mqtt callback routine to write all buffered publications
+flush_cb = None
 
 ################################################################################
 # Functions
 ################################################################################
 # @brief    Set the function for mqtt publications
-# @param    pubs_cp     the publication function
+# @param    pubs_cp     the publication function, returning True if the
+#                       message was sent or queued
 # @return   none
 ################################################################################
 def set_mqtt_publish_cb(pubs_cb):
@@ -33,6 +43,24 @@ def set_mqtt_publish_cb(pubs_cb):
 
     publish_cb = pubs_cb
 
+################################################################################
+# @brief    Set the function to write the buffered mqtt publications
+# @param    pubs_flush_cb     the flush function
+# @return   none
+################################################################################
+def set_mqtt_flush_cb(pubs_flush_cb):
+    global flush_cb
+
+    flush_cb = pubs_flush_cb
+
+################################################################################
+# @brief    Writes all publications buffered since the last call in one burst
+# @return   none
+################################################################################
+def flush_publications():
+    if flush_cb != None:
+        flush_cb()
+
 ################################################################################
 # Classes
 
@@ -44,7 +72,17 @@ class UserPubs:
     ############################################################################
     # Member Attributes
     topic = ''
+    byte_topic = b''
     payload = ''
+    event = False
+    qos = 0
+    retain = True
+    # report by exception policy
+    _on_change = False
+    _deadband = 0
+    _heartbeat = 0
+    _published = False
+    _last_pub_time = 0
 
     ############################################################################
     # Member Functions
@@ -56,24 +94,141 @@ class UserPubs:
     # @param    channel         channel to transfer the topic to
     # @param    skill_entity    skill entity number if multiple instances of a
     #                           skill is used in one deviece
+    # @param    event           True if every publication is an event, else
+    #                           the publication is a state and only its latest
+    #                           payload is kept while the broker is offline
+    # @param    on_change       True to skip payloads identical to the last
+    #                           published one
+    # @param    deadband        numeric payloads are only published if they
+    #                           differ more than the deadband from the last
+    #                           published one, implies on_change
+    # @param    heartbeat       maximum time in ms without publication, an
+    #                           unchanged payload is published after it, 0 for
+    #                           no heartbeat
+    # @param    qos             quality of service level 0 or 1, QoS 1
+    #                           publications are sent again until the broker
+    #                           acknowledges them
+    # @param    retain          True if the payload is a skill state, it is
+    #                           retained if the client retains the states.
+    #                           Events are never retained.
     # @return   none
     ############################################################################
-    def __init__(self, topic, device, channel = 'std', skill_entity=None):
+    def __init__(self, topic, device, channel = 'std', skill_entity=None, event=False,
+                    on_change=False, deadband=0, heartbeat=0, qos=0, retain=True):
         if(None == skill_entity):
             self.topic = channel + "/" + device + "/s/" + topic
         else:
             self.topic = channel + "/" + device + "/s/" +skill_entity +"/"+ topic
+        # the topic is encoded once, not with every publication
+        self.byte_topic = self.topic.encode('utf-8')
         self.payload = ''
+        self.event = event
+        self.qos = qos
+        self.retain = retain and not event
+        self._on_change = on_change or (deadband > 0)
+        self._deadband = deadband
+        self._heartbeat = heartbeat
+        self._published = False
+        self._last_pub_time = 0
 
     ############################################################################
     # @brief    this function publishes the topic specified in the object
-    #           initialization
-    # @return   none
+    #           initialization, unchanged payloads are skipped if a report by
+    #           exception policy is set. The payload only counts as published
+    #           if the mqtt client sent or queued it.
+    # @param    payload     payload of the message
+    # @return   True if the payload was published, else False
     ############################################################################
     def publish(self, payload = ''):
+        current_time = time.ticks_ms()
+        if not self._is_publish_due(payload, current_time):
+            return False
+        if not publish_cb(self.byte_topic, payload, self.event, self.qos, self.retain):
+            return False
         self.payload = payload
-        publish_cb(self.topic, self.payload)
-        T.trace(__name__, T.DEBUG, "published: " + self.topic + " with payload: " + payload)
+        self._published = True
+        self._last_pub_time = current_time
+        if T.is_enabled(__name__, T.DEBUG):
+            T.trace(__name__, T.DEBUG, "published: " + self.topic + " with payload: " + payload)
+        return True
+
+    ############################################################################
+    # @brief    checks the report by exception policy of a payload
+    # @param    payload         payload of the message
+    # @param    current_time    ticks_ms time stamp
+    # @return   True if the payload needs to be published, else False
+    ############################################################################
+    def _is_publish_due(self, payload, current_time):
+        if (not self._on_change) or (not self._published):
+            return True
+        if ((self._heartbeat > 0)
+                and (time.ticks_diff(current_time, self._last_pub_time) >= self._heartbeat)):
+            return True
+        if self._deadband > 0:
+            try:
+                return abs(float(payload) - float(self.payload)) > self._deadband
+            except ValueError:
+                pass
+        return payload != self.payload
+
+################################################################################
+# @brief    This class publishes the complete state of a skill as one json
+#           message on a single topic
+################################################################################
+class StatePubs(UserPubs):
+
+    ############################################################################
+    # Member Attributes
+    _mode = STATE_MSG_FIELDS
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    initializes the state publication object
+    # @param    topic           topic of message
+    # @param    device          mqtt bus defice identificaiton
+    # @param    channel         channel to transfer the topic to
+    # @param    skill_entity    skill entity number if multiple instances of a
+    #                           skill is used in one deviece
+    # @param    mode            state message mode STATE_MSG_FIELDS,
+    #                           STATE_MSG_JSON or STATE_MSG_BOTH
+    # @param    on_change       see UserPubs
+    # @param    heartbeat       see UserPubs
+    # @return   none
+    ############################################################################
+    def __init__(self, topic, device, channel = 'std', skill_entity=None,
+                    mode=STATE_MSG_FIELDS, on_change=False, heartbeat=0):
+        super().__init__(topic, device, channel, skill_entity, on_change=on_change,
+                            heartbeat=heartbeat)
+        if mode not in (STATE_MSG_FIELDS, STATE_MSG_JSON, STATE_MSG_BOTH):
+            T.trace(__name__, T.ERROR, 'unknown state message mode: ' + str(mode))
+            mode = STATE_MSG_FIELDS
+        self._mode = mode
+
+    ############################################################################
+    # @brief    returns if the state is published per field
+    # @return   True if the field topics are published, else False
+    ############################################################################
+    def is_fields_active(self):
+        return self._mode != STATE_MSG_JSON
+
+    ############################################################################
+    # @brief    returns if the state is published as one json message
+    # @return   True if the json message is published, else False
+    ############################################################################
+    def is_state_active(self):
+        return self._mode != STATE_MSG_FIELDS
+
+    ############################################################################
+    # @brief    publishes the state as one json message if the mode requests it
+    # @param    state   dictionary of the state fields
+    # @return   True if the message was published, else False
+    ############################################################################
+    def publish_state(self, state):
+        if not self.is_state_active():
+            return False
+        return self.publish(json.dumps(state))
 
 ################################################################################
 # Scripts
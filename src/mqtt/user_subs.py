@@ -11,6 +11,7 @@
 
 ################################################################################
 # Imports
+import time
 from src.skills.abs_skill import AbstractSkill
 import src.utils.trace as T
 
@@ -57,8 +58,23 @@ class UserSubs:
     ############################################################################
     # Member Attributes
     topic = ''
+    byte_topic = b''
+    # concrete topic of the last received message, without wildcards
+    last_topic = ''
     last_payload = b''
     abs_skill = None
+    handler = None
+    raw = False
+    # latest wins coalescing of the messages and their minimum apply period
+    coalesce = False
+    min_period = 0
+    applied = 0
+    dropped = 0
+    errors = 0
+    _pending = False
+    _pending_topic = None
+    _pending_payload = None
+    _last_apply = 0
 
     ############################################################################
     # Member Functions
@@ -72,15 +88,41 @@ class UserSubs:
     # @param    channel         channel to transfer the topic to
     # @param    skill_entity    skill entity number if multiple instances of a
     #                           skill is used in one deviece
+    # @param    handler         optional handler function of the topic, if not
+    #                           set the execute_subscription function of the
+    #                           skill is called
+    # @param    raw             if True the handler receives topic and payload
+    #                           as received bytes, else as decoded strings
+    # @param    coalesce        if True only the latest message of a cycle is
+    #                           passed to the handler
+    # @param    min_period      minimum time in ms between two handler calls,
+    #                           implies coalesce
     # @return   none
     ############################################################################
-    def __init__(self, abs_skill, topic, device, channel = 'std', skill_entity=None):
+    def __init__(self, abs_skill, topic, device, channel = 'std', skill_entity=None,
+                    handler=None, raw=False, coalesce=False, min_period=0):
         if(None == skill_entity):
             self.topic = channel + "/" + device + "/r/" + topic
         else:
             self.topic = channel + "/" + device + "/r/" +skill_entity +"/"+ topic
+        self.byte_topic = self.topic.encode('utf-8')
+        self.last_topic = ''
         self.last_payload = b''
         self.abs_skill = abs_skill
+        if handler == None:
+            self.handler = abs_skill.execute_subscription
+        else:
+            self.handler = handler
+        self.raw = raw
+        self.coalesce = coalesce or (min_period > 0)
+        self.min_period = min_period
+        self.applied = 0
+        self.dropped = 0
+        self.errors = 0
+        self._pending = False
+        self._pending_topic = None
+        self._pending_payload = None
+        self._last_apply = time.ticks_add(time.ticks_ms(), -min_period)
 
     ############################################################################
     # @brief    this function subscribes the topic specified in the object
@@ -103,14 +145,72 @@ class UserSubs:
     ############################################################################
     # @brief    callback function interface for arrived subscribed topic
     # @param    topic       topic of message
-    # @param    abs_device  abstract device to connect to when an subscribed
-    #                       topic arrives
+    # @param    payload     payload of the message
     # @return   none
     ############################################################################
     def callback_on_arrived_topic(self, topic, payload):
-        self.topic = topic
+        # the concrete received topic is kept, self.topic keeps the wildcards
+        self.last_topic = topic
         self.last_payload = payload
-        self.abs_skill.execute_subscription(topic, payload)
+        if self.coalesce:
+            # the message replaces a message not yet applied
+            if self._pending:
+                self.dropped = self.dropped + 1
+            self._pending = True
+            self._pending_topic = topic
+            self._pending_payload = payload
+            return
+        self.applied = self.applied + 1
+        self.handler(topic, payload)
+
+    ############################################################################
+    # @brief    checks if a coalesced message waits for the handler
+    # @return   True if a message is pending, else False
+    ############################################################################
+    def is_pending(self):
+        return self._pending
+
+    ############################################################################
+    # @brief    returns the time until the pending message may be applied
+    # @param    current_time    ticks_ms time stamp
+    # @return   time in ms, 0 if the message is due
+    ############################################################################
+    def get_apply_wait(self, current_time):
+        if not self._is_rate_limited(current_time):
+            return 0
+        return self.min_period - time.ticks_diff(current_time, self._last_apply)
+
+    ############################################################################
+    # @brief    checks if the minimum apply period since the last apply is
+    #           running, a wrapped around time stamp counts as over
+    # @param    current_time    ticks_ms time stamp
+    # @return   True if the period is running, else False
+    ############################################################################
+    def _is_rate_limited(self, current_time):
+        elapsed = time.ticks_diff(current_time, self._last_apply)
+        return (elapsed >= 0) and (elapsed < self.min_period)
+
+    ############################################################################
+    # @brief    passes the pending coalesced message to the handler if the
+    #           minimum apply period is over. The handler runs outside of the
+    #           receive path, a failing handler is traced and counted.
+    # @param    current_time    ticks_ms time stamp
+    # @return   True if no message is pending anymore, else False
+    ############################################################################
+    def apply_pending(self, current_time):
+        if not self._pending:
+            return True
+        if self._is_rate_limited(current_time):
+            return False
+        self._pending = False
+        self._last_apply = current_time
+        self.applied = self.applied + 1
+        try:
+            self.handler(self._pending_topic, self._pending_payload)
+        except Exception as e:
+            self.errors = self.errors + 1
+            T.trace(__name__, T.ERROR, 'handler of ' + self.topic + ' failed: ' + str(e))
+        return True
 
     ############################################################################
     # @brief    compares a given topic with the initialized topic
@@ -10,14 +10,27 @@
 ################################################################################
 # Imports
 import time
+import src.utils.exec_prof as exec_prof
 import src.utils.trace as T
 
 ################################################################################
 # Variables
+_wakeup_cb = None
 
 ################################################################################
 # Functions
 
+################################################################################
+# @brief    This function sets the wake up callback of the skill scheduler,
+#           the callback is called with the skill object which requests its
+#           execution
+# @param    callback     wake up callback function
+# @return   none
+################################################################################
+def set_wakeup_cb(callback):
+    global _wakeup_cb
+    _wakeup_cb = callback
+
 ################################################################################
 # Classes
 ################################################################################
@@ -33,6 +46,15 @@ class AbstractSkill:
     _dev_id = 'dev00'
     _skill_entity = '0'
 
+    POLL_PERIOD = 100
+    EXECUTION_BUDGET = 500
+
+    _exec_prof = None
+    _subs_prof = None
+    _wake_prof = None
+    _sample_prof = None
+    _wakeup_pending = False
+
     ############################################################################
     # Member Functions
 
@@ -54,6 +76,110 @@ class AbstractSkill:
     def get_skill_name(self):
         return self._skill_name
 
+    ############################################################################
+    # @brief    Getter function for the skill identifier, a combination of the
+    #           skill name and entity
+    # @return   skill identifier string
+    ############################################################################
+    def get_skill_id(self):
+        return self._skill_name + '/' + self._skill_entity
+
+    ############################################################################
+    # @brief    Getter function for the execution time profile of the cyclic
+    #           skill task
+    # @return   profile object
+    ############################################################################
+    def get_exec_profile(self):
+        if self._exec_prof == None:
+            self._exec_prof = exec_prof.get_profile(self.get_skill_id() + '/exec')
+        return self._exec_prof
+
+    ############################################################################
+    # @brief    Getter function for the execution time profile of the
+    #           subscription handler
+    # @return   profile object
+    ############################################################################
+    def get_subs_profile(self):
+        if self._subs_prof == None:
+            self._subs_prof = exec_prof.get_profile(self.get_skill_id() + '/subs')
+        return self._subs_prof
+
+    ############################################################################
+    # @brief    Getter function for the wake up latency profile, the time from
+    #           the execution request until the end of the skill execution
+    # @return   profile object
+    ############################################################################
+    def get_wake_profile(self):
+        if self._wake_prof == None:
+            self._wake_prof = exec_prof.get_profile(self.get_skill_id() + '/wake')
+        return self._wake_prof
+
+    ############################################################################
+    # @brief    Getter function for the execution time profile of the timer
+    #           driven sample callback
+    # @return   profile object
+    ############################################################################
+    def get_sample_profile(self):
+        if self._sample_prof == None:
+            self._sample_prof = exec_prof.get_profile(self.get_skill_id() + '/sample')
+        return self._sample_prof
+
+    ############################################################################
+    # @brief    Requests the immediate execution of the skill, e.g. from the
+    #           subscription handler after a command was received. The
+    #           scheduler executes the skill in the same cycle.
+    # @return   none
+    ############################################################################
+    def request_execution(self):
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            self.get_wake_profile().start()
+            if _wakeup_cb != None:
+                _wakeup_cb(self)
+
+    ############################################################################
+    # @brief    Clears a pending execution request
+    # @return   True if an execution request was pending, else False
+    ############################################################################
+    def clear_execution_request(self):
+        pending = self._wakeup_pending
+        self._wakeup_pending = False
+        return pending
+
+    ############################################################################
+    # @brief    Getter function for the next due execution time of the skill.
+    #           The default implementation polls the skill every POLL_PERIOD
+    #           milliseconds, periodic skills overwrite this function.
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        return time.ticks_add(time.ticks_ms(), self.POLL_PERIOD)
+
+    ############################################################################
+    # @brief    Getter function for the GPIOs which shall wake up the
+    #           controller from light sleep
+    # @return   list of (pin number, wake level) tuples
+    ############################################################################
+    def get_wake_pins(self):
+        return []
+
+    ############################################################################
+    # @brief    Getter function for the essential skill state, which is kept
+    #           in the RTC memory during a reset
+    # @return   json serializable state or None if the skill has no state
+    ############################################################################
+    def get_warm_state(self):
+        return None
+
+    ############################################################################
+    # @brief    Restores the skill state of the last reset, called once after
+    #           the skill was started
+    # @param    state       skill state returned by get_warm_state
+    # @return   none
+    ############################################################################
+    def set_warm_state(self, state):
+        pass
+
     ############################################################################
     # @brief    starts the skill
     # @return   none
@@ -66,7 +192,8 @@ class AbstractSkill:
     # @return   none
     ############################################################################
     def execute_skill(self):
-        T.trace(__name__, T.DEBUG, "execute " + self._skill_name)
+        if T.is_enabled(__name__, T.DEBUG):
+            T.trace(__name__, T.DEBUG, "execute " + self._skill_name)
 
     ############################################################################
     # @brief    executes the incoming subscription callback handler
@@ -75,8 +202,9 @@ class AbstractSkill:
     # @return   none
     ############################################################################
     def execute_subscription(self, topic, payload):
-        T.trace(__name__, T.DEBUG, "subscription " + topic + " for device: " + self._dev_id + " received")
-        T.trace(__name__, T.DEBUG, "payload: " + payload)
+        if T.is_enabled(__name__, T.DEBUG):
+            T.trace(__name__, T.DEBUG, "subscription " + topic + " for device: " + self._dev_id + " received")
+            T.trace(__name__, T.DEBUG, "payload: " + payload)
     ############################################################################
     # @brief    stopps the skill
     # @return   none
@@ -15,6 +15,8 @@ from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
 import dht
 import machine
+import array
+import src.utils.sampler as sampler
 import src.utils.trace as T
 
 ################################################################################
@@ -36,6 +38,9 @@ class DhtSkill(AbstractSkill):
     _pub_humitdity = None
     EXECUTION_PERIOD = 4000
     _SLEEP_PERIOD = 10
+    _TEMPERATURE_DEADBAND = 0.15
+    _HUMIDITY_DEADBAND = 0.5
+    _PUB_HEARTBEAT = 300000
     _sleep_counter = 0
     NO_VALUE = 0xFF
 
@@ -51,6 +56,16 @@ class DhtSkill(AbstractSkill):
 
     _temperature = 0.0
     _humidity = 0.0
+    # raw temperature and humidity of the last measurement
+    _values = None
+    _values_valid = False
+    _sampler = None
+    # the sampler reads the sensor in the measure state and wakes up the
+    # skill for each state machine step, execution without sampler request
+    _SAMPLER_IDLE_PERIOD = 10000
+    _sample_tick = False
+    _sampled = False
+    _sample_error = False
 
     _TEMPERATURE_CORR_FACTOR = 1.00
     _HUMIDITY_CORR_FACTOR =    1.23
@@ -69,12 +84,17 @@ class DhtSkill(AbstractSkill):
     def __init__(self, dev_id, skill_entity, data_pin, pwr_pin=NO_VALUE):
         super().__init__(dev_id, skill_entity)
         self._skill_name = "DHT skill"
-        self._pub_temperature = UserPubs("dht/temp", dev_id, "std", skill_entity)
-        self._pub_humitdity = UserPubs("dht/hum", dev_id, "std", skill_entity)
+        self._pub_temperature = UserPubs("dht/temp", dev_id, "std", skill_entity,
+                                        deadband=self._TEMPERATURE_DEADBAND,
+                                        heartbeat=self._PUB_HEARTBEAT)
+        self._pub_humitdity = UserPubs("dht/hum", dev_id, "std", skill_entity,
+                                        deadband=self._HUMIDITY_DEADBAND,
+                                        heartbeat=self._PUB_HEARTBEAT)
         self._data_pin = data_pin
         self._dht = None
         self._pwr_pin = pwr_pin
         self._pwr_gpio = None
+        self._values = array.array('f', [0.0, 0.0])
 
     ############################################################################
     # @brief    starts the skill
@@ -95,6 +115,10 @@ class DhtSkill(AbstractSkill):
 
         self._sleep_counter = self._SLEEP_PERIOD
         self._state = self._STATE_SLEEP
+        self._sample_tick = False
+        self._sampled = False
+        self._sampler = sampler.start_sampler(self.EXECUTION_PERIOD, self._sample,
+                                                self.get_sample_profile())
 
     ############################################################################
     # @brief    poweres the temt6000 chip
@@ -131,12 +155,31 @@ class DhtSkill(AbstractSkill):
         self._state = self._STATE_PUBLISH
 
         T.trace(__name__, T.DEBUG, 'measureing...')
+        # the sampler already read the sensor
+        if self._sampler == None:
+            self._read_sensor()
+        self._sampled = False
+        if self._sample_error:
+            self._handle_DHT_error()
+        elif self._dht != None:
+            self._values_valid = True
+        self._deactivate_chip()
+
+    ############################################################################
+    # @brief    reads the raw tempeature and humidity of the sensor, the
+    #           evaluation is done by _measure
+    # @return   none
+    ############################################################################
+    def _read_sensor(self):
+        self._sample_error = False
         if self._dht != None:
             try:
                 self._dht.measure()
+                self._values[0] = self._dht.temperature()
+                self._values[1] = self._dht.humidity()
             except OSError:
-                self._handle_DHT_error()
-        self._deactivate_chip()
+                self._sample_error = True
+        self._sampled = True
 
     ############################################################################
     # @brief    handles a DHT communication/chip error
@@ -163,8 +206,8 @@ class DhtSkill(AbstractSkill):
         self._state = self._STATE_SLEEP
         T.trace(__name__, T.DEBUG, 'publishing...')
         # get a measurement set, either the real measured  or default 0
-        self._temperature = round(self._dht.temperature() * self._TEMPERATURE_CORR_FACTOR, 2)
-        self._humidity = round(self._dht.humidity() * self._HUMIDITY_CORR_FACTOR, 2)
+        self._temperature = round(self._values[0] * self._TEMPERATURE_CORR_FACTOR, 2)
+        self._humidity = round(self._values[1] * self._HUMIDITY_CORR_FACTOR, 2)
 
         T.trace(__name__, T.DEBUG, 'temperature: ' + str(self._temperature))
         T.trace(__name__, T.DEBUG, 'humidity: ' + str(self._humidity))
@@ -184,27 +227,88 @@ class DhtSkill(AbstractSkill):
             self._state = self._STATE_HEATUP
             T.trace(__name__, T.DEBUG, 'wakeup... ')
 
+    ############################################################################
+    # @brief    executes one step of the measurement state machine
+    # @return   none
+    ############################################################################
+    def _execute_state(self):
+        if(self._STATE_HEATUP == self._state):
+            self._heating()
+        elif(self._STATE_MEASURE == self._state):
+            self._measure()
+        elif(self._STATE_PUBLISH == self._state):
+            self._publish()
+        elif(self._STATE_SLEEP == self._state):
+            self._sleep()
+        else:
+            T.trace(__name__, T.ERROR, 'unexpected state detected')
+            self._state = self._STATE_HEATUP
+
+    ############################################################################
+    # @brief    timer driven sample callback, it only reads the sensor in the
+    #           measure state and wakes up the skill for the next state machine
+    #           step
+    # @return   none
+    ############################################################################
+    def _sample(self):
+        if (self._STATE_MEASURE == self._state) and not self._sampled:
+            self._read_sensor()
+        self._sample_tick = True
+        self.request_execution()
+
     ############################################################################
     # @brief    executes the skill cyclic task
     # @return   none
     ############################################################################
     def execute_skill(self):
+        if self._sampler != None:
+            # one state machine step per sample period, the measurement is
+            # evaluated after the sensor was read
+            if self._sample_tick:
+                self._sample_tick = False
+                if (self._STATE_MEASURE != self._state) or self._sampled:
+                    self._execute_state()
+            if self._STATE_PUBLISH == self._state:
+                self._publish()
+            return
 
         current_time = time.ticks_ms()
         if abs(time.ticks_diff(current_time, self._last_time)) > self.EXECUTION_PERIOD:
             self._last_time = current_time
+            self._execute_state()
 
-            if(self._STATE_HEATUP == self._state):
-                self._heating()
-            elif(self._STATE_MEASURE == self._state):
-                self._measure()
-            elif(self._STATE_PUBLISH == self._state):
-                self._publish()
-            elif(self._STATE_SLEEP == self._state):
-                self._sleep()
-            else:
-                T.trace(__name__, T.ERROR, 'unexpected state detected')
-                self._state = _STATE_HEATUP
+    ############################################################################
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        if self._sampler != None:
+            return time.ticks_add(time.ticks_ms(), self._SAMPLER_IDLE_PERIOD)
+        return time.ticks_add(self._last_time, self.EXECUTION_PERIOD + 1)
+
+    ############################################################################
+    # @brief    Getter function for the skill state kept during a reset
+    # @return   list of raw temperature, raw humidity and sleep counter or None
+    #           if nothing was measured yet
+    ############################################################################
+    def get_warm_state(self):
+        if not self._values_valid:
+            return None
+        return [self._values[0], self._values[1], self._sleep_counter]
+
+    ############################################################################
+    # @brief    Restores the last measurement before the reset, the values are
+    #           published immediately instead of after a full measurement cycle
+    # @param    state       list of raw temperature, raw humidity and sleep
+    #                       counter
+    # @return   none
+    ############################################################################
+    def set_warm_state(self, state):
+        self._values[0] = state[0]
+        self._values[1] = state[1]
+        self._values_valid = True
+        self._sleep_counter = state[2]
+        self._state = self._STATE_PUBLISH
 
     ############################################################################
     # @brief    executes the incoming subscription callback handler
@@ -221,6 +325,9 @@ class DhtSkill(AbstractSkill):
     ############################################################################
     def stop_skill(self):
         super().stop_skill()
+        if self._sampler != None:
+            self._sampler.stop()
+            self._sampler = None
         self._dht = None
         self._temperature = 0.0
         self._humidity = 0.0
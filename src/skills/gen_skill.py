@@ -13,10 +13,14 @@ import time
 from src.skills.abs_skill import AbstractSkill
 from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
+from src.mqtt.user_mqtt import get_connection_stats
 from src.utils.app_info import AppInfo
 import src.utils.trace as T
 import src.utils.sys_mode as sys_mode
+import src.utils.power_mgr as power_mgr
+import src.utils.exec_prof as exec_prof
 import network as net
+import json
 
 ################################################################################
 # Variables
@@ -47,10 +51,22 @@ class GenSkill(AbstractSkill):
 
     _health_counter = 0
     _pub_health_counter = None
+    _pub_health_power = None
+    _pub_health_mqtt = None
+    _prof_request = None
+    _pub_prof = None
+    _pub_prof_request_pending = False
+    _prof_reset_pending = False
+    _skill_cmd_request = None
+    _pub_skill_state = None
+    _skill_cmd_pending = None
+    _skill_cmd_cb = None
+    _skill_state_cb = None
 
     _CMD_RESET_REQUEST  = 'reset'
     _CMD_REPL_REQUEST   = 'repl'
     _CMD_FW_UPDATE      = 'update'
+    _CMD_PROF_RESET     = 'reset'
 
     ############################################################################
     # Member Functions
@@ -64,15 +80,25 @@ class GenSkill(AbstractSkill):
     def __init__(self, dev_id, skill_entity):
         super().__init__(dev_id, skill_entity)
         self._skill_name = "gen skill"
-        self._device_info_request = UserSubs(self, "gen/info", dev_id)
-        self._gen_cmd_request = UserSubs(self, "gen/mode", dev_id)
+        self._device_info_request = UserSubs(self, "gen/info", dev_id, handler=self._on_info_request)
+        self._gen_cmd_request = UserSubs(self, "gen/mode", dev_id, handler=self._on_gen_cmd)
         self._pub_fw_ident = UserPubs("gen/fwident", dev_id)
         self._pub_fw_version = UserPubs("gen/fwversion", dev_id)
         self._pub_fw_desc = UserPubs("gen/desc", dev_id)
         self._pub_device_ip = UserPubs("gen/ip", dev_id)
         self._app_info = AppInfo()
         self.skill_name = "generic skill"
-        self._pub_health_counter = UserPubs("health/tic", dev_id)
+        # the diagnostics and command replies are never retained
+        self._pub_health_counter = UserPubs("health/tic", dev_id, retain=False)
+        self._pub_health_power = UserPubs("health/power", dev_id, retain=False)
+        self._pub_health_mqtt = UserPubs("health/mqtt", dev_id, retain=False)
+        self._prof_request = UserSubs(self, "health/prof", dev_id, handler=self._on_prof_request)
+        self._pub_prof = UserPubs("health/prof", dev_id, retain=False)
+        self._pub_prof_request_pending = False
+        self._prof_reset_pending = False
+        self._skill_cmd_request = UserSubs(self, "gen/skill", dev_id, handler=self._on_skill_cmd)
+        self._pub_skill_state = UserPubs("gen/skill", dev_id, retain=False)
+        self._skill_cmd_pending = None
         self._health_counter = 0
         self._pub_info_request_pending = True
 
@@ -83,7 +109,19 @@ class GenSkill(AbstractSkill):
     def start_skill(self):
         self._device_info_request.subscribe()
         self._gen_cmd_request.subscribe()
+        self._prof_request.subscribe()
+        self._skill_cmd_request.subscribe()
 
+    ############################################################################
+    # @brief    sets the callback functions for skill commands
+    # @param    cmd_cb      function executing a skill command string, returns
+    #                       True on success
+    # @param    state_cb    function returning the state of all skills
+    # @return   none
+    ############################################################################
+    def set_skill_cmd_cb(self, cmd_cb, state_cb):
+        self._skill_cmd_cb = cmd_cb
+        self._skill_state_cb = state_cb
 
     ############################################################################
     # @brief    executes the skill cyclic task
@@ -95,49 +133,116 @@ class GenSkill(AbstractSkill):
             self._last_time = current_time
             self._health_counter = self._health_counter + 1
             self._pub_health_counter.publish(str(self._health_counter))
+            self._pub_health_power.publish(json.dumps(power_mgr.get_power_stats()))
+            mqtt_stats = get_connection_stats()
+            if mqtt_stats != None:
+                self._pub_health_mqtt.publish(json.dumps(mqtt_stats))
         if self._pub_info_request_pending:
             self._publish_gen_info()
             self._pub_info_request_pending = False
+        if self._pub_prof_request_pending:
+            self._pub_prof.publish(json.dumps(exec_prof.get_summary()))
+            self._pub_prof_request_pending = False
+            if self._prof_reset_pending:
+                exec_prof.reset_profiles()
+                self._prof_reset_pending = False
+        if self._skill_cmd_pending != None:
+            self._execute_skill_cmd(self._skill_cmd_pending)
+            self._skill_cmd_pending = None
 
     ############################################################################
-    # @brief    executes the incoming subscription callback handler
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        if (self._pub_info_request_pending or self._pub_prof_request_pending
+                or (self._skill_cmd_pending != None)):
+            return time.ticks_ms()
+        # requests wake up the skill, only the health counter is periodic
+        return time.ticks_add(self._last_time, self._EXECUTION_PERIOD + 1)
+
+    ############################################################################
+    # @brief    handler of the device information request subscription
     # @param    topic       topic identifier of the messsage
-    # @param    payload     payload of the message
+    # @param    data        payload of the message
     # @return   none
     ############################################################################
-    def execute_subscription(self, topic, data):
-        if self._device_info_request.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'generic information request received')
-            #handle publication in main loop, don't public in subscription ISR
-            #handler
-            self._pub_info_request_pending = True
-        elif self._gen_cmd_request.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'generic command request received')
-            T.trace(__name__, T.DEBUG, 'data: ' + data)
-            if data == self._CMD_RESET_REQUEST:
-                sys_mode.goto_reset_mode()
-            elif data == self._CMD_REPL_REQUEST:
-                sys_mode.goto_repl_mode()
-            elif data == self._CMD_FW_UPDATE:
-                sys_mode.goto_reset_mode()
-            else:
-                T.trace(__name__, T.ERROR, 'unexpected data in subscription')
-                T.trace(__name__, T.DEBUG, 'topic: ' + topic)
-                T.trace(__name__, T.DEBUG, 'data: ' + data)
+    def _on_info_request(self, topic, data):
+        T.trace(__name__, T.DEBUG, 'generic information request received')
+        #handle publication in main loop, don't public in subscription ISR
+        #handler
+        self._pub_info_request_pending = True
+        self.request_execution()
 
+    ############################################################################
+    # @brief    handler of the generic command subscription
+    # @param    topic       topic identifier of the messsage
+    # @param    data        payload of the message
+    # @return   none
+    ############################################################################
+    def _on_gen_cmd(self, topic, data):
+        T.trace(__name__, T.DEBUG, 'generic command request received')
+        T.trace(__name__, T.DEBUG, 'data: ' + data)
+        if data == self._CMD_RESET_REQUEST:
+            sys_mode.goto_reset_mode()
+        elif data == self._CMD_REPL_REQUEST:
+            sys_mode.goto_repl_mode()
+        elif data == self._CMD_FW_UPDATE:
+            sys_mode.goto_reset_mode()
         else:
-            T.trace(__name__, T.ERROR, 'unexpected subscription')
+            T.trace(__name__, T.ERROR, 'unexpected data in subscription')
             T.trace(__name__, T.DEBUG, 'topic: ' + topic)
             T.trace(__name__, T.DEBUG, 'data: ' + data)
 
+    ############################################################################
+    # @brief    handler of the profile request subscription
+    # @param    topic       topic identifier of the messsage
+    # @param    data        payload of the message
+    # @return   none
+    ############################################################################
+    def _on_prof_request(self, topic, data):
+        T.trace(__name__, T.DEBUG, 'profile request received')
+        self._pub_prof_request_pending = True
+        self._prof_reset_pending = (data == self._CMD_PROF_RESET)
+        self.request_execution()
+
+    ############################################################################
+    # @brief    handler of the skill command subscription
+    # @param    topic       topic identifier of the messsage
+    # @param    data        payload of the message
+    # @return   none
+    ############################################################################
+    def _on_skill_cmd(self, topic, data):
+        T.trace(__name__, T.DEBUG, 'skill command request received')
+        #execute the command in main loop, skills are stopped and started
+        self._skill_cmd_pending = data
+        self.request_execution()
+
     ############################################################################
     # @brief    stopps the skill
     # @return   none
     ############################################################################
     def stop_skill(self):
         self._device_info_request.unsubscribe()
+        self._gen_cmd_request.unsubscribe()
+        self._prof_request.unsubscribe()
+        self._skill_cmd_request.unsubscribe()
         super().stop_skill()
 
+    ############################################################################
+    # @brief    executes a skill command and publishes the resulting state of
+    #           all skills
+    # @param    cmd     skill command string, e.g. 'restart relay/0'
+    # @return   none
+    ############################################################################
+    def _execute_skill_cmd(self, cmd):
+        if self._skill_cmd_cb == None:
+            T.trace(__name__, T.ERROR, 'no skill command handler')
+            return
+        if not self._skill_cmd_cb(cmd):
+            T.trace(__name__, T.ERROR, 'skill command failed: ' + cmd)
+        self._pub_skill_state.publish(json.dumps(self._skill_state_cb()))
+
     ############################################################################
     # @brief    publish generic information on the device
     # @return   none
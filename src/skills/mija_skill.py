@@ -47,9 +47,12 @@
 ################################################################################
 # Imports
 import time
+import struct
 from src.skills.abs_skill import AbstractSkill
 from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
+from src.mqtt.user_pubs import StatePubs
+from src.mqtt.user_pubs import STATE_MSG_FIELDS
 from src.utils.ble_drv import BleListener
 from src.utils.ble_drv import ble_append_listener
 from src.utils.ble_drv import ble_remove_listener
@@ -93,6 +96,10 @@ _DATA_LEN_TEMP_STD				    = const(2)
 _DATA_LEN_HUM_STD				    = const(2)
 _DATA_LEN_TEMPHUM_STD			    = const(4)
 
+# decoded record of a message: uuid, message counter, data type, mac address,
+# raw temperature, raw humidity and battery
+_RECORD_FORMAT                      = '<HBB6sHHB'
+
 ################################################################################
 # Functions
 
@@ -107,6 +114,7 @@ class MijaSkill(AbstractSkill):
     # Member Attributes
     device_info_request = None
     EXECUTION_PERIOD = 30000
+    _PUB_HEARTBEAT = 300000
 
     _mija_temp = None
     _mija_hum = None
@@ -114,6 +122,7 @@ class MijaSkill(AbstractSkill):
     _mija_msg_cnt = None
     _mija_addr = None
     _mija_msg_location = None
+    _mija_state = None
 
     _uuid = 0;
     _mac_addr = None
@@ -122,6 +131,7 @@ class MijaSkill(AbstractSkill):
     _battery = 0.0;
     _temperature = 0.0;
     _humidity = 0.0;
+    _data_valid = False
 
     _location = "not defined"
     _address = bytearray()
@@ -134,9 +144,14 @@ class MijaSkill(AbstractSkill):
     # @brief    constructor of the generic skill object
     # @param    dev_id    device identification
     # @param    skill_entity  skill entity if multiple skills are generated
+    # @param    location  location name of the sensor
+    # @param    address   bluetooth address of the sensor
+    # @param    state_msg state message mode, the sensor data is published per
+    #                     topic, as one json message or both
     # @return   none
     ############################################################################
-    def __init__(self, dev_id, skill_entity, location, address):
+    def __init__(self, dev_id, skill_entity, location, address,
+                    state_msg=STATE_MSG_FIELDS):
         super().__init__(dev_id, skill_entity)
 
         self._skill_name = "mija skill"
@@ -150,12 +165,22 @@ class MijaSkill(AbstractSkill):
         #self.device_info_request.subscribe()
 
         #generate all necessary publication objects
-        self._mija_temp = UserPubs("mija/temp", dev_id, "std", skill_entity)
-        self._mija_hum = UserPubs("mija/hum", dev_id, "std", skill_entity)
-        self._mija_batt = UserPubs("mija/batt", dev_id, "std", skill_entity)
-        self._mija_msg_cnt = UserPubs("mija/cnt", dev_id, "std", skill_entity)
-        self._mija_addr = UserPubs("mija/addr", dev_id, "std", skill_entity)
-        self._mija_msg_location = UserPubs("mija/loc", dev_id, "std", skill_entity)
+        #unchanged data is only published with the heartbeat
+        self._mija_temp = UserPubs("mija/temp", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_hum = UserPubs("mija/hum", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_batt = UserPubs("mija/batt", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_msg_cnt = UserPubs("mija/cnt", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_addr = UserPubs("mija/addr", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_msg_location = UserPubs("mija/loc", dev_id, "std", skill_entity,
+                                    on_change=True, heartbeat=self._PUB_HEARTBEAT)
+        self._mija_state = StatePubs("mija/json", dev_id, "std", skill_entity,
+                                    state_msg, on_change=True,
+                                    heartbeat=self._PUB_HEARTBEAT)
 
 
     ############################################################################
@@ -163,7 +188,11 @@ class MijaSkill(AbstractSkill):
     # @return   none
     ############################################################################
     def start_skill(self):
-        self._listener = src.utils.ble_drv.BleListener(self._location, self._data_receive_cb, self._address)
+        # in the io worker mode the messages are decoded in the io worker
+        # thread and the skill is woken up to apply the records
+        self._listener = src.utils.ble_drv.BleListener(self._location, self._apply_record,
+                                                        self._address, self._decode_msg,
+                                                        self.request_execution)
         ble_append_listener(self._listener)
 
 
@@ -172,11 +201,46 @@ class MijaSkill(AbstractSkill):
     # @return   none
     ############################################################################
     def execute_skill(self):
+        self._listener.process_records()
         current_time = time.ticks_ms()
         if abs(time.ticks_diff(current_time, self._last_time)) > self.EXECUTION_PERIOD:
             self._last_time = current_time
             self._publish_sensor_data()
 
+    ############################################################################
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        return time.ticks_add(self._last_time, self.EXECUTION_PERIOD + 1)
+
+    ############################################################################
+    # @brief    Getter function for the skill state kept during a reset
+    # @return   list of temperature, humidity, battery, message counter and
+    #           mac address or None if no data was received yet
+    ############################################################################
+    def get_warm_state(self):
+        if not self._data_valid:
+            return None
+        return [self._temperature, self._humidity, self._battery, self._msg_cnt,
+                list(self._mac_addr)]
+
+    ############################################################################
+    # @brief    Restores the data received before the reset, the data is
+    #           published immediately instead of after the execution period
+    # @param    state       list of temperature, humidity, battery, message
+    #                       counter and mac address
+    # @return   none
+    ############################################################################
+    def set_warm_state(self, state):
+        self._temperature = state[0]
+        self._humidity = state[1]
+        self._battery = state[2]
+        self._msg_cnt = state[3]
+        self._mac_addr = bytearray(state[4])
+        self._data_valid = True
+        self._last_time = time.ticks_add(time.ticks_ms(), -(self.EXECUTION_PERIOD + 1))
+
     ############################################################################
     # @brief    executes the incoming subscription callback handler
     # @param    topic       topic identifier of the messsage
@@ -199,81 +263,91 @@ class MijaSkill(AbstractSkill):
     # @return   none
     ############################################################################
     def _publish_sensor_data(self):
-        self._mija_temp.publish(str(self._temperature))
-        self._mija_hum.publish(str(self._humidity))
-        self._mija_batt.publish(str(self._battery))
-        self._mija_msg_cnt.publish(str(self._msg_cnt))
-        self._mija_addr.publish(' '.join('{:02x}'.format(x) for x in self._mac_addr))
-        self._mija_msg_location.publish(self._location)
+        addr = ' '.join('{:02x}'.format(x) for x in self._mac_addr)
+        if self._mija_state.is_fields_active():
+            self._mija_temp.publish(str(self._temperature))
+            self._mija_hum.publish(str(self._humidity))
+            self._mija_batt.publish(str(self._battery))
+            self._mija_msg_cnt.publish(str(self._msg_cnt))
+            self._mija_addr.publish(addr)
+            self._mija_msg_location.publish(self._location)
+        if self._mija_state.is_state_active():
+            self._mija_state.publish_state({'temp': self._temperature,
+                                            'hum': self._humidity,
+                                            'batt': self._battery,
+                                            'cnt': self._msg_cnt,
+                                            'addr': addr,
+                                            'loc': self._location})
 
     ############################################################################
-    # @brief    This function is used for the data receive callback
+    # @brief    This function decodes the message data into a record, it is
+    #           called from the bluetooth irq or from the io worker thread
     # @param    addr_type   type of address
     # @param    addr        source address of the message
     # @param    adv_type    data type of the message
     # @param    rssi        rssi
     # @param    adv_data    payload of the message or the message itself
-    # @return   none
-    ############################################################################
-    def _data_receive_cb(self, addr_type, addr, adv_type, rssi, adv_data):
-        self._parse_msg(adv_data)
-
+    # @return   record bytes or None if the data type is unknown
     ############################################################################
-    # @brief    This function parses the message data
-    # @param    adv_data    payload of the message or the message itself
-    # @return   none
-    ############################################################################
-    def _parse_msg(self, adv_data):
+    def _decode_msg(self, addr_type, addr, adv_type, rssi, adv_data):
         #check and parse UUID
+        uuid = 0
         if((_UUID_DATA_LOW_VAL == adv_data[_UUID_DATA_LOW_ADR]) and (_UUID_DATA_HIGH_VAL == adv_data[_UUID_DATA_HIGH_ADR])):
-            self._uuid = adv_data[_UUID_DATA_HIGH_ADR]
-            self._uuid = self._uuid << 8
-            self._uuid = self._uuid + adv_data[_UUID_DATA_LOW_ADR]
-
-        #parse the message counter
-        self._msg_cnt = adv_data[_MSG_CNT_ADR]
-
-        #parse the mac address bytearray
-        #self._mac_addr = adv_data[17:11:-1]
-        self._mac_addr[0] = adv_data[17]
-        self._mac_addr[1] = adv_data[16]
-        self._mac_addr[2] = adv_data[15]
-        self._mac_addr[3] = adv_data[14]
-        self._mac_addr[4] = adv_data[13]
-        self._mac_addr[5] = adv_data[12]
+            uuid = (adv_data[_UUID_DATA_HIGH_ADR] << 8) + adv_data[_UUID_DATA_LOW_ADR]
+
+        #parse the mac address bytearray, data reverse
+        mac_addr = bytes(adv_data[_DEVICE_MAC_ADR - i] for i in range(6))
 
         #parse data based on the type
-        self._data_type = adv_data[_DATA_TYPE_ID_ADR]
-
-        if(_DATA_TYPE_ID_TEMP == self._data_type):
-            self._temperature = adv_data[_DATA_TEMP_HIGHBYTE_ADR]
-            self._temperature = self._temperature << 8
-            self._temperature = self._temperature + adv_data[_DATA_TEMP_LOWBYTE_ADR]
-            self._temperature = self._temperature / 10.0
-
-        elif(_DATA_TYPE_ID_HUM == self._data_type):
-            self._humidity = adv_data[_DATA_HUM_HIGHBYTE_ADR]
-            self._humidity = self._humidity << 8
-            self._humidity = self._humidity + adv_data[_DATA_HUM_LOWBYTE_ADR]
-            self._humidity = self._humidity / 10.0
-
-        elif(_DATA_TYPE_ID_BATT == self._data_type):
-            self._battery = adv_data[_DATA_BATTERY_LOWBYTE_ADR]
-
-        elif(_DATA_TYPE_ID_TEMPHUM == self._data_type):
-            self._temperature = adv_data[_DATA_HUMTEMP_TEMP_HIGHBYTE_ADR]
-            self._temperature = self._temperature << 8
-            self._temperature = self._temperature + adv_data[_DATA_HUMTEMP_TEMP_LOWBYTE_ADR]
-            self._temperature = self._temperature / 10.0
-
-            self._humidity = adv_data[_DATA_HUMTEMP_HUM_HIGHBYTE_ADR]
-            self._humidity = self._humidity << 8
-            self._humidity = self._humidity + adv_data[_DATA_HUMTEMP_HUM_LOWBYTE_ADR]
-            self._humidity = self._humidity / 10.0
+        data_type = adv_data[_DATA_TYPE_ID_ADR]
+        temperature = 0
+        humidity = 0
+        battery = 0
+
+        if(_DATA_TYPE_ID_TEMP == data_type):
+            temperature = (adv_data[_DATA_TEMP_HIGHBYTE_ADR] << 8) + adv_data[_DATA_TEMP_LOWBYTE_ADR]
+
+        elif(_DATA_TYPE_ID_HUM == data_type):
+            humidity = (adv_data[_DATA_HUM_HIGHBYTE_ADR] << 8) + adv_data[_DATA_HUM_LOWBYTE_ADR]
+
+        elif(_DATA_TYPE_ID_BATT == data_type):
+            battery = adv_data[_DATA_BATTERY_LOWBYTE_ADR]
+
+        elif(_DATA_TYPE_ID_TEMPHUM == data_type):
+            temperature = (adv_data[_DATA_HUMTEMP_TEMP_HIGHBYTE_ADR] << 8) + adv_data[_DATA_HUMTEMP_TEMP_LOWBYTE_ADR]
+            humidity = (adv_data[_DATA_HUMTEMP_HUM_HIGHBYTE_ADR] << 8) + adv_data[_DATA_HUMTEMP_HUM_LOWBYTE_ADR]
 
         else:
             T.trace(__name__, T.ERROR, 'unknown data type')
 
+        return struct.pack(_RECORD_FORMAT, uuid, adv_data[_MSG_CNT_ADR], data_type,
+                            mac_addr, temperature, humidity, battery)
+
+    ############################################################################
+    # @brief    This function applies a decoded record, it is called from the
+    #           skill loop or in the bluetooth irq without io worker
+    # @param    record      record of _decode_msg
+    # @return   none
+    ############################################################################
+    def _apply_record(self, record):
+        uuid, msg_cnt, data_type, mac_addr, temperature, humidity, battery = \
+            struct.unpack(_RECORD_FORMAT, record)
+
+        # each attribute is assigned once, the skill never publishes a partly
+        # applied message
+        if uuid != 0:
+            self._uuid = uuid
+        self._msg_cnt = msg_cnt
+        self._mac_addr = bytearray(mac_addr)
+        self._data_type = data_type
+        if (_DATA_TYPE_ID_TEMP == data_type) or (_DATA_TYPE_ID_TEMPHUM == data_type):
+            self._temperature = temperature / 10.0
+        if (_DATA_TYPE_ID_HUM == data_type) or (_DATA_TYPE_ID_TEMPHUM == data_type):
+            self._humidity = humidity / 10.0
+        if _DATA_TYPE_ID_BATT == data_type:
+            self._battery = battery
+        self._data_valid = True
+
         self._print_data()
 
     ############################################################################
@@ -13,6 +13,8 @@ import time
 from src.skills.abs_skill import AbstractSkill
 from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
+from src.mqtt.user_pubs import StatePubs
+from src.mqtt.user_pubs import STATE_MSG_FIELDS
 import machine, neopixel
 import src.utils.trace as T
 from micropython import const
@@ -27,6 +29,14 @@ _TOGGLE         = 2
 _PAYLOAD_ON     = 'ON'
 _PAYLOAD_OFF    = 'OFF'
 
+# received payloads, the command subscriptions are delivered as bytes
+_RAW_ON         = b'ON'
+_RAW_OFF        = b'OFF'
+_RAW_SEPARATOR  = b','
+
+# slider commands are coalesced and applied at most every period in ms
+_SLIDER_PERIOD  = 100
+
 
 
 ################################################################################
@@ -63,6 +73,7 @@ class NeopixSkill(AbstractSkill):
 
     _neo_pin = NO_VALUE
     _neo_gpio = None
+    _pub_json = None
 
 
     ############################################################################
@@ -73,21 +84,26 @@ class NeopixSkill(AbstractSkill):
     # @param    dev_id          device identification
     # @param    skill_entity    skill entity if multiple skills are generated
     # @param    neo_pin         relay output pin
-    # @param    led_pin         led pin displaying the relay state
-    # @param    led_inv         led inverse state displaying
+    # @param    state_msg       state message mode, the state is published per
+    #                           topic, as one json message or both
     # @return   none
     ############################################################################
-    def __init__(self, dev_id, skill_entity, neo_pin):
+    def __init__(self, dev_id, skill_entity, neo_pin, state_msg=STATE_MSG_FIELDS):
         super().__init__(dev_id, skill_entity)
         self._skill_name = "NeoPixel skill"
         self._pub_state = UserPubs("neo_one/state", dev_id, "std", skill_entity)
         self._pub_color = UserPubs("neo_one/color", dev_id, "std", skill_entity)
         self._pub_bright = UserPubs("neo_one/brightness", dev_id, "std", skill_entity)
+        self._pub_json = StatePubs("neo_one/json", dev_id, "std", skill_entity, state_msg)
 
-        self._sub_switch = UserSubs(self, "neo_one/switch", dev_id, "std", skill_entity)
-        self._sub_toggle = UserSubs(self, "neo_one/toggle", dev_id, "std", skill_entity)
-        self._sub_color = UserSubs(self, "neo_one/color", dev_id, "std", skill_entity)
-        self._sub_bright = UserSubs(self, "neo_one/brightness", dev_id, "std", skill_entity)
+        self._sub_switch = UserSubs(self, "neo_one/switch", dev_id, "std", skill_entity,
+                                    self._on_switch, raw=True)
+        self._sub_toggle = UserSubs(self, "neo_one/toggle", dev_id, "std", skill_entity,
+                                    self._on_toggle, raw=True)
+        self._sub_color = UserSubs(self, "neo_one/color", dev_id, "std", skill_entity,
+                                    self._on_color, raw=True, min_period=_SLIDER_PERIOD)
+        self._sub_bright = UserSubs(self, "neo_one/brightness", dev_id, "std", skill_entity,
+                                    self._on_brightness, raw=True, min_period=_SLIDER_PERIOD)
 
         self._neo_pin = neo_pin
 
@@ -162,61 +178,126 @@ class NeopixSkill(AbstractSkill):
 
         if self._publish_state == True:
             self._publish_state = False
-            self._pub_state.publish(self._current_state_payload)
-            self._pub_bright.publish(str(self._brightness))
-            color = str(self._color[0]) + ', ' + str(self._color[1]) + ', ' \
-                        + str(self._color[2])
-            self._pub_color.publish(color)
+            if self._pub_json.is_fields_active():
+                self._pub_state.publish(self._current_state_payload)
+                self._pub_bright.publish(str(self._brightness))
+                color = str(self._color[0]) + ', ' + str(self._color[1]) + ', ' \
+                            + str(self._color[2])
+                self._pub_color.publish(color)
+            self._pub_json.publish_state({'state': self._current_state_payload,
+                                            'brightness': self._brightness,
+                                            'color': self._color})
+
+    ############################################################################
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        if (self._publish_state == True) or (self._neo_cmd != self.NO_VALUE):
+            return time.ticks_ms()
+        # commands wake up the skill, no polling required
+        return time.ticks_add(time.ticks_ms(), self.EXECUTION_PERIOD)
+
+    ############################################################################
+    # @brief    Getter function for the skill state kept during a reset
+    # @return   list of state, brightness and color
+    ############################################################################
+    def get_warm_state(self):
+        return [self._current_state, self._brightness, self._color]
 
     ############################################################################
-    # @brief    executes the incoming subscription callback handler
-    # @param    topic       topic identifier of the messsage
-    # @param    payload     payload of the message
+    # @brief    Restores the neo pixel state of the last reset
+    # @param    state       list of state, brightness and color
     # @return   none
     ############################################################################
-    def execute_subscription(self, topic, data):
-        global _PAYLOAD_ON, _PAYLOAD_OFF, _TOGGLE, _ON, _OFF
-        if self._sub_toggle.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'toggle neo received')
-            self._neo_cmd = _TOGGLE
-
-        elif self._sub_switch.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'switch neo received')
-            if data == _PAYLOAD_ON:
-                self._neo_cmd = _ON
-            elif data == _PAYLOAD_OFF:
-                self._neo_cmd = _OFF
-            else:
-                T.trace(__name__, T.ERROR, 'switch unexpected payload received')
+    def set_warm_state(self, state):
+        self._brightness = state[1]
+        self._color = list(state[2])
+        if state[0] == _ON:
+            self._neo_cmd = _ON
 
-        elif self._sub_bright.compare_topic(topic):
-            self._brightness = int(data)
-            if self._brightness != 0:
-                self._neo_cmd = _ON
-            else:
-                self._neo_cmd = _OFF
-
-        elif self._sub_color.compare_topic(topic):
-
-            # conversion from string to integer list
-            a = [int(s) for s in data.split(',') if s.isdigit()]
-            # validation of data: 1. initial length, 2. range check
-            if len(a) == 3:
-                b = [s for s in a if s <= 255 and s >= 0]
-                # only if all 3 elements of the RGB are in range, the size of
-                # the list stays at 3
-                if len(b) == 3:
-                    self._color = b
-                    self._neo_cmd = _ON
-                else:
-                    T.trace(__name__, T.WARNING, 'data out of range')
-                    T.trace(__name__, T.WARNING, 'topic: ' + topic)
-                    T.trace(__name__, T.WARNING, 'data: ' + data)
+    ############################################################################
+    # @brief    handler of the toggle subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
+    # @return   none
+    ############################################################################
+    def _on_toggle(self, topic, data):
+        global _TOGGLE
+        T.trace(__name__, T.DEBUG, 'toggle neo received')
+        self._neo_cmd = _TOGGLE
+        self._request_neo_cmd()
 
+    ############################################################################
+    # @brief    handler of the switch subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
+    # @return   none
+    ############################################################################
+    def _on_switch(self, topic, data):
+        global _RAW_ON, _RAW_OFF, _ON, _OFF
+        T.trace(__name__, T.DEBUG, 'switch neo received')
+        if data == _RAW_ON:
+            self._neo_cmd = _ON
+        elif data == _RAW_OFF:
+            self._neo_cmd = _OFF
         else:
-            T.trace(__name__, T.ERROR, 'unexpected subscription')
-            T.trace(__name__, T.DEBUG, 'topic: ' + topic)
-            T.trace(__name__, T.DEBUG, 'data: ' + data)
+            T.trace(__name__, T.ERROR, 'switch unexpected payload received')
+        self._request_neo_cmd()
+
+    ############################################################################
+    # @brief    handler of the brightness subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
+    # @return   none
+    ############################################################################
+    def _on_brightness(self, topic, data):
+        global _ON, _OFF
+        # malformed payloads are rejected, isdigit also rejects negative values
+        if not data.isdigit():
+            T.trace(__name__, T.WARNING, 'brightness unexpected payload received')
+            return
+        # int parses the bytes payload without decoding it
+        self._brightness = int(data)
+        if self._brightness != 0:
+            self._neo_cmd = _ON
+        else:
+            self._neo_cmd = _OFF
+        self._request_neo_cmd()
+
+    ############################################################################
+    # @brief    handler of the color subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
+    # @return   none
+    ############################################################################
+    def _on_color(self, topic, data):
+        global _ON, _RAW_SEPARATOR
+        # conversion from bytes to integer list
+        a = [int(s) for s in data.split(_RAW_SEPARATOR) if s.isdigit()]
+        # validation of data: 1. initial length, 2. range check
+        if len(a) != 3:
+            # the payload isn't decoded, it may be no valid utf-8
+            T.trace(__name__, T.WARNING, 'color unexpected payload received')
+            return
+        b = [s for s in a if s <= 255 and s >= 0]
+        # only if all 3 elements of the RGB are in range, the size of
+        # the list stays at 3
+        if len(b) != 3:
+            T.trace(__name__, T.WARNING, 'color data out of range')
+            return
+        self._color = b
+        self._neo_cmd = _ON
+        self._request_neo_cmd()
+
+    ############################################################################
+    # @brief    requests the skill execution to apply the command and publish
+    #           the new state in the same cycle
+    # @return   none
+    ############################################################################
+    def _request_neo_cmd(self):
+        if self._neo_cmd != self.NO_VALUE:
+            self.request_execution()
 
     ############################################################################
     # @brief    stopps the skill
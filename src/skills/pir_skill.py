@@ -165,6 +165,16 @@ class PirSkill(AbstractSkill):
             self._publish_state = False
             self._pub_state.publish(self._current_state_payload)
 
+    ############################################################################
+    # @brief    Getter function for the GPIOs which shall wake up the
+    #           controller from light sleep
+    # @return   list of (pin number, wake level) tuples
+    ############################################################################
+    def get_wake_pins(self):
+        if self._pir_pin != _NO_VALUE:
+            return [(self._pir_pin, _PIR_STATE_HIGH)]
+        return []
+
     ############################################################################
     # @brief    executes the incoming subscription callback handler
     # @param    topic       topic identifier of the messsage
@@ -26,6 +26,10 @@ _NO_VALUE = 0xff
 _PAYLOAD_ON = 'ON'
 _PAYLOAD_OFF = 'OFF'
 
+# received payloads, the command subscriptions are delivered as bytes
+_RAW_ON = b'ON'
+_RAW_OFF = b'OFF'
+
 ################################################################################
 # Functions
 
@@ -70,9 +74,11 @@ class RelaySkill(AbstractSkill):
     def __init__(self, dev_id, skill_entity, relay_pin, led_pin=_NO_VALUE, led_inv=False):
         super().__init__(dev_id, skill_entity)
         self._skill_name = "Relay skill"
-        self._pub_state = UserPubs("relay/state", dev_id, "std", skill_entity)
-        self._sub_switch = UserSubs(self, "relay/switch", dev_id, "std", skill_entity)
-        self._sub_toggle = UserSubs(self, "relay/toggle", dev_id, "std", skill_entity)
+        self._pub_state = UserPubs("relay/state", dev_id, "std", skill_entity, qos=1)
+        self._sub_switch = UserSubs(self, "relay/switch", dev_id, "std", skill_entity,
+                                    self._on_switch, raw=True)
+        self._sub_toggle = UserSubs(self, "relay/toggle", dev_id, "std", skill_entity,
+                                    self._on_toggle, raw=True)
 
         self._relay_pin = relay_pin
         self._led_pin = led_pin
@@ -140,34 +146,71 @@ class RelaySkill(AbstractSkill):
             self._pub_state.publish(self._current_state_payload)
 
     ############################################################################
-    # @brief    executes the incoming subscription callback handler
-    # @param    topic       topic identifier of the messsage
-    # @param    payload     payload of the message
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        if self._publish_state == True:
+            return time.ticks_ms()
+        # commands wake up the skill, no polling required
+        return time.ticks_add(time.ticks_ms(), self.EXECUTION_PERIOD)
+
+    ############################################################################
+    # @brief    Getter function for the skill state kept during a reset
+    # @return   relay state payload
+    ############################################################################
+    def get_warm_state(self):
+        return self._current_state_payload
+
+    ############################################################################
+    # @brief    Restores the relay state of the last reset
+    # @param    state       relay state payload
+    # @return   none
+    ############################################################################
+    def set_warm_state(self, state):
+        if state == _PAYLOAD_ON:
+            self._turn_relay_on()
+
+    ############################################################################
+    # @brief    handler of the toggle subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
     # @return   none
     ############################################################################
-    def execute_subscription(self, topic, data):
-        global _PAYLOAD_ON, _PAYLOAD_OFF
-        if self._sub_toggle.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'toggle relay received')
-            if(self._relay_gpio != None):
-                if self._relay_gpio.value() == 0:
-                    self._turn_relay_on()
-                else:
-                    self._turn_relay_off()
-
-        elif self._sub_switch.compare_topic(topic):
-            T.trace(__name__, T.DEBUG, 'switch relay received')
-            if data == _PAYLOAD_ON:
+    def _on_toggle(self, topic, data):
+        T.trace(__name__, T.DEBUG, 'toggle relay received')
+        if(self._relay_gpio != None):
+            if self._relay_gpio.value() == 0:
                 self._turn_relay_on()
-            elif data == _PAYLOAD_OFF:
-                self._turn_relay_off()
             else:
-                T.trace(__name__, T.DEBUG, 'switch unexpected payload received')
+                self._turn_relay_off()
+        self._request_state_publish()
 
+    ############################################################################
+    # @brief    handler of the switch subscription
+    # @param    topic       topic identifier of the messsage as bytes
+    # @param    data        payload of the message as bytes
+    # @return   none
+    ############################################################################
+    def _on_switch(self, topic, data):
+        global _RAW_ON, _RAW_OFF
+        T.trace(__name__, T.DEBUG, 'switch relay received')
+        if data == _RAW_ON:
+            self._turn_relay_on()
+        elif data == _RAW_OFF:
+            self._turn_relay_off()
         else:
-            T.trace(__name__, T.ERROR, 'unexpected subscription')
-            T.trace(__name__, T.DEBUG, 'topic: ' + topic)
-            T.trace(__name__, T.DEBUG, 'data: ' + data)
+            T.trace(__name__, T.DEBUG, 'switch unexpected payload received')
+        self._request_state_publish()
+
+    ############################################################################
+    # @brief    requests the skill execution to publish the new state in the
+    #           same cycle
+    # @return   none
+    ############################################################################
+    def _request_state_publish(self):
+        if self._publish_state == True:
+            self.request_execution()
 
     ############################################################################
     # @brief    stopps the skill
@@ -176,8 +219,8 @@ class RelaySkill(AbstractSkill):
     def stop_skill(self):
         super().stop_skill()
 
-        self._sub_switch.subscribe()
-        self._sub_toggle.subscribe()
+        self._sub_switch.unsubscribe()
+        self._sub_toggle.unsubscribe()
 
         self._turn_relay_off()
 
@@ -9,134 +9,457 @@
 
 ################################################################################
 # Imports
-from src.skills.abs_skill import AbstractSkill
-from src.skills.gen_skill import GenSkill
-from src.skills.mija_skill import MijaSkill
-from src.skills.dht_skill import DhtSkill
-from src.skills.pir_skill import PirSkill
-from src.skills.pir_skill import PIR_SKILL_MODE_POLL
-from src.skills.temt6000_skill import Temt6000Skill
-from src.skills.neopix_skill import NeopixSkill
-from src.skills.relay_skill import RelaySkill
-from src.skills.switch_skill import SwitchSkill
-from src.skills.switch_skill import SWITCH_SKILL_MODE_POLL
-
-from src.utils.pin_cfg import RELAY_OUT_GPIO
-from src.utils.pin_cfg import NEO_DATA_GPIO
-from src.utils.pin_cfg import DHT22_PWR_GPIO
-from src.utils.pin_cfg import DHT22_DAT_GPIO
-from src.utils.pin_cfg import PIR_PWR_GPIO
-from src.utils.pin_cfg import PIR_DATA_GPIO
-from src.utils.pin_cfg import PIR_LED_GPIO
-from src.utils.pin_cfg import TEMP_PWR_GPIO
-from src.utils.pin_cfg import TEMP_DAT_ADC
-from src.utils.pin_cfg import SWITCH_GPIO
-from src.utils.pin_cfg import SWITCH_LED_GPIO
-
+import time
+import json
+import machine
+from src.mqtt.user_pubs import UserPubs
+from src.mqtt.user_pubs import flush_publications
+import src.skills.abs_skill as abs_skill
+import src.utils.pin_cfg as pin_cfg
+import src.utils.warm_state as warm_state
 import src.utils.trace as T
 ################################################################################
 # Variables
-# supported skills
+# supported skills, the skill modules are imported on demand
+_SKILL_TYPES = {
+    'gen':      ('src.skills.gen_skill', 'GenSkill'),
+    'mija':     ('src.skills.mija_skill', 'MijaSkill'),
+    'dht':      ('src.skills.dht_skill', 'DhtSkill'),
+    'pir':      ('src.skills.pir_skill', 'PirSkill'),
+    'temt6000': ('src.skills.temt6000_skill', 'Temt6000Skill'),
+    'neopix':   ('src.skills.neopix_skill', 'NeopixSkill'),
+    'relay':    ('src.skills.relay_skill', 'RelaySkill'),
+    'switch':   ('src.skills.switch_skill', 'SwitchSkill'),
+}
 
 _MIA_SENSE_CFG_1 =   0x30
 _MIA_SENSE_CFG_2 =   0x02
 
+# default skill rosters used if no roster file is configured
+_MIA_SENSE_CFG_1_ROSTER = [
+    {'type': 'mija', 'entity': '1', 'location': 'Badezimmer unten', 'address': '58:2D:34:37:10:86'},
+]
+
+_MIA_SENSE_CFG_2_ROSTER = [
+    {'type': 'mija', 'entity': '0', 'location': 'Badezimmer oben', 'address': '58:2D:34:38:64:37'},
+    {'type': 'mija', 'entity': '2', 'location': 'Elternschlafzimmer', 'address': '58:2D:34:3B:8C:66'},
+    {'type': 'mija', 'entity': '3', 'location': 'Gaestezimmer', 'address': '58:2D:34:39:16:A7'},
+]
+
+_BASE_ROSTER = [
+    {'type': 'dht', 'entity': '0', 'data_pin': 'DHT22_DAT_GPIO', 'pwr_pin': 'DHT22_PWR_GPIO'},
+    {'type': 'pir', 'entity': '0', 'pir_pin': 'PIR_DATA_GPIO', 'pwr_pin': 'PIR_PWR_GPIO', 'pir_mode': 0, 'led_pin': 'PIR_LED_GPIO'},
+    {'type': 'temt6000', 'entity': '0', 'adc_pin': 'TEMP_DAT_ADC', 'pwr_pin': 'TEMP_PWR_GPIO'},
+    {'type': 'neopix', 'entity': '0', 'neo_pin': 'NEO_DATA_GPIO'},
+    {'type': 'relay', 'entity': '0', 'relay_pin': 'RELAY_OUT_GPIO'},
+    {'type': 'switch', 'entity': '0', 'switch_pin': 'SWITCH_GPIO', 'switch_mode': 0, 'led_pin': 'SWITCH_LED_GPIO', 'led_inv': True},
+]
+
+_MAX_IDLE_TIME = 100
+
+_GEN_SKILL_ID = 'gen/0'
+
+# consecutive budget overruns of a skill until it is reported and until the
+# watchdog is not fed anymore
+_OVERRUN_REPORT_LIMIT   = 3
+_OVERRUN_WDT_LIMIT      = 5
+_REPL_WDT_FEED_PERIOD   = 1000
+
+_CMD_START      = 'start'
+_CMD_STOP       = 'stop'
+_CMD_RESTART    = 'restart'
+_CMD_ADD        = 'add'
+_CMD_REMOVE     = 'remove'
+
+_dev_id = ''
 active_skills = []
+# deadline list of [due time, skill] entries, ordered by the due time
+_deadlines = []
+# skills which requested their immediate execution
+_wakeups = []
+# uasyncio tasks and wake up flags of the skills in the asynchronous runtime
+# mode, a ThreadSafeFlag may be set from scheduled callbacks
+_skill_tasks = {}
+_skill_events = {}
+_tasks_active = False
+# roster entries and the running skill of each entry, key is the roster id
+_roster = {}
+_roster_skills = {}
+# watchdog and the consecutive budget overruns of each skill
+_wdt = None
+_wdt_timer = None
+_overruns = {}
+_pub_overrun = None
+# skill states of the RTC memory snapshot, key is the skill id
+_warm_states = {}
 
 ################################################################################
 # Functions
 
 ################################################################################
-# @brief    Initializes and starts MIA temperature sensor 1 configuration
-# @param    id       device id
+# @brief    Starts a skill, adds it to the active skills and schedules its
+#           first execution
+# @param    skill    skill object
 # @return   none
 ################################################################################
-def _start_Mia_temp_config_1(id):
-
-    skill = MijaSkill(id, "1", "Badezimmer unten", bytearray([0x58, 0x2D, 0x34, 0x37, 0x10, 0x86]))
+def _start_skill(skill):
     skill.start_skill()
+    state = _warm_states.pop(skill.get_skill_id(), None)
+    if state != None:
+        skill.set_warm_state(state)
     active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+    _schedule_skill(skill, time.ticks_ms())
+    if _tasks_active:
+        _start_skill_task(skill)
+    T.trace(__name__, T.INFO, skill.get_skill_name() + ' started')
 
 ################################################################################
-# @brief    Initializes and starts MIA temperature sensor 2 configuration
-# @param    id       device id
+# @brief    Stops a skill and removes it from the active skills, the deadline
+#           list and the uasyncio tasks
+# @param    skill    skill object
 # @return   none
 ################################################################################
-def _start_Mia_temp_config_2(id):
+def _stop_skill(skill):
+    if skill in _skill_tasks:
+        _skill_tasks.pop(skill).cancel()
+    if skill in _skill_events:
+        _skill_events.pop(skill)
+    _unschedule_skill(skill)
+    if skill in _wakeups:
+        _wakeups.remove(skill)
+    if skill in _overruns:
+        _overruns.pop(skill)
+    active_skills.remove(skill)
+    skill.stop_skill()
+    T.trace(__name__, T.INFO, skill.get_skill_name() + ' stopped')
 
-    skill = MijaSkill(id, "0", "Badezimmer oben", bytearray([0x58, 0x2d, 0x34, 0x38, 0x64, 0x37]))
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Inserts a skill into the deadline list, keeping the list ordered
+#           by the due time
+# @param    skill    skill object
+# @param    due      ticks_ms time stamp of the next execution
+# @return   none
+################################################################################
+def _schedule_skill(skill, due):
+    i = 0
+    while (i < len(_deadlines)) and (time.ticks_diff(_deadlines[i][0], due) <= 0):
+        i = i + 1
+    _deadlines.insert(i, [due, skill])
 
-    skill = MijaSkill(id, "2", "Elternschlafzimmer", bytearray([0x58, 0x2D, 0x34, 0x3b, 0x8c, 0x66]))
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Removes a skill from the deadline list
+# @param    skill    skill object
+# @return   none
+################################################################################
+def _unschedule_skill(skill):
+    for entry in _deadlines:
+        if entry[1] == skill:
+            _deadlines.remove(entry)
+            break
 
-    skill = MijaSkill(id, "3", "Gaestezimmer", bytearray([0x58, 0x2D, 0x34, 0x39, 0x16, 0xa7]))
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Wake up callback of the skills, a skill requesting its execution
+#           is executed in the next execute_skills call or its uasyncio task
+#           is woken up. The callback may be called from scheduled callbacks,
+#           it only sets flags.
+# @param    skill    skill object
+# @return   none
+################################################################################
+def _wakeup_skill(skill):
+    if skill in _skill_events:
+        _skill_events[skill].set()
+    elif skill not in _wakeups:
+        _wakeups.append(skill)
 
 ################################################################################
-# @brief    Initializes and starts all base skills for the multi sensor device
-# @param    id       device id
+# @brief    Reschedules all skills which requested their execution to the
+#           given time
+# @param    current_time    ticks_ms time stamp
 # @return   none
 ################################################################################
-def _start_base_skills(id):
+def _process_wakeups(current_time):
+    while len(_wakeups) > 0:
+        skill = _wakeups.pop(0)
+        if skill in active_skills:
+            _unschedule_skill(skill)
+            _schedule_skill(skill, current_time)
 
-    skill = DhtSkill(id, "0", DHT22_DAT_GPIO, DHT22_PWR_GPIO)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Imports the module of a skill type on demand and returns the skill
+#           class
+# @param    skill_type    skill type identifier of the roster
+# @return   skill class or None if the skill type is not supported
+################################################################################
+def _load_skill_class(skill_type):
+    if skill_type not in _SKILL_TYPES:
+        T.trace(__name__, T.ERROR, 'unsupported skill type: ' + str(skill_type))
+        return None
+    module_name, class_name = _SKILL_TYPES[skill_type]
+    module = __import__(module_name, None, None, [class_name])
+    return getattr(module, class_name)
 
-    skill = PirSkill(id, "0", PIR_DATA_GPIO, PIR_PWR_GPIO, PIR_SKILL_MODE_POLL, PIR_LED_GPIO)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Converts the roster entry options to skill constructor arguments.
+#           Pins are given as number or as pin_cfg name, addresses as
+#           colon separated hex string.
+# @param    entry    roster entry
+# @return   dictionary of keyword arguments
+################################################################################
+def _get_skill_args(entry):
+    args = {}
+
+    for key in entry:
+        value = entry[key]
+        if (key == 'type') or (key == 'entity'):
+            continue
+        elif key.endswith('_pin') and isinstance(value, str):
+            value = getattr(pin_cfg, value)
+        elif key == 'address':
+            value = bytearray([int(x, 16) for x in value.split(':')])
+        args[key] = value
+    return args
 
-    skill = Temt6000Skill(id, "0", TEMP_DAT_ADC, TEMP_PWR_GPIO)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Checks if a roster entry is a json object, the entries of the
+#           roster file and of the add command are not validated before
+# @param    entry    roster entry
+# @return   True if the entry is a dictionary, else False
+################################################################################
+def _is_roster_entry(entry):
+    if isinstance(entry, dict):
+        return True
+    T.trace(__name__, T.ERROR, 'invalid roster entry: ' + str(entry))
+    return False
 
-    skill = NeopixSkill(id, '0', NEO_DATA_GPIO)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + ' started')
+################################################################################
+# @brief    Returns the roster id of an entry, a combination of skill type and
+#           entity
+# @param    entry    roster entry
+# @return   roster id string, e.g. 'relay/0'
+################################################################################
+def _get_roster_id(entry):
+    return str(entry.get('type')) + '/' + str(entry.get('entity', '0'))
 
-    skill = RelaySkill(id, "0", RELAY_OUT_GPIO)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+################################################################################
+# @brief    Initializes the skill described by a roster entry without starting
+#           it
+# @param    entry    roster entry with skill type, entity and options
+# @return   skill object or None if the entry is invalid
+################################################################################
+def _create_skill(entry):
+    skill = None
 
-    skill = SwitchSkill(id, "0", SWITCH_GPIO, SWITCH_SKILL_MODE_POLL, SWITCH_LED_GPIO, True)
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + " started")
+    try:
+        skill_class = _load_skill_class(entry['type'])
+        if skill_class != None:
+            skill = skill_class(_dev_id, entry.get('entity', '0'), **_get_skill_args(entry))
+    except (KeyError, AttributeError, TypeError, ValueError, ImportError):
+        T.trace(__name__, T.ERROR, 'invalid roster entry: ' + str(entry))
+    return skill
 
 ################################################################################
-# @brief    Initializes and starts the skill manager
-# @param    id       device id
-# @param    cap      capability
-# @return   none
+# @brief    Starts a skill, a skill failing to start, e.g. on an invalid pin,
+#           is stopped again and not added to the active skills
+# @param    skill    skill object
+# @return   True if the skill is running, else False
 ################################################################################
-def start_skill_manager(id, cap):
+def _try_start_skill(skill):
+    try:
+        _start_skill(skill)
+        return True
+    except Exception as e:
+        T.trace(__name__, T.ERROR, skill.get_skill_name() + ' start failed: ' + str(e))
+
+    # the skill may have subscribed or allocated resources before it failed
+    try:
+        if skill in active_skills:
+            _stop_skill(skill)
+        else:
+            skill.stop_skill()
+    except Exception:
+        pass
+    return False
 
-    skill = GenSkill(id, '0')
-    skill.start_skill()
-    active_skills.append(skill)
-    T.trace(__name__, T.INFO, skill.get_skill_name() + ' started')
+################################################################################
+# @brief    Initializes and starts a skill described by a roster entry. The
+#           entry is added to the roster, also if the skill can't be started.
+# @param    entry    roster entry with skill type, entity and options
+# @return   skill object or None if the entry is invalid
+################################################################################
+def _start_roster_entry(entry):
+    if not _is_roster_entry(entry):
+        return None
+    roster_id = _get_roster_id(entry)
+    _roster[roster_id] = entry
+
+    skill = _create_skill(entry)
+    if (skill != None) and _try_start_skill(skill):
+        _roster_skills[roster_id] = skill
+        return skill
+    return None
+
+################################################################################
+# @brief    Starts the skill of a roster entry if it isn't running
+# @param    roster_id    roster id of the skill
+# @return   True if the skill is running, else False
+################################################################################
+def start_roster_skill(roster_id):
+    if roster_id in _roster_skills:
+        return True
+    if roster_id not in _roster:
+        T.trace(__name__, T.ERROR, 'unknown roster id: ' + roster_id)
+        return False
+    return _start_roster_entry(_roster[roster_id]) != None
+
+################################################################################
+# @brief    Stops the skill of a roster entry, the entry stays in the roster
+# @param    roster_id    roster id of the skill
+# @return   True if the skill is stopped, else False
+################################################################################
+def stop_roster_skill(roster_id):
+    if roster_id == _GEN_SKILL_ID:
+        T.trace(__name__, T.ERROR, 'generic skill can not be stopped')
+        return False
+    if roster_id in _roster_skills:
+        _stop_skill(_roster_skills.pop(roster_id))
+    return True
+
+################################################################################
+# @brief    Restarts the skill of a roster entry
+# @param    roster_id    roster id of the skill
+# @return   True if the skill is running again, else False
+################################################################################
+def restart_roster_skill(roster_id):
+    if stop_roster_skill(roster_id):
+        return start_roster_skill(roster_id)
+    return False
+
+################################################################################
+# @brief    Adds a new roster entry and starts its skill, an existing entry
+#           with the same roster id is replaced. The new skill is initialized
+#           before the running skill is stopped, if it can't be started the
+#           existing entry is kept and its skill is started again.
+# @param    entry    roster entry with skill type, entity and options
+# @return   True if the new skill is running, else False
+################################################################################
+def add_roster_skill(entry):
+    if not _is_roster_entry(entry):
+        return False
+    roster_id = _get_roster_id(entry)
+    if roster_id == _GEN_SKILL_ID:
+        T.trace(__name__, T.ERROR, 'generic skill can not be replaced')
+        return False
+    skill = _create_skill(entry)
+    if skill == None:
+        return False
+
+    running = roster_id in _roster_skills
+    stop_roster_skill(roster_id)
+    if _try_start_skill(skill):
+        _roster[roster_id] = entry
+        _roster_skills[roster_id] = skill
+        return True
+    if running:
+        start_roster_skill(roster_id)
+    return False
+
+################################################################################
+# @brief    Stops the skill of a roster entry and removes the entry
+# @param    roster_id    roster id of the skill
+# @return   True if the entry is removed, else False
+################################################################################
+def remove_roster_skill(roster_id):
+    if stop_roster_skill(roster_id):
+        if roster_id in _roster:
+            _roster.pop(roster_id)
+        return True
+    return False
+
+################################################################################
+# @brief    Executes a skill command, the command is a string of the command
+#           and its argument, e.g. 'restart relay/0' or
+#           'add {"type": "relay", "entity": "1", "relay_pin": 19}'
+# @param    cmd      command string
+# @return   True if the command was executed successfully, else False
+################################################################################
+def execute_skill_cmd(cmd):
+    parts = cmd.split(' ', 1)
+    if len(parts) != 2:
+        T.trace(__name__, T.ERROR, 'invalid skill command: ' + cmd)
+        return False
+    verb = parts[0]
+    arg = parts[1].strip()
+
+    if verb == _CMD_START:
+        return start_roster_skill(arg)
+    elif verb == _CMD_STOP:
+        return stop_roster_skill(arg)
+    elif verb == _CMD_RESTART:
+        return restart_roster_skill(arg)
+    elif verb == _CMD_REMOVE:
+        return remove_roster_skill(arg)
+    elif verb == _CMD_ADD:
+        try:
+            entry = json.loads(arg)
+        except ValueError:
+            T.trace(__name__, T.ERROR, 'invalid roster entry: ' + arg)
+            return False
+        return add_roster_skill(entry)
+
+    T.trace(__name__, T.ERROR, 'invalid skill command: ' + cmd)
+    return False
+
+################################################################################
+# @brief    Returns the state of all roster entries
+# @return   dictionary of roster id and True if the skill is running
+################################################################################
+def get_roster_state():
+    state = {}
+
+    for roster_id in _roster:
+        state[roster_id] = roster_id in _roster_skills
+    return state
+
+################################################################################
+# @brief    Returns the default skill roster of a device capability
+# @param    cap      capability
+# @return   list of roster entries
+################################################################################
+def _get_default_roster(cap):
+    roster = []
 
     if _MIA_SENSE_CFG_1 == cap:
-        _start_Mia_temp_config_1(id)
+        roster.extend(_MIA_SENSE_CFG_1_ROSTER)
     elif _MIA_SENSE_CFG_2 == cap:
-        _start_Mia_temp_config_2(id)
+        roster.extend(_MIA_SENSE_CFG_2_ROSTER)
+    roster.extend(_BASE_ROSTER)
+    return roster
 
-    _start_base_skills(id)
+################################################################################
+# @brief    Initializes and starts the skill manager
+# @param    id       device id
+# @param    cap      capability, selects the default roster
+# @param    roster   optional list of roster entries, overrides the default
+#                    roster of the capability
+# @return   none
+################################################################################
+def start_skill_manager(id, cap, roster=None):
+    global _dev_id, _pub_overrun, _warm_states
 
+    _dev_id = id
+    _pub_overrun = UserPubs('health/overrun', id, event=True)
+    _warm_states = warm_state.load_snapshot()
+    gen_skill = _start_roster_entry({'type': 'gen', 'entity': '0'})
+    gen_skill.set_skill_cmd_cb(execute_skill_cmd, get_roster_state)
+
+    if (roster != None) and not isinstance(roster, list):
+        T.trace(__name__, T.ERROR, 'invalid skill roster, default roster used')
+        roster = None
+    if roster == None:
+        roster = _get_default_roster(cap)
+
+    for entry in roster:
+        _start_roster_entry(entry)
 
     T.trace(__name__, T.INFO, 'skill manager started...')
 
@@ -148,17 +471,224 @@ def stop_skill_manager():
 
     for obj in active_skills:
         obj.stop_skill()
+    del active_skills[:]
+    _overruns.clear()
+    del _deadlines[:]
+    del _wakeups[:]
+    _roster.clear()
+    _roster_skills.clear()
+    _warm_states.clear()
+    _keep_watchdog_alive()
     T.trace(__name__, T.INFO, "skill manager stopped...")
 
 ################################################################################
-# @brief    Executes the skill manager
+# @brief    Stores the state of all active skills in the RTC memory, called
+#           before a reset to restore the states after the restart
+# @return   True if the snapshot was stored, else False
+################################################################################
+def save_skill_states():
+    states = {}
+
+    for obj in active_skills:
+        state = obj.get_warm_state()
+        if state != None:
+            states[obj.get_skill_id()] = state
+    return warm_state.save_snapshot(states)
+
+################################################################################
+# @brief    Executes all skills which are due or requested their execution,
+#           e.g. after a received command, and reschedules them based on their
+#           next due time. The publications of all executed skills are written
+#           in one burst after the execution.
 # @return   always True, for future skill return values
 ################################################################################
 def execute_skills():
+    current_time = time.ticks_ms()
+    due_entries = []
+
+    _process_wakeups(current_time)
+
+    # take all due entries first, a skill rescheduled to now is executed in
+    # the next cycle
+    while (len(_deadlines) > 0) and (time.ticks_diff(_deadlines[0][0], current_time) <= 0):
+        due_entries.append(_deadlines.pop(0))
+
+    for entry in due_entries:
+        skill = entry[1]
+        # a skill command of a previous skill may have stopped this skill
+        if skill in active_skills:
+            _execute_skill(skill)
+            _schedule_skill(skill, skill.get_next_due())
+    flush_publications()
+    feed_watchdog()
+    return True
+
+################################################################################
+# @brief    Executes the cyclic task of a skill and measures its execution time
+#           and, if the skill requested its execution, the wake up latency
+# @param    skill    skill object
+# @return   none
+################################################################################
+def _execute_skill(skill):
+    # a request during the execution leads to a further execution
+    woken = skill.clear_execution_request()
+    prof = skill.get_exec_profile()
+    prof.start()
+    skill.execute_skill()
+    duration = prof.stop()
+    if woken:
+        skill.get_wake_profile().stop()
+    _check_budget(skill, duration // 1000)
+
+################################################################################
+# @brief    Checks the execution time of a skill against its budget and
+#           reports a skill which overruns its budget repeatedly
+# @param    skill       skill object
+# @param    duration    execution time in milliseconds
+# @return   none
+################################################################################
+def _check_budget(skill, duration):
+    if duration <= skill.EXECUTION_BUDGET:
+        if skill in _overruns:
+            _overruns.pop(skill)
+        return
+
+    count = _overruns.get(skill, 0) + 1
+    _overruns[skill] = count
+    T.trace(__name__, T.WARNING, skill.get_skill_id() + ' overrun: ' + str(duration) + 'ms')
+    if count == _OVERRUN_REPORT_LIMIT:
+        _pub_overrun.publish(json.dumps({'skill': skill.get_skill_id(),
+                                            'time': duration,
+                                            'budget': skill.EXECUTION_BUDGET}))
+
+################################################################################
+# @brief    Starts the hardware watchdog. Once started, the watchdog can't be
+#           stopped anymore.
+# @param    timeout     watchdog timeout in milliseconds, 0 disables the
+#                       watchdog
+# @return   none
+################################################################################
+def start_watchdog(timeout):
+    global _wdt
+
+    if (timeout > 0) and (_wdt == None):
+        _wdt = machine.WDT(timeout=timeout)
+        T.trace(__name__, T.INFO, 'watchdog started: ' + str(timeout) + 'ms')
+
+################################################################################
+# @brief    Feeds the watchdog if no skill overruns its budget repeatedly.
+#           A hanging skill or a skill exceeding the overrun limit leads to a
+#           watchdog reset.
+# @return   none
+################################################################################
+def feed_watchdog():
+    if _wdt == None:
+        return
+    for skill in _overruns:
+        if _overruns[skill] >= _OVERRUN_WDT_LIMIT:
+            return
+    _wdt.feed()
+
+################################################################################
+# @brief    Keeps the watchdog alive from a timer after the skills are
+#           stopped, e.g. in repl mode
+# @return   none
+################################################################################
+def _keep_watchdog_alive():
+    global _wdt_timer
+
+    if (_wdt != None) and (_wdt_timer == None):
+        _wdt_timer = machine.Timer(0)
+        _wdt_timer.init(period=_REPL_WDT_FEED_PERIOD, mode=machine.Timer.PERIODIC,
+                        callback=lambda t: _wdt.feed())
+
+################################################################################
+# @brief    Calculates the idle time until the earliest skill deadline
+# @return   idle time in milliseconds, limited to the maximum idle time
+################################################################################
+def get_idle_time():
+    if len(_wakeups) > 0:
+        return 0
+    if len(_deadlines) == 0:
+        return _MAX_IDLE_TIME
+    idle_time = time.ticks_diff(_deadlines[0][0], time.ticks_ms())
+    if idle_time < 0:
+        return 0
+    return min(idle_time, _MAX_IDLE_TIME)
+
+################################################################################
+# @brief    Collects the light sleep wake up GPIOs of all active skills
+# @return   list of (pin number, wake level) tuples
+################################################################################
+def get_wake_pins():
+    wake_pins = []
 
     for obj in active_skills:
-        obj.execute_skill()
-    return True
+        wake_pins.extend(obj.get_wake_pins())
+    return wake_pins
+
+################################################################################
+# @brief    uasyncio task executing a single skill, the task awaits the next
+#           due time of the skill or its wake up flag instead of polling it
+# @param    skill    skill object
+# @param    event    wake up flag of the skill, the flag is cleared by wait
+# @return   none
+################################################################################
+async def _run_skill_async(skill, event):
+    import uasyncio as asyncio
+
+    while True:
+        _execute_skill(skill)
+        flush_publications()
+        idle_time = time.ticks_diff(skill.get_next_due(), time.ticks_ms())
+        if idle_time > 0:
+            try:
+                await asyncio.wait_for_ms(event.wait(), idle_time)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep_ms(0)
+
+################################################################################
+# @brief    Creates a uasyncio task for each active skill, used in the
+#           asynchronous runtime mode instead of execute_skills
+# @return   none
+################################################################################
+def start_skill_tasks():
+    global _tasks_active
+
+    _tasks_active = True
+    # the tasks execute all skills immediately
+    del _wakeups[:]
+    for obj in active_skills:
+        _start_skill_task(obj)
+    T.trace(__name__, T.INFO, 'skill tasks started...')
+
+################################################################################
+# @brief    Creates the uasyncio task of a skill
+# @param    skill    skill object
+# @return   none
+################################################################################
+def _start_skill_task(skill):
+    import uasyncio as asyncio
+
+    event = asyncio.ThreadSafeFlag()
+    _skill_events[skill] = event
+    _skill_tasks[skill] = asyncio.create_task(_run_skill_async(skill, event))
+
+################################################################################
+# @brief    Cancels all uasyncio skill tasks
+# @return   none
+################################################################################
+def stop_skill_tasks():
+    global _tasks_active
+
+    _tasks_active = False
+    for skill in _skill_tasks:
+        _skill_tasks[skill].cancel()
+    _skill_tasks.clear()
+    _skill_events.clear()
+    T.trace(__name__, T.INFO, 'skill tasks stopped...')
 
 ################################################################################
 # Classes
@@ -167,6 +697,7 @@ def execute_skills():
 # Scripts
 
 T.configure(__name__, T.INFO)
+abs_skill.set_wakeup_cb(_wakeup_skill)
 
 if __name__ == "__main__":
     # execute only if run as a script
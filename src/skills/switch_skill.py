@@ -20,6 +20,7 @@ from src.skills.abs_skill import AbstractSkill
 from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
 import machine
+import src.utils.sys_mode as sys_mode
 import src.utils.trace as T
 
 ################################################################################
@@ -96,7 +97,8 @@ class SwitchSkill(AbstractSkill):
         super().__init__(dev_id, skill_entity)
 
         self._skill_name    = "SWITCH skill"
-        self._pub_state     = UserPubs("switch/triggered", dev_id, "std", skill_entity)
+        self._pub_state     = UserPubs("switch/triggered", dev_id, "std", skill_entity,
+                                        event=True, qos=1)
 
         self._switch_pin    = switch_pin
         self._led_pin       = led_pin
@@ -186,8 +188,8 @@ class SwitchSkill(AbstractSkill):
         if self._restart_trigger_cnt > _RESTART_TRIGGER_THRESHOLD:
             self._restart_trigger_cnt = 0
             T.trace(__name__, T.INFO, 'restart triggered')
-            import machine
-            machine.reset()
+            # the reset is done by user main after the skill states are saved
+            sys_mode.goto_reset_mode()
         else:
             current_time = time.ticks_ms()
             if abs(time.ticks_diff(current_time, self._last_trigger_time)) > _RESTART_TRIGGER_TIMEOUT:
@@ -197,6 +199,16 @@ class SwitchSkill(AbstractSkill):
 
 
 
+    ############################################################################
+    # @brief    Getter function for the GPIOs which shall wake up the
+    #           controller from light sleep
+    # @return   list of (pin number, wake level) tuples
+    ############################################################################
+    def get_wake_pins(self):
+        if self._switch_pin != _NO_VALUE:
+            return [(self._switch_pin, self._switch_trigger)]
+        return []
+
     ############################################################################
     # @brief    executes the incoming subscription callback handler
     # @param    topic       topic identifier of the messsage
@@ -18,8 +18,9 @@ from src.mqtt.user_subs import UserSubs
 from src.mqtt.user_pubs import UserPubs
 import dht
 import machine
+import array
+import src.utils.sampler as sampler
 import src.utils.trace as T
-import math
 
 ################################################################################
 # Variables
@@ -43,8 +44,15 @@ class Temt6000Skill(AbstractSkill):
     _sleep_counter = 0
     _AVERAGES_PER_CYCLE = 10
     _avg_counter = 0
-    _avg_sum = 0.0
+    _samples = None
+    _sampler = None
+    # the sampler reads the adc in the measure state and wakes up the skill
+    # for each state machine step, execution without sampler request
+    _SAMPLER_IDLE_PERIOD = 10000
+    _sample_tick = False
+    _sampled = False
     _PUB_THRESHOLD = 2.0
+    _PUB_HEARTBEAT = 300000
     _DARK_LEVEL = 300
     _ON = 1
     _OFF = 0
@@ -62,7 +70,7 @@ class Temt6000Skill(AbstractSkill):
 
 
     _brightness = 0
-    _last_brightness = 9999
+    _brightness_valid = False
     _DARK = 'DARK'
     _BRIGTH = 'BRIGHT'
     _bright_level = _DARK
@@ -81,15 +89,16 @@ class Temt6000Skill(AbstractSkill):
     def __init__(self, dev_id, skill_entity, adc_pin, pwr_pin=NO_VALUE):
         super().__init__(dev_id, skill_entity)
         self._skill_name = "TEMT6000 skill"
-        self._pub_brightness = UserPubs("temt6x/raw", dev_id, "std", skill_entity)
+        self._pub_brightness = UserPubs("temt6x/raw", dev_id, "std", skill_entity,
+                                        deadband=self._PUB_THRESHOLD,
+                                        heartbeat=self._PUB_HEARTBEAT)
         self._pub_bright_level = UserPubs("temt6x/level", dev_id, "std", skill_entity)
         self._adc_pin = adc_pin
         self._pwr_pin = pwr_pin
         self._brightness = 0
-        self._last_brightness = 999
         self._bright_level = self._DARK
         self._sleep_counter = self._SLEEP_PERIOD
-
+        self._samples = array.array('H', [0] * self._AVERAGES_PER_CYCLE)
 
     ############################################################################
     # @brief    starts the skill
@@ -105,8 +114,10 @@ class Temt6000Skill(AbstractSkill):
             self._pwr_gpio.off()
 
         self._avg_counter = 0
-        self._avg_sum = 0.0
-
+        self._sample_tick = False
+        self._sampled = False
+        self._sampler = sampler.start_sampler(self.EXECUTION_PERIOD, self._sample,
+                                                self.get_sample_profile())
 
     ############################################################################
     # @brief    poweres the temt6000 chip
@@ -122,15 +133,18 @@ class Temt6000Skill(AbstractSkill):
     # @return   none
     ############################################################################
     def _measure(self):
-        T.trace(__name__, T.DEBUG, 'measure cycle: ' + str(self._avg_counter))
-        if self._adc_chan != None:
-            self._avg_sum = self._avg_sum + self._adc_chan.read()
+        if T.is_enabled(__name__, T.DEBUG):
+            T.trace(__name__, T.DEBUG, 'measure cycle: ' + str(self._avg_counter))
+        # the sampler already read the adc
+        if self._sampler == None:
+            self._read_sensor()
+        self._sampled = False
         self._avg_counter = self._avg_counter + 1
 
         if self._avg_counter == self._AVERAGES_PER_CYCLE:
-            self._brightness = int((self._avg_sum / self._avg_counter) + 0.5)
+            self._brightness = int((sum(self._samples) / self._avg_counter) + 0.5)
             self._avg_counter = 0
-            self._avg_sum = 0.0
+            self._brightness_valid = True
             self._deactivate_chip()
             if(self._brightness < self._DARK_LEVEL):
                 self._bright_level = self._DARK
@@ -138,9 +152,18 @@ class Temt6000Skill(AbstractSkill):
                 self._bright_level = self._BRIGTH
             self._state = self._STATE_PUBLISH
             T.trace(__name__, T.DEBUG, 'measured brightness: ' + str(self._brightness))
-            T.trace(__name__, T.DEBUG, 'last brightness: ' + str(self._last_brightness))
             T.trace(__name__, T.DEBUG, 'brightness level: ' + self._bright_level)
 
+    ############################################################################
+    # @brief    reads one raw brightness sample of the adc, the average is
+    #           calculated by _measure
+    # @return   none
+    ############################################################################
+    def _read_sensor(self):
+        if self._adc_chan != None:
+            self._samples[self._avg_counter] = self._adc_chan.read()
+        self._sampled = True
+
     ############################################################################
     # @brief    power on the chip
     # @return   none
@@ -167,10 +190,8 @@ class Temt6000Skill(AbstractSkill):
         T.trace(__name__, T.DEBUG, 'publish...')
         self._state = self._STATE_SLEEP
 
-        T.trace(__name__, T.DEBUG, 'math.fabs: ' + str(math.fabs(self._last_brightness - self._brightness)))
-        if math.fabs(self._last_brightness - self._brightness) > self._PUB_THRESHOLD:
-            self._last_brightness = self._brightness
-            self._pub_brightness.publish(str(self._brightness))
+        # the level is published together with a changed brightness
+        if self._pub_brightness.publish(str(self._brightness)):
             self._pub_bright_level.publish(self._bright_level)
             T.trace(__name__, T.DEBUG, 'published data...')
 
@@ -187,26 +208,90 @@ class Temt6000Skill(AbstractSkill):
             self._state = self._STATE_HEATUP
             T.trace(__name__, T.DEBUG, 'wakeup... ')
 
+    ############################################################################
+    # @brief    executes one step of the measurement state machine
+    # @return   none
+    ############################################################################
+    def _execute_state(self):
+        if(self._STATE_HEATUP == self._state):
+            self._heating()
+        elif(self._STATE_MEASURE == self._state):
+            self._measure()
+        elif(self._STATE_PUBLISH == self._state):
+            self._publish()
+        elif(self._STATE_SLEEP == self._state):
+            self._sleep()
+        else:
+            T.trace(__name__, T.ERROR, 'unexpected state detected')
+            self._state = self._STATE_SLEEP
+
+    ############################################################################
+    # @brief    timer driven sample callback, it only reads the adc in the
+    #           measure state and wakes up the skill for the next state machine
+    #           step
+    # @return   none
+    ############################################################################
+    def _sample(self):
+        if (self._STATE_MEASURE == self._state) and not self._sampled:
+            self._read_sensor()
+        self._sample_tick = True
+        self.request_execution()
+
     ############################################################################
     # @brief    executes the skill cyclic task
     # @return   none
     ############################################################################
     def execute_skill(self):
+        if self._sampler != None:
+            # one state machine step per sample period, the measurement is
+            # evaluated after the adc was read
+            if self._sample_tick:
+                self._sample_tick = False
+                if (self._STATE_MEASURE != self._state) or self._sampled:
+                    self._execute_state()
+            if self._STATE_PUBLISH == self._state:
+                self._publish()
+            return
+
         current_time = time.ticks_ms()
         if abs(time.ticks_diff(current_time, self._last_time)) > self.EXECUTION_PERIOD:
             self._last_time = current_time
+            self._execute_state()
 
-            if(self._STATE_HEATUP == self._state):
-                self._heating()
-            elif(self._STATE_MEASURE == self._state):
-                self._measure()
-            elif(self._STATE_PUBLISH == self._state):
-                self._publish()
-            elif(self._STATE_SLEEP == self._state):
-                self._sleep()
-            else:
-                T.trace(__name__, T.ERROR, 'unexpected state detected')
-                self._state = self._STATE_SLEEP
+    ############################################################################
+    # @brief    Getter function for the next due execution time of the skill
+    # @return   ticks_ms time stamp of the next due execution
+    ############################################################################
+    def get_next_due(self):
+        if self._sampler != None:
+            return time.ticks_add(time.ticks_ms(), self._SAMPLER_IDLE_PERIOD)
+        return time.ticks_add(self._last_time, self.EXECUTION_PERIOD + 1)
+
+    ############################################################################
+    # @brief    Getter function for the skill state kept during a reset
+    # @return   list of brightness and sleep counter or None if nothing was
+    #           measured yet
+    ############################################################################
+    def get_warm_state(self):
+        if not self._brightness_valid:
+            return None
+        return [self._brightness, self._sleep_counter]
+
+    ############################################################################
+    # @brief    Restores the last measurement before the reset, the values are
+    #           published immediately instead of after a full measurement cycle
+    # @param    state       list of brightness and sleep counter
+    # @return   none
+    ############################################################################
+    def set_warm_state(self, state):
+        self._brightness = state[0]
+        self._brightness_valid = True
+        if(self._brightness < self._DARK_LEVEL):
+            self._bright_level = self._DARK
+        else:
+            self._bright_level = self._BRIGTH
+        self._sleep_counter = state[1]
+        self._state = self._STATE_PUBLISH
 
     ############################################################################
     # @brief    executes the incoming subscription callback handler
@@ -223,6 +308,9 @@ class Temt6000Skill(AbstractSkill):
     ############################################################################
     def stop_skill(self):
         super().stop_skill()
+        if self._sampler != None:
+            self._sampler.stop()
+            self._sampler = None
         self._adc_chan = None
         self._deactivate_chip()
         self._pwr_gpio = None
@@ -12,12 +12,22 @@
 from src.mqtt.user_mqtt import check_non_blocking_for_msg
 from src.mqtt.user_mqtt import start_mqtt_client
 from src.mqtt.user_mqtt import stop_mqtt_client
-from time import sleep
+from src.mqtt.user_mqtt import process_msgs_async
+from src.mqtt.user_mqtt import is_msg_pending
+from src.mqtt.user_mqtt import set_receive_budget
+from src.mqtt.user_mqtt import limit_idle_time
+from src.mqtt.user_mqtt import set_watchdog_cb
 from src.utils.param_set import ParamSet
 import src.utils.sys_mode as sys_mode
+import src.utils.power_mgr as power_mgr
+import src.utils.io_worker as io_worker
 import src.skills.skill_mgr as skill_mgr
 import src.utils.trace as T
 from machine import reset
+################################################################################
+# Variables
+_REPL_CHECK_PERIOD = 100
+
 ################################################################################
 # Methods
 
@@ -29,13 +39,29 @@ def do_user_initialize():
     T.trace(__name__, T.DEBUG, 'initialize parameter sets...')
     para = ParamSet()
 
+    if para.get_io_thread():
+        T.trace(__name__, T.DEBUG, 'start the io worker...')
+        io_worker.start_io_worker()
+
     T.trace(__name__, T.DEBUG, 'connect to mqtt broker...')
+    set_receive_budget(para.get_rx_max_msgs(), para.get_rx_max_time())
     start_mqtt_client(para.get_mqtt_client_id(), para.get_mqtt_broker_ip(),
                         para.get_mqtt_broker_port(), para.get_mqtt_broker_user(),
-                        para.get_mqtt_broker_pwd())
+                        para.get_mqtt_broker_pwd(),
+                        not para.get_persistent_session(),
+                        para.get_retain_states(), para.get_mqtt_keepalive())
 
     T.trace(__name__, T.DEBUG, 'startup the configured devices...')
-    skill_mgr.start_skill_manager(para.get_device_id(), para.get_capability())
+    skill_mgr.start_skill_manager(para.get_device_id(), para.get_capability(),
+                                    para.read_skill_roster())
+
+    T.trace(__name__, T.DEBUG, 'start the watchdog...')
+    skill_mgr.start_watchdog(para.get_wdt_timeout())
+    set_watchdog_cb(skill_mgr.feed_watchdog)
+
+    T.trace(__name__, T.DEBUG, 'initialize the power management...')
+    power_mgr.initialize_power_module(para.get_light_sleep(),
+                                        skill_mgr.get_wake_pins())
 
 
 ################################################################################
@@ -56,8 +82,11 @@ def do_user_processes():
 # @return   none
 ################################################################################
 def stop_user_processes():
+    if sys_mode.is_reset_mode_active():
+        skill_mgr.save_skill_states()
     skill_mgr.stop_skill_manager()
     stop_mqtt_client()
+    io_worker.stop_io_worker()
 
 
 ################################################################################
@@ -78,9 +107,65 @@ def do_user_main():
                 sys_mode.goto_reset_mode()
             if sys_mode.short_check_for_repl_via_button_request():
                 sys_mode.goto_repl_mode()
+            # idle until the earliest skill deadline or mqtt action
+            power_mgr.idle(limit_idle_time(skill_mgr.get_idle_time()), is_msg_pending)
         else:
             stop_user_processes()
 
+    do_user_exit()
+
+################################################################################
+# @brief    user main task of the asynchronous runtime mode, it supervises the
+#           mqtt and skill tasks and the repl button
+# @return   none
+################################################################################
+async def _user_main_task():
+    import uasyncio as asyncio
+
+    mqtt_task = asyncio.create_task(_mqtt_task())
+    skill_mgr.start_skill_tasks()
+    while sys_mode.is_normal_mode_active():
+        if await sys_mode.short_check_for_repl_via_button_request_async():
+            sys_mode.goto_repl_mode()
+        skill_mgr.feed_watchdog()
+        await asyncio.sleep_ms(_REPL_CHECK_PERIOD)
+    skill_mgr.stop_skill_tasks()
+    mqtt_task.cancel()
+
+################################################################################
+# @brief    mqtt task of the asynchronous runtime mode
+# @return   none
+################################################################################
+async def _mqtt_task():
+    if False == await process_msgs_async():
+        T.trace(__name__, T.ERROR, 'bad return from process_msgs_async')
+        sys_mode.goto_reset_mode()
+
+################################################################################
+# @brief    user main method of the asynchronous runtime mode, every skill and
+#           the mqtt client run as uasyncio task
+# @return   none
+################################################################################
+def do_user_main_async():
+    import uasyncio as asyncio
+
+    T.configure(__name__, T.INFO)
+    T.trace(__name__, T.INFO, 'user main async...')
+    sys_mode.goto_normal_mode()
+
+    if sys_mode.is_normal_mode_active():
+        T.trace(__name__, T.DEBUG, 'user mode...')
+        do_user_initialize()
+        asyncio.run(_user_main_task())
+        stop_user_processes()
+
+    do_user_exit()
+
+################################################################################
+# @brief    handles the reset and repl mode after leaving the user mode
+# @return   none
+################################################################################
+def do_user_exit():
     if sys_mode.is_reset_mode_active():
         T.trace(__name__, T.INFO, 'reset mode...')
         reset()
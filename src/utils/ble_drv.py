@@ -15,6 +15,7 @@ import struct
 import time
 import micropython
 from micropython import const
+import src.utils.io_worker as io_worker
 import src.utils.trace as T
 
 ################################################################################
@@ -41,6 +42,17 @@ _IRQ_GATTC_INDICATE = const(19)
 
 _NONE_FILTER = bytearray([0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF])
 
+# scan result ring buffer of the io worker mode, the head holds address type,
+# advertising type, rssi and the address, the body the advertising data. The
+# ring is filled by the bluetooth irq and drained by the io worker thread.
+_RING_SLOTS = 16
+_RING_SLOT_SIZE = 48
+_HEAD_SIZE = 9
+# ring buffer of the decoded records of a listener in the io worker mode, it
+# is filled by the io worker thread and drained by the skill loop
+_RECORD_SLOTS = 8
+_RECORD_SIZE = 32
+
 _central = None
 
 ################################################################################
@@ -79,6 +91,7 @@ def ble_remove_listener(filter):
         if(0 == _central.get_number_of_filters()):
             T.trace(__name__, T.INFO, 'stop the bluetooth driver')
             _central.stop_scan()
+            _central.release_worker()
             _central = None
 
 ################################################################################
@@ -114,6 +127,9 @@ class BleDriver:
     _ble = None
     _filter = []
     _scan_active = False
+    _ring = None
+    _irq_head = None
+    _worker_task_ref = None
 
     ############################################################################
     # Member Functions
@@ -126,6 +142,23 @@ class BleDriver:
         self._ble = ble
         self._ble.active(True)
         self._filter = []
+        # the irq only queues the scan results if the io worker thread is
+        # running, the io worker thread decodes them for the listeners
+        if io_worker.is_io_worker_active():
+            self._ring = io_worker.RingBuffer(_RING_SLOTS, _RING_SLOT_SIZE)
+            self._irq_head = bytearray(_HEAD_SIZE)
+            # the same bound method object is required to remove the task
+            self._worker_task_ref = self._worker_task
+            io_worker.add_task(self._worker_task_ref)
+
+    ############################################################################
+    # @brief    This function removes the task of the io worker thread
+    # @return   none
+    ############################################################################
+    def release_worker(self):
+        if self._worker_task_ref != None:
+            io_worker.remove_task(self._worker_task_ref)
+            self._worker_task_ref = None
 
     ############################################################################
     # @brief    This function stops the scan process
@@ -142,6 +175,8 @@ class BleDriver:
     # @return   none
     ############################################################################
     def append_listener(self, filter):
+        if self._ring != None:
+            filter.attach_ring()
         self._filter.append(filter)
 
     ############################################################################
@@ -174,12 +209,67 @@ class BleDriver:
     def _ble_scanner_irq(self, event, data):
         if event == _IRQ_SCAN_RESULT:
             addr_type, addr, adv_type, rssi, adv_data = data
-            for obj in self._filter:
-                if obj.compare(addr):
-                    obj.msg_callback(addr_type, addr, adv_type, rssi, adv_data)
+            if self._ring != None:
+                # results of other devices would only fill the ring
+                if not self._is_listened(addr):
+                    return
+                head = self._irq_head
+                head[0] = addr_type
+                head[1] = adv_type
+                head[2] = rssi & 0xff
+                head[3:_HEAD_SIZE] = addr
+                # the put takes no lock, the worker thread only pops
+                self._ring.put(0, head, adv_data)
+            else:
+                self._dispatch(addr_type, addr, adv_type, rssi, adv_data)
         elif event == _IRQ_SCAN_DONE:
             T.trace(__name__, T.DEBUG, "_IRQ_SCAN_DONE")
 
+    ############################################################################
+    # @brief    This function passes a scan result to the matching listeners
+    # @param    addr_type   type of address
+    # @param    addr        source address of the message
+    # @param    adv_type    data type of the message
+    # @param    rssi        rssi
+    # @param    adv_data    payload of the message or the message itself
+    # @return   none
+    ############################################################################
+    def _dispatch(self, addr_type, addr, adv_type, rssi, adv_data):
+        for obj in self._filter:
+            if obj.compare(addr):
+                obj.receive(addr_type, addr, adv_type, rssi, adv_data)
+
+    ############################################################################
+    # @brief    This function checks if any listener matches an address
+    # @param    addr        source address of the message
+    # @return   True if a listener matches, else False
+    ############################################################################
+    def _is_listened(self, addr):
+        for obj in self._filter:
+            if obj.compare(addr):
+                return True
+        return False
+
+    ############################################################################
+    # @brief    Task of the io worker thread, dispatches the scan results
+    #           queued by the bluetooth irq to the listeners
+    # @return   True if any scan result was dispatched, else False
+    ############################################################################
+    def _worker_task(self):
+        ring = self._ring
+        busy = False
+        entry = ring.peek()
+        while entry != None:
+            head = entry[1]
+            rssi = head[2]
+            if rssi > 127:
+                rssi = rssi - 256
+            self._dispatch(head[0], bytes(head[3:_HEAD_SIZE]), head[1], rssi, entry[2])
+            ring.pop()
+            busy = True
+            entry = ring.peek()
+        return busy
+
     ############################################################################
     # @brief    This function starts the scan process
     # @return   none
@@ -205,12 +295,76 @@ class BleListener:
     # @param    msg_callback    callback function if message arrives
     # @param    addr_filter     optional filter, no filter object cause all
     #                           messages to be passed to the callback
+    # @param    decode_cb       optional function decoding a scan result into
+    #                           a record of bytes or None to skip it
+    # @param    wake_cb         optional function called when a record was
+    #                           queued in the io worker mode
     # @return   none
     ############################################################################
-    def __init__(self, name, msg_callback, addr_filter = _NONE_FILTER):
+    def __init__(self, name, msg_callback, addr_filter = _NONE_FILTER,
+                    decode_cb = None, wake_cb = None):
         self.name = name
         self.addr_filter = addr_filter
         self.msg_callback = msg_callback
+        self.decode_cb = decode_cb
+        self.wake_cb = wake_cb
+        self._ring = None
+
+    ############################################################################
+    # @brief    creates the ring buffer of the decoded records, called by the
+    #           driver in the io worker mode
+    # @return   none
+    ############################################################################
+    def attach_ring(self):
+        if (self.decode_cb != None) and (self._ring == None):
+            self._ring = io_worker.RingBuffer(_RECORD_SLOTS, _RECORD_SIZE)
+
+    ############################################################################
+    # @brief    receives a scan result of the listened address, called from
+    #           the bluetooth irq or in the io worker mode from the io worker
+    #           thread. Without decode function the message callback gets the
+    #           scan result. Else the message callback gets the decoded record,
+    #           in the io worker mode the record is queued for process_records
+    #           and the wake up function is called.
+    # @param    addr_type   type of address
+    # @param    addr        source address of the message
+    # @param    adv_type    data type of the message
+    # @param    rssi        rssi
+    # @param    adv_data    payload of the message or the message itself
+    # @return   none
+    ############################################################################
+    def receive(self, addr_type, addr, adv_type, rssi, adv_data):
+        if self.decode_cb == None:
+            self.msg_callback(addr_type, addr, adv_type, rssi, adv_data)
+            return
+        record = self.decode_cb(addr_type, addr, adv_type, rssi, adv_data)
+        if record == None:
+            return
+        if self._ring == None:
+            self.msg_callback(record)
+            return
+        if not self._ring.put(0, record):
+            T.trace(__name__, T.WARNING, 'record ring full: ' + self.name)
+        elif self.wake_cb != None:
+            self.wake_cb()
+
+    ############################################################################
+    # @brief    passes the records decoded by the io worker thread to the
+    #           message callback, it is called from the skill loop
+    # @return   True if any record was processed, else False
+    ############################################################################
+    def process_records(self):
+        ring = self._ring
+        if ring == None:
+            return False
+        busy = False
+        entry = ring.peek()
+        while entry != None:
+            self.msg_callback(bytes(entry[1]))
+            ring.pop()
+            busy = True
+            entry = ring.peek()
+        return busy
 
     ############################################################################
     # @brief    compare function for the recieved message base on the address
@@ -0,0 +1,141 @@
+################################################################################
+# filename: exec_prof.py
+# date: 17. Oct. 2026
+# description: This module supports the execution time profiling of skills.
+#               Every profile counts the calls and keeps the minimum, average
+#               and maximum execution time and a small fixed-bucket histogram.
+################################################################################
+
+################################################################################
+# Imports
+import time
+import src.utils.trace as T
+
+################################################################################
+# Variables
+
+# upper bucket limits of the histogram in microseconds, the last bucket takes
+# all longer execution times
+_HIST_LIMITS = (100, 1000, 10000, 100000)
+
+_profiles = {}
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    get the profile object based on name, the profile is generated if
+#           it doesn't exist yet
+# @param    name    name of the profile
+# @return   returns the profile object
+################################################################################
+def get_profile(name):
+    global _profiles
+
+    if name in _profiles:
+        return _profiles[name]
+    p = ExecProfile(name)
+    _profiles[name] = p
+    return p
+
+################################################################################
+# @brief    returns a summary of all profiles
+# @return   dictionary of profile name and [count, min, avg, max, histogram]
+################################################################################
+def get_summary():
+    summary = {}
+
+    for name in _profiles:
+        summary[name] = _profiles[name].get_summary()
+    return summary
+
+################################################################################
+# @brief    resets the measurements of all profiles
+# @return   none
+################################################################################
+def reset_profiles():
+    for name in _profiles:
+        _profiles[name].reset()
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class handles the execution time measurement of one profile
+################################################################################
+class ExecProfile:
+
+    ############################################################################
+    # Member Attributes
+    name = ''
+    _start_time = 0
+    _count = 0
+    _min = 0
+    _max = 0
+    _sum = 0
+    _hist = None
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the ExecProfile class
+    # @param    name    name of the profile
+    # @return   none
+    ############################################################################
+    def __init__(self, name):
+        self.name = name
+        self._hist = [0] * (len(_HIST_LIMITS) + 1)
+        self.reset()
+
+    ############################################################################
+    # @brief    resets the measurement
+    # @return   none
+    ############################################################################
+    def reset(self):
+        self._count = 0
+        self._min = 0
+        self._max = 0
+        self._sum = 0
+        for i in range(len(self._hist)):
+            self._hist[i] = 0
+
+    ############################################################################
+    # @brief    starts a measurement
+    # @return   none
+    ############################################################################
+    def start(self):
+        self._start_time = time.ticks_us()
+
+    ############################################################################
+    # @brief    stops a measurement and adds it to the statistic
+    # @return   measured duration in microseconds
+    ############################################################################
+    def stop(self):
+        duration = time.ticks_diff(time.ticks_us(), self._start_time)
+        if (self._count == 0) or (duration < self._min):
+            self._min = duration
+        if duration > self._max:
+            self._max = duration
+        self._count = self._count + 1
+        self._sum = self._sum + duration
+
+        i = 0
+        while (i < len(_HIST_LIMITS)) and (duration >= _HIST_LIMITS[i]):
+            i = i + 1
+        self._hist[i] = self._hist[i] + 1
+        return duration
+
+    ############################################################################
+    # @brief    returns the measurement summary
+    # @return   list of count, min, avg and max in microseconds and histogram
+    ############################################################################
+    def get_summary(self):
+        avg = 0
+        if self._count > 0:
+            avg = self._sum // self._count
+        return [self._count, self._min, avg, self._max, self._hist]
+
+################################################################################
+# Scripts
+T.configure(__name__, T.INFO)
@@ -0,0 +1,245 @@
+################################################################################
+# filename: io_worker.py
+# date: 17. Oct. 2026
+# description: This module runs the radio and network I/O in a separate
+#               _thread worker. Drivers register their worker tasks and
+#               exchange their messages with the skill loop through
+#               preallocated lock-free ring buffers.
+#
+# Notes:    - MicroPython threads share the global interpreter lock, the
+#               worker doesn't speed up python code, but blocking socket
+#               calls release the lock and don't stall the skill loop anymore
+#           - the module doesn't depend on ESP32 modules and runs on the unix
+#               port, see scripts/io_bench.py
+################################################################################
+
+################################################################################
+# Imports
+import _thread
+import time
+import src.utils.trace as T
+
+################################################################################
+# Variables
+_STACK_SIZE     = 8192
+_IDLE_TIME      = 5
+_STOP_TIMEOUT   = 2000
+# put and pop counters of the ring buffers wrap around within small integers
+_COUNTER_MASK   = 0xffff
+
+_tasks = []
+_task_lock = None
+_running = False
+_stopped = True
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    starts the worker thread
+# @return   none
+################################################################################
+def start_io_worker():
+    global _running, _stopped, _task_lock
+
+    if _running:
+        return
+    if _task_lock == None:
+        _task_lock = _thread.allocate_lock()
+    _running = True
+    _stopped = False
+    # not every port supports or accepts the stack size
+    try:
+        _thread.stack_size(_STACK_SIZE)
+    except (AttributeError, ValueError):
+        pass
+    _thread.start_new_thread(_worker, ())
+    T.trace(__name__, T.INFO, 'io worker started...')
+
+################################################################################
+# @brief    stops the worker thread and waits until it terminated
+# @return   none
+################################################################################
+def stop_io_worker():
+    global _running
+
+    if not _running:
+        return
+    _running = False
+    start_time = time.ticks_ms()
+    while (not _stopped) and (time.ticks_diff(time.ticks_ms(), start_time) < _STOP_TIMEOUT):
+        time.sleep_ms(_IDLE_TIME)
+    T.trace(__name__, T.INFO, 'io worker stopped...')
+
+################################################################################
+# @brief    returns if the worker thread is running
+# @return   True if the worker is running, else False
+################################################################################
+def is_io_worker_active():
+    return _running
+
+################################################################################
+# @brief    adds a task to the worker, the task is called cyclically from the
+#           worker thread
+# @param    task    task function returning True if it was busy
+# @return   none
+################################################################################
+def add_task(task):
+    _task_lock.acquire()
+    _tasks.append(task)
+    _task_lock.release()
+
+################################################################################
+# @brief    removes a task from the worker, the task isn't executed anymore
+#           once this function returns
+# @param    task    task function
+# @return   none
+################################################################################
+def remove_task(task):
+    _task_lock.acquire()
+    if task in _tasks:
+        _tasks.remove(task)
+    _task_lock.release()
+
+################################################################################
+# @brief    worker thread, executes all tasks and idles if none was busy
+# @return   none
+################################################################################
+def _worker():
+    global _stopped
+
+    while _running:
+        busy = False
+        _task_lock.acquire()
+        for task in _tasks:
+            try:
+                busy = task() or busy
+            except Exception as e:
+                T.trace(__name__, T.ERROR, 'io worker task failed: ' + str(e))
+        _task_lock.release()
+        if not busy:
+            time.sleep_ms(_IDLE_TIME)
+    _stopped = True
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class implements a single producer single consumer ring
+#           buffer of preallocated slots. Every entry consists of a kind, a
+#           head and an optional body, e.g. topic and payload. The producer
+#           only writes the put counter and the consumer only the pop
+#           counter, no lock is taken and the producer may run in an irq.
+################################################################################
+class RingBuffer:
+
+    ############################################################################
+    # Member Attributes
+    _slots = None
+    _views = None
+    _kinds = None
+    _head_lens = None
+    _body_lens = None
+    _slot_size = 0
+    _read = 0
+    _write = 0
+    _puts = 0
+    _pops = 0
+    dropped = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the RingBuffer class
+    # @param    slots       number of entries
+    # @param    slot_size   maximum size of head and body of an entry
+    # @return   none
+    ############################################################################
+    def __init__(self, slots, slot_size):
+        self._slots = [bytearray(slot_size) for i in range(slots)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._kinds = [0] * slots
+        self._head_lens = [0] * slots
+        self._body_lens = [0] * slots
+        self._slot_size = slot_size
+        self._read = 0
+        self._write = 0
+        self._puts = 0
+        self._pops = 0
+        self.dropped = 0
+
+    ############################################################################
+    # @brief    copies an entry into the next free slot
+    # @param    kind    entry kind
+    # @param    head    entry head bytes
+    # @param    body    optional entry body bytes
+    # @return   True if the entry was added, False if it was dropped
+    ############################################################################
+    def put(self, kind, head, body=b''):
+        head_len = len(head)
+        body_len = len(body)
+        if (self.get_count() == len(self._slots)) or (head_len + body_len > self._slot_size):
+            self.dropped = self.dropped + 1
+            return False
+
+        # the slot is owned by the producer until the put counter is incremented
+        i = self._write
+        view = self._views[i]
+        view[0:head_len] = head
+        view[head_len:head_len + body_len] = body
+        self._kinds[i] = kind
+        self._head_lens[i] = head_len
+        self._body_lens[i] = body_len
+        self._write = (i + 1) % len(self._slots)
+        self._puts = (self._puts + 1) & _COUNTER_MASK
+        return True
+
+    ############################################################################
+    # @brief    returns the oldest entry without removing it, the views stay
+    #           valid until pop is called
+    # @return   tuple of kind, head and body memoryview or None if empty
+    ############################################################################
+    def peek(self):
+        if self.get_count() == 0:
+            return None
+        i = self._read
+        head_len = self._head_lens[i]
+        view = self._views[i]
+        return (self._kinds[i], view[0:head_len],
+                view[head_len:head_len + self._body_lens[i]])
+
+    ############################################################################
+    # @brief    removes the oldest entry and releases its slot
+    # @return   none
+    ############################################################################
+    def pop(self):
+        if self.get_count() == 0:
+            return
+        self._read = (self._read + 1) % len(self._slots)
+        self._pops = (self._pops + 1) & _COUNTER_MASK
+
+    ############################################################################
+    # @brief    returns if the ring buffer has no entries
+    # @return   True if empty, else False
+    ############################################################################
+    def is_empty(self):
+        return self.get_count() == 0
+
+    ############################################################################
+    # @brief    returns if all slots of the ring buffer are taken
+    # @return   True if full, else False
+    ############################################################################
+    def is_full(self):
+        return self.get_count() == len(self._slots)
+
+    ############################################################################
+    # @brief    returns the number of entries
+    # @return   number of entries
+    ############################################################################
+    def get_count(self):
+        return (self._puts - self._pops) & _COUNTER_MASK
+
+################################################################################
+# Scripts
+T.configure(__name__, T.INFO)
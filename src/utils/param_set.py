@@ -10,6 +10,7 @@
 ################################################################################
 # Imports
 import os
+import json
 
 import src.utils.trace as T
 
@@ -17,6 +18,9 @@ import src.utils.trace as T
 # Variables
 _para_set = None
 
+RUNTIME_MODE_POLL   = 'poll'
+RUNTIME_MODE_ASYNC  = 'async'
+
 ################################################################################
 # Functions
 
@@ -61,20 +65,28 @@ class ParamSet:
     wifi_ssid = ''
     wifi_pwd = ''
 
+    options = {}
+
     ############################################################################
     # Member Functions
 
     ############################################################################
     # @brief    constructor of the ParamSet class
-    # @param    module      module file name
-    # @param    main_dir    main directory, root directory
+    # @param    set_name    file name of the parameter set
+    # @param    param_dir   parameter directory
+    # @param    opts_name   file name of the optional runtime options
+    # @param    roster_name file name of the optional skill roster
     # @return   none
     ############################################################################
-    def __init__(self, set_name='.sets', param_dir='para'):
+    def __init__(self, set_name='.sets', param_dir='para', opts_name='.opts',
+                    roster_name='skills.json'):
         self.set_name = set_name
         self.param_dir = param_dir
+        self.opts_name = opts_name
+        self.roster_name = roster_name
 
         self.__read_parameter_from_file()
+        self.__read_options_from_file()
 
     ############################################################################
     # @brief    get WIFI ssid parameter
@@ -97,6 +109,35 @@ class ParamSet:
         except OSError:
             T.trace(__name__, T.ERROR, 'parameter read error: ' + self.param_dir + '/' + self.set_name)
 
+    ############################################################################
+    # @brief    reads the optional runtime options, a json object, from file.
+    #           Missing options fall back to their defaults.
+    # @return   none
+    ############################################################################
+    def __read_options_from_file(self):
+        self.options = {}
+        try:
+            f = open(self.param_dir + '/' + self.opts_name)
+            self.options = json.load(f)
+            f.close()
+        except OSError:
+            T.trace(__name__, T.DEBUG, 'no options file: ' + self.param_dir + '/' + self.opts_name)
+        except ValueError:
+            T.trace(__name__, T.ERROR, 'options read error: ' + self.param_dir + '/' + self.opts_name)
+
+        if not isinstance(self.options, dict):
+            T.trace(__name__, T.WARNING, 'options are no json object: ' + self.param_dir + '/' + self.opts_name)
+            self.options = {}
+
+    ############################################################################
+    # @brief    get an optional runtime option
+    # @param    key         option name
+    # @param    default     value returned if the option is not configured
+    # @return   returns the option value or the default
+    ############################################################################
+    def get_option(self, key, default=None):
+        return self.options.get(key, default)
+
     ############################################################################
     # @brief    get WIFI ssid parameter
     # @return   returns the wifi ssid
@@ -167,6 +208,90 @@ class ParamSet:
     def get_capability(self):
         return(self.capability)
 
+    ############################################################################
+    # @brief    reads the optional skill roster, a json list of skill entries
+    #           with skill type, entity and skill options, from file
+    # @return   returns the list of roster entries or None if no roster is
+    #           configured
+    ############################################################################
+    def read_skill_roster(self):
+        roster = None
+        try:
+            f = open(self.param_dir + '/' + self.roster_name)
+            roster = json.load(f)
+            f.close()
+        except OSError:
+            T.trace(__name__, T.DEBUG, 'no skill roster: ' + self.param_dir + '/' + self.roster_name)
+        except ValueError:
+            T.trace(__name__, T.ERROR, 'skill roster read error: ' + self.param_dir + '/' + self.roster_name)
+        return roster
+
+    ############################################################################
+    # @brief    get runtime mode of the main loop
+    # @return   returns RUNTIME_MODE_POLL or RUNTIME_MODE_ASYNC
+    ############################################################################
+    def get_runtime_mode(self):
+        return(self.get_option('runtime_mode', RUNTIME_MODE_POLL))
+
+    ############################################################################
+    # @brief    get light sleep configuration of the main loop idle time
+    # @return   returns True if light sleep is enabled, else False
+    ############################################################################
+    def get_light_sleep(self):
+        return(self.get_option('light_sleep', False))
+
+    ############################################################################
+    # @brief    get hardware watchdog timeout
+    # @return   returns the watchdog timeout in milliseconds, 0 if disabled
+    ############################################################################
+    def get_wdt_timeout(self):
+        return(self.get_option('wdt_timeout', 0))
+
+    ############################################################################
+    # @brief    get io thread mode
+    # @return   returns True if the radio and network I/O runs in a separate
+    #           worker thread, else False
+    ############################################################################
+    def get_io_thread(self):
+        return(self.get_option('io_thread', False))
+
+    ############################################################################
+    # @brief    get maximum number of incoming mqtt messages per cycle
+    # @return   returns the message budget of a receive cycle
+    ############################################################################
+    def get_rx_max_msgs(self):
+        return(self.get_option('rx_max_msgs', 16))
+
+    ############################################################################
+    # @brief    get maximum time spent on incoming mqtt messages per cycle
+    # @return   returns the time budget of a receive cycle in milliseconds
+    ############################################################################
+    def get_rx_max_time(self):
+        return(self.get_option('rx_max_time', 20))
+
+    ############################################################################
+    # @brief    get persistent mqtt session configuration
+    # @return   returns True if the broker keeps the session of the client id
+    #           across the connections, else False
+    ############################################################################
+    def get_persistent_session(self):
+        return(self.get_option('persistent_session', False))
+
+    ############################################################################
+    # @brief    get retained state publication configuration
+    # @return   returns True if the state topics are published retained, else
+    #           False
+    ############################################################################
+    def get_retain_states(self):
+        return(self.get_option('retain_states', False))
+
+    ############################################################################
+    # @brief    get mqtt keepalive time
+    # @return   returns the keepalive time in seconds, 0 if disabled
+    ############################################################################
+    def get_mqtt_keepalive(self):
+        return(self.get_option('mqtt_keepalive', 60))
+
 ################################################################################
 # Scripts
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+################################################################################
+# filename: power_mgr.py
+# date: 17. Oct. 2026
+# description: This module handles the idle time of the main loop. If enabled,
+#               the controller enters light sleep until the next deadline and
+#               wakes up early on configured GPIO levels. The module measures
+#               the time spent asleep and the wake-up latency.
+#
+# Notes:    - only RTC GPIOs can wake the ESP32 from light sleep, other pins
+#               are covered by the poll period of their skills
+#           - the WIFI socket can't wake the controller, therefore the sleep
+#               time is limited to _MAX_SLEEP_TIME and no sleep is entered
+#               while MQTT data is pending
+################################################################################
+
+################################################################################
+# Imports
+import time
+import machine
+import src.utils.trace as T
+
+################################################################################
+# Variables
+_MIN_SLEEP_TIME     = 10
+_MAX_SLEEP_TIME     = 100
+
+_RTC_GPIOS = (0, 2, 4, 12, 13, 14, 15, 25, 26, 27, 32, 33, 34, 35, 36, 37, 38,
+                39)
+
+_light_sleep        = False
+_window_start       = 0
+_sleep_time         = 0
+_sleep_cnt          = 0
+_wake_latency_sum   = 0
+_wake_latency_max   = 0
+_msg_wake_cnt       = 0
+_msg_delay_max      = 0
+# wake up time stamp of the last sleep ended with pending data, None if no
+# message is expected
+_msg_wake_time      = None
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    initializes the power module and configures the wake up sources
+# @param    light_sleep     True to enter light sleep during idle times
+# @param    wake_pins       list of (pin number, wake level) tuples
+# @return   none
+################################################################################
+def initialize_power_module(light_sleep=False, wake_pins=None):
+    global _light_sleep, _window_start
+
+    _light_sleep = light_sleep
+    _window_start = time.ticks_ms()
+    _reset_stats()
+
+    if _light_sleep and (wake_pins != None):
+        _configure_wake_pins(wake_pins)
+        T.trace(__name__, T.INFO, 'light sleep enabled...')
+
+################################################################################
+# @brief    idles for the given time, either in light sleep or busy sleep
+# @param    idle_time       time to idle in milliseconds
+# @param    pending_cb      optional function returning True if incoming data
+#                           is pending, no light sleep is entered then
+# @return   none
+################################################################################
+def idle(idle_time, pending_cb=None):
+    global _sleep_time, _sleep_cnt, _wake_latency_sum, _wake_latency_max
+    global _msg_wake_time
+
+    if idle_time <= 0:
+        return
+
+    if (not _light_sleep) or (idle_time < _MIN_SLEEP_TIME):
+        time.sleep_ms(idle_time)
+        return
+
+    if (pending_cb != None) and pending_cb():
+        return
+
+    sleep_time = min(idle_time, _MAX_SLEEP_TIME)
+    _msg_wake_time = None
+    start_time = time.ticks_us()
+    machine.lightsleep(sleep_time)
+    slept_time = time.ticks_diff(time.ticks_us(), start_time) // 1000
+
+    _sleep_time = _sleep_time + slept_time
+    _sleep_cnt = _sleep_cnt + 1
+    # the overshoot of the requested sleep time is the wake-up latency
+    latency = max(slept_time - sleep_time, 0)
+    _wake_latency_sum = _wake_latency_sum + latency
+    _wake_latency_max = max(_wake_latency_max, latency)
+
+    # data arrived during the sleep, the delay is measured if it is a
+    # message and not e.g. a ping response
+    if (pending_cb != None) and pending_cb():
+        _msg_wake_time = time.ticks_ms()
+
+################################################################################
+# @brief    notifies the reception of a message, a message received after a
+#           sleep ended with pending data is counted with its delay from the
+#           wake up to the delivery
+# @return   none
+################################################################################
+def message_received():
+    global _msg_wake_cnt, _msg_delay_max, _msg_wake_time
+
+    if _msg_wake_time == None:
+        return
+    delay = time.ticks_diff(time.ticks_ms(), _msg_wake_time)
+    _msg_wake_time = None
+    _msg_wake_cnt = _msg_wake_cnt + 1
+    _msg_delay_max = max(_msg_delay_max, delay)
+
+################################################################################
+# @brief    returns the power statistics since the last call and starts a new
+#           measurement window
+# @return   dictionary with the sleep share in per mill, the number of sleeps,
+#           the average and maximum wake-up latency in ms and the number of
+#           messages received during a sleep and their maximum delay in ms
+#           from the wake up to the delivery
+################################################################################
+def get_power_stats():
+    global _window_start
+
+    current_time = time.ticks_ms()
+    window = max(time.ticks_diff(current_time, _window_start), 1)
+    stats = {
+        'sleep': (_sleep_time * 1000) // window,
+        'cnt': _sleep_cnt,
+        'wake_avg': _wake_latency_sum // max(_sleep_cnt, 1),
+        'wake_max': _wake_latency_max,
+        'msg_cnt': _msg_wake_cnt,
+        'msg_delay': _msg_delay_max,
+    }
+    _window_start = current_time
+    _reset_stats()
+    return stats
+
+################################################################################
+# @brief    resets the statistic counters
+# @return   none
+################################################################################
+def _reset_stats():
+    global _sleep_time, _sleep_cnt, _wake_latency_sum, _wake_latency_max
+    global _msg_wake_cnt, _msg_delay_max
+
+    _sleep_time = 0
+    _sleep_cnt = 0
+    _wake_latency_sum = 0
+    _wake_latency_max = 0
+    _msg_wake_cnt = 0
+    _msg_delay_max = 0
+
+################################################################################
+# @brief    configures the GPIO wake up sources of the light sleep, a single
+#           low active RTC pin uses ext0, high active RTC pins use ext1. The
+#           ext0 source holds only one pin, further low active pins don't
+#           wake up the chip.
+# @param    wake_pins       list of (pin number, wake level) tuples
+# @return   none
+################################################################################
+def _configure_wake_pins(wake_pins):
+    import esp32
+
+    low_pin = None
+    high_pins = []
+    for pin, level in wake_pins:
+        if pin not in _RTC_GPIOS:
+            T.trace(__name__, T.WARNING, 'no wake up on pin: ' + str(pin))
+        elif level != 0:
+            high_pins.append(machine.Pin(pin))
+        elif low_pin == None:
+            low_pin = pin
+            esp32.wake_on_ext0(machine.Pin(pin), esp32.WAKEUP_ALL_LOW)
+        else:
+            T.trace(__name__, T.WARNING, 'no wake up on pin: ' + str(pin)
+                        + ', low level wake up already on pin: ' + str(low_pin))
+
+    if len(high_pins) > 0:
+        esp32.wake_on_ext1(high_pins, esp32.WAKEUP_ANY_HIGH)
+
+################################################################################
+# Classes
+
+################################################################################
+# Scripts
+T.configure(__name__, T.INFO)
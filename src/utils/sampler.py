@@ -0,0 +1,156 @@
+################################################################################
+# filename: sampler.py
+# date: 17. Oct. 2026
+# description: This module supports timer driven periodic sampling of skills.
+#               A hardware timer triggers the sample callback of the skill,
+#               the callback is deferred via micropython.schedule and executed
+#               in the main context, independent of the main loop load.
+#
+# Notes:    - sample callbacks shall only read the hardware, store the values
+#               in preallocated buffers and request the skill execution, state
+#               changes, error handling and publishing are left to
+#               execute_skill
+#           - timer 0 is reserved for the watchdog of the skill manager
+################################################################################
+
+################################################################################
+# Imports
+import machine
+import micropython
+import src.utils.trace as T
+
+################################################################################
+# Variables
+
+# free hardware timers of the ESP32
+_free_timers = [1, 2, 3]
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    creates and starts a sampler if a hardware timer is available
+# @param    period      sample period in milliseconds
+# @param    sample_cb   sample callback function without parameters
+# @param    prof        optional profile of the sample callback execution time
+# @return   started sampler object or None if no timer is available
+################################################################################
+def start_sampler(period, sample_cb, prof=None):
+    if len(_free_timers) == 0:
+        T.trace(__name__, T.WARNING, 'no timer available for sampling')
+        return None
+    sampler = Sampler(period, sample_cb, prof)
+    sampler.start()
+    return sampler
+
+################################################################################
+# Classes
+
+################################################################################
+# @brief    This class executes a sample callback periodically from a hardware
+#           timer
+################################################################################
+class Sampler:
+
+    ############################################################################
+    # Member Attributes
+    _period = 0
+    _sample_cb = None
+    _prof = None
+    _timer = None
+    _timer_id = 0
+    _sample_ref = None
+    _scheduled = False
+    _missed = 0
+
+    ############################################################################
+    # Member Functions
+
+    ############################################################################
+    # @brief    constructor of the Sampler class
+    # @param    period      sample period in milliseconds
+    # @param    sample_cb   sample callback function without parameters
+    # @param    prof        optional profile of the sample callback execution
+    #                       time
+    # @return   none
+    ############################################################################
+    def __init__(self, period, sample_cb, prof=None):
+        self._period = period
+        self._sample_cb = sample_cb
+        self._prof = prof
+        # bound method is allocated once, the timer callback must not allocate
+        self._sample_ref = self._sample
+        self._scheduled = False
+        self._missed = 0
+
+    ############################################################################
+    # @brief    starts the periodic sampling
+    # @return   none
+    ############################################################################
+    def start(self):
+        if self._timer != None:
+            return
+        self._timer_id = _free_timers.pop(0)
+        self._timer = machine.Timer(self._timer_id)
+        self._timer.init(period=self._period, mode=machine.Timer.PERIODIC,
+                            callback=self._timer_cb)
+        T.trace(__name__, T.DEBUG, 'sampler started on timer: ' + str(self._timer_id))
+
+    ############################################################################
+    # @brief    stops the periodic sampling and releases the timer
+    # @return   none
+    ############################################################################
+    def stop(self):
+        if self._timer == None:
+            return
+        self._timer.deinit()
+        self._timer = None
+        _free_timers.append(self._timer_id)
+        if self._missed > 0:
+            T.trace(__name__, T.WARNING, 'missed samples: ' + str(self._missed))
+
+    ############################################################################
+    # @brief    Getter function for the number of samples which were skipped
+    #           because the previous sample wasn't executed yet
+    # @return   number of missed samples
+    ############################################################################
+    def get_missed(self):
+        return self._missed
+
+    ############################################################################
+    # @brief    timer callback, defers the sample to the main context
+    # @param    timer       timer object
+    # @return   none
+    ############################################################################
+    def _timer_cb(self, timer):
+        if self._scheduled:
+            self._missed = self._missed + 1
+            return
+        try:
+            micropython.schedule(self._sample_ref, None)
+            self._scheduled = True
+        except RuntimeError:
+            # schedule queue is full
+            self._missed = self._missed + 1
+
+    ############################################################################
+    # @brief    executes the sample callback in the main context
+    # @param    arg     unused schedule argument
+    # @return   none
+    ############################################################################
+    def _sample(self, arg):
+        self._scheduled = False
+        if self._prof != None:
+            self._prof.start()
+        # an exception of a scheduled function would be raised in the
+        # interrupted code
+        try:
+            self._sample_cb()
+        except Exception as e:
+            T.trace(__name__, T.ERROR, 'sample callback failed: ' + str(e))
+        if self._prof != None:
+            self._prof.stop()
+
+################################################################################
+# Scripts
+T.configure(__name__, T.INFO)
@@ -183,6 +183,20 @@ def short_check_for_repl_via_button_request():
         repl_mode = False
     return repl_mode
 
+################################################################################
+# @brief    Check for repl mode user request without blocking other uasyncio
+#           tasks during the sample period.
+# @return   True if repl mode was requested by user, else False
+################################################################################
+async def short_check_for_repl_via_button_request_async():
+    pinStateHigh = await _sample_repl_req_low_state_async(100)
+    if 5 < pinStateHigh:
+        repl_mode = True
+        T.trace(__name__, T.DEBUG, 'repl request detected...')
+    else:
+        repl_mode = False
+    return repl_mode
+
 ################################################################################
 # @brief    Go to reset mode
 # @return   None
@@ -239,6 +253,28 @@ def _sample_repl_req_low_state(sample_time_ms=2000, sample_rate_ms=10):
 
     return count
 
+################################################################################
+# @brief    samples the low state of the repl request pin for a dedicated
+#           sample time, awaiting the sample rate instead of sleeping
+# @param    sample_time_ms     sample time in milliseconds
+# @param    sample_rate_ms     sample rate in milliseconds
+# @return   number of low states detected, 0 if gpio not initialized
+################################################################################
+async def _sample_repl_req_low_state_async(sample_time_ms=2000, sample_rate_ms=10):
+    import uasyncio as asyncio
+    global _repl_req_gpio
+    i = 1
+    count = 0
+
+    if None != _repl_req_gpio:
+        while i < sample_time_ms:
+            if(0 == _repl_req_gpio.value()):
+                count = count + 1
+            i = i + sample_rate_ms
+            await asyncio.sleep_ms(sample_rate_ms)
+
+    return count
+
 ################################################################################
 # Classes
 
@@ -104,6 +104,16 @@ def error(msg, *args):
 def trace(tracer, level, msg, *args):
     getTracer(tracer).trace(level, msg, *args)
 
+################################################################################
+# @brief    checks if a trace message of a level would be traced, used to skip
+#           building expensive trace messages
+# @param    tracer  tracer name identification
+# @param    level   criticality of message
+# @return   True if the message would be traced, else False
+################################################################################
+def is_enabled(tracer, level):
+    return getTracer(tracer).is_enabled_for(level)
+
 ################################################################################
 # @brief    configures a tracer
 # @param    tracer  tracer name identification
@@ -0,0 +1,79 @@
+################################################################################
+# filename: warm_state.py
+# date: 17. Oct. 2026
+# description: This module stores a snapshot of the skill states in the RTC
+#               memory before a reset and restores it after the restart. The
+#               RTC memory keeps its content during a soft reset, but not
+#               during a power cycle. The snapshot is tagged with the firmware
+#               version, a snapshot of another firmware is rejected.
+################################################################################
+
+################################################################################
+# Imports
+import json
+import machine
+import src.utils.trace as T
+from src.utils.app_info import AppInfo
+
+################################################################################
+# Variables
+_MAGIC              = b'WS1:'
+_RTC_MEMORY_SIZE    = 2048
+
+################################################################################
+# Functions
+
+################################################################################
+# @brief    builds the snapshot header with the running firmware version, an
+#           OTA update between store and restore changes the header
+# @return   header bytes
+################################################################################
+def _get_header():
+    return _MAGIC + AppInfo().get_fw_version().strip().encode('utf-8') + b':'
+
+################################################################################
+# @brief    stores the skill states in the RTC memory
+# @param    states      dictionary of skill id and skill state
+# @return   True if the snapshot was stored, else False
+################################################################################
+def save_snapshot(states):
+    data = _get_header() + json.dumps(states).encode('utf-8')
+    if len(data) > _RTC_MEMORY_SIZE:
+        T.trace(__name__, T.WARNING, 'snapshot too large: ' + str(len(data)))
+        return False
+    machine.RTC().memory(data)
+    T.trace(__name__, T.INFO, 'snapshot stored: ' + str(len(data)) + ' bytes')
+    return True
+
+################################################################################
+# @brief    reads and clears the skill state snapshot of the RTC memory, a
+#           snapshot is restored only once
+# @return   dictionary of skill id and skill state, empty if no valid
+#           snapshot is available
+################################################################################
+def load_snapshot():
+    rtc = machine.RTC()
+    data = rtc.memory()
+    if not data.startswith(_MAGIC):
+        return {}
+    rtc.memory(b'')
+
+    header = _get_header()
+    if not data.startswith(header):
+        T.trace(__name__, T.WARNING, 'snapshot of another firmware rejected')
+        return {}
+
+    try:
+        states = json.loads(data[len(header):])
+    except ValueError:
+        T.trace(__name__, T.ERROR, 'invalid snapshot')
+        return {}
+    T.trace(__name__, T.INFO, 'snapshot restored: ' + str(len(states)) + ' skills')
+    return states
+
+################################################################################
+# Classes
+
+################################################################################
+# Scripts
+T.configure(__name__, T.INFO)